@@ -0,0 +1,246 @@
+"""
+Classification Cache
+Skips Fashion-CLIP for images that were already classified.
+
+Entries are keyed by the SHA-256 of the decoded RGB pixels (so the same photo
+re-encoded or re-downloaded still hits) plus the classifier version, which
+covers the model, backend, label sets and prompt templates. Results live in an
+in-memory LRU and, when CLASSIFICATION_CACHE_DIR is set, in small JSON files
+on disk that are evicted oldest-first once CLASSIFICATION_CACHE_MAX_MB is reached.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+# Bump when the key derivation or entry layout changes
+CACHE_VERSION = 3
+
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "2048"))
+CLASSIFICATION_CACHE_MAX_MB = float(os.getenv("CLASSIFICATION_CACHE_MAX_MB", "256"))
+
+
+def pixel_hash(image: Image.Image) -> str:
+    """
+    SHA-256 of an image's decoded pixels
+
+    Args:
+        image: Decoded PIL Image (converted to RGB by the classifier)
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def classification_key(image: Image.Image, classifier_version: str) -> str:
+    """Cache key for one decoded image under a classifier version"""
+    return f"{classifier_version}-{pixel_hash(image)}"
+
+
+def is_cacheable(classification: Dict) -> bool:
+    """
+    Whether a classification may be cached
+
+    Error results are transient (bad download, worker crash), and results
+    built while the model was unavailable carry no "embedding"; neither is
+    cached, so the item is classified properly once the model is back.
+    """
+    if "error" in classification.get("tags", []):
+        return False
+    return bool(classification.get("embedding"))
+
+
+class ClassificationCache:
+    """In-memory LRU of classification results with an optional on-disk tier"""
+
+    def __init__(
+        self,
+        max_entries: int = CLASSIFICATION_CACHE_SIZE,
+        cache_dir: Optional[str] = None,
+        max_disk_bytes: int = int(CLASSIFICATION_CACHE_MAX_MB * 1024 * 1024)
+    ):
+        self.max_entries = max(0, max_entries)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max(0, max_disk_bytes)
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bytes currently on disk; computed lazily on the first write
+        self._disk_bytes: Optional[int] = None
+
+        # Metrics
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a classification
+
+        Args:
+            key: Key from classification_key
+
+        Returns:
+            A copy of the cached classification, or None on a miss
+        """
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(cached)
+
+        cached = self._load_from_disk(key)
+        with self._lock:
+            if cached is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._remember(key, cached)
+        return copy.deepcopy(cached)
+
+    def put(self, key: str, classification: Dict) -> None:
+        """Store a classification under key (uncacheable results are ignored)"""
+        if not is_cacheable(classification):
+            return
+
+        entry = copy.deepcopy(classification)
+        with self._lock:
+            self._remember(key, entry)
+        self._save_to_disk(key, entry)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (disk entries are kept)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict:
+        """Hit-rate metrics"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 3) if lookups else 0.0,
+                "disk_bytes": self._disk_bytes
+            }
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        """Insert into the LRU (caller holds the lock)"""
+        if self.max_entries == 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path_for(self, key: str) -> Path:
+        # Shard by the last pixel-hash characters to keep directories small
+        return self.cache_dir / key[-2:] / f"{key}.json"
+
+    def _load_from_disk(self, key: str) -> Optional[Dict]:
+        if self.cache_dir is None:
+            return None
+
+        path = self._path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("version") != CACHE_VERSION or not is_cacheable(entry["classification"]):
+                return None
+            # Refresh mtime so eviction approximates least-recently-used
+            os.utime(path)
+            return entry["classification"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARNING] Could not read classification cache {path}: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, classification: Dict) -> None:
+        if self.cache_dir is None:
+            return
+
+        try:
+            path = self._path_for(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps({"version": CACHE_VERSION, "classification": classification})
+            temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            previous_size = path.stat().st_size if path.exists() else 0
+            # Atomic rename so concurrent workers never read a partial file
+            os.replace(temp_path, path)
+
+            with self._lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = self._scan_disk_bytes()
+                else:
+                    self._disk_bytes += len(payload) - previous_size
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict_disk()
+        except Exception as e:
+            print(f"[WARNING] Could not write classification cache: {e}")
+
+    def _entry_files(self) -> List[Path]:
+        return list(self.cache_dir.glob("*/*.json"))
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for path in self._entry_files():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict_disk(self) -> None:
+        """Delete the oldest entries until the disk tier is ~10% under its limit (caller holds the lock)"""
+        target = int(self.max_disk_bytes * 0.9)
+        entries = []
+        for path in self._entry_files():
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                pass
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        self._disk_bytes = total
+        print(f"[CACHE] Evicted {removed} classification cache entries from disk")
+
+
+# Global instance (lazy loaded)
+_classification_cache = None
+
+def get_classification_cache() -> ClassificationCache:
+    """Get or create the shared classification cache"""
+    global _classification_cache
+    if _classification_cache is None:
+        _classification_cache = ClassificationCache(cache_dir=os.getenv("CLASSIFICATION_CACHE_DIR"))
+    return _classification_cache
@@ -9,11 +9,23 @@ import torch
 from PIL import Image
 from transformers import CLIPProcessor, CLIPModel
 from typing import Dict, List, Any, Optional
-import io
+import threading
+import time
+
+from app.components.ai.text_embedding_cache import get_text_embedding_cache
+from app.components.ai.image_preprocessing import load_image_for_clip, images_to_pixel_values
+from app.components.ai.onnx_backend import as_feature_tensor, load_inference_model, model_cache_name
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+PROMPT_TEMPLATE = "a photo of {label}"
 
 # Global model and processor (loaded once at startup)
 _model: Optional[CLIPModel] = None
 _processor: Optional[CLIPProcessor] = None
+_model_lock = threading.Lock()
+
+# Load state reported by the readiness endpoint
+_model_status = {"state": "not_loaded", "error": None, "load_seconds": None, "warmed_up": False}
 
 # Fashion-related labels for zero-shot classification
 FASHION_LABELS = [
@@ -45,29 +57,48 @@ def load_clip_model() -> None:
     Load the CLIP model and processor at startup.
     This should be called once during application startup.
     Model loading is now done in background to not block server startup.
+    
+    Loading is single-flight: concurrent callers wait for the first load
+    instead of each calling from_pretrained.
     """
     global _model, _processor
     
-    try:
-        model_name = "openai/clip-vit-base-patch32"
+    with _model_lock:
+        if _model is not None and _processor is not None:
+            return
         
-        print(f"Loading CLIP model: {model_name}")
-        
-        # Load model with CPU optimization
-        _model = CLIPModel.from_pretrained(model_name)
-        _processor = CLIPProcessor.from_pretrained(model_name)
-        
-        # Set to evaluation mode and optimize for CPU
-        _model.eval()
-        
-        # Disable gradient computation for inference
-        for param in _model.parameters():
-            param.requires_grad = False
-        
-        print("CLIP model loaded successfully!")
-    except Exception as e:
-        print(f"Warning: Could not load CLIP model: {e}")
-        print("AI insights will be disabled until model is loaded.")
+        started = time.perf_counter()
+        _model_status.update(state="loading", error=None)
+        try:
+            model_name = CLIP_MODEL_NAME
+            
+            print(f"Loading CLIP model: {model_name}")
+            
+            def load_torch_model() -> CLIPModel:
+                # Load model with CPU optimization
+                model = CLIPModel.from_pretrained(model_name)
+                
+                # Set to evaluation mode and optimize for CPU
+                model.eval()
+                
+                # Disable gradient computation for inference
+                for param in model.parameters():
+                    param.requires_grad = False
+                
+                return model
+            
+            # PyTorch eager by default, or ONNX Runtime when CLIP_BACKEND says so
+            model = load_inference_model(model_name, load_torch_model)
+            if _processor is None:
+                _processor = CLIPProcessor.from_pretrained(model_name)
+            _model = model
+            
+            _model_status.update(state="ready", load_seconds=round(time.perf_counter() - started, 2))
+            print("CLIP model loaded successfully!")
+        except Exception as e:
+            _model_status.update(state="failed", error=str(e))
+            print(f"Warning: Could not load CLIP model: {e}")
+            print("AI insights will be disabled until model is loaded.")
 
 def get_model_and_processor():
     """
@@ -88,50 +119,124 @@ def get_model_and_processor():
     
     return _model, _processor
 
-def analyze_image(image_bytes: bytes) -> Dict[str, Any]:
+def get_clip_model_status() -> Dict[str, Any]:
+    """Load state of the CLIP model in this process."""
+    return dict(_model_status)
+
+def warmup_clip_model() -> Dict[str, Any]:
+    """Load CLIP and run one dummy analysis so the first signup is fast."""
+    model, processor = get_model_and_processor()
+    if model is not None and processor is not None:
+        dummy = Image.new("RGB", (224, 224), (255, 255, 255))
+        analyze_pixel_values(images_to_pixel_values([dummy], processor))
+        _model_status["warmed_up"] = True
+    return get_clip_model_status()
+
+def get_label_embeddings(model: CLIPModel, processor: CLIPProcessor) -> torch.Tensor:
     """
-    Analyze an image using CLIP for fashion-related insights.
+    Get normalized text embeddings for FASHION_LABELS.
+    
+    The prompts never change between requests, so they are encoded once
+    and served from the shared text embedding cache afterwards.
+    
+    Returns:
+        Tensor of shape (len(FASHION_LABELS), embed_dim)
+    """
+    def encode() -> torch.Tensor:
+        text_prompts = [PROMPT_TEMPLATE.format(label=label) for label in FASHION_LABELS]
+        inputs = processor(text=text_prompts, return_tensors="pt", padding=True)
+        with torch.no_grad():
+            text_embeds = as_feature_tensor(
+                model.get_text_features(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"]
+                )
+            )
+        return text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+    
+    return get_text_embedding_cache().get_or_compute(
+        model_cache_name(CLIP_MODEL_NAME),
+        FASHION_LABELS,
+        PROMPT_TEMPLATE,
+        encode
+    )
+
+def get_processor() -> Optional[CLIPProcessor]:
+    """
+    Get the CLIP processor without loading the model.
+    
+    Used to preprocess images in a process that hands inference to workers.
+    
+    Returns:
+        CLIPProcessor or None if it could not be loaded
+    """
+    global _processor
+    
+    if _processor is None:
+        with _model_lock:
+            if _processor is None:
+                try:
+                    _processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+                except Exception as e:
+                    print(f"Could not load CLIP processor: {e}")
+                    return None
+    
+    return _processor
+
+def unavailable_insights() -> Dict[str, Any]:
+    return {
+        "top_label": "unknown",
+        "top_confidence": 0.0,
+        "all_predictions": [],
+        "message": "AI model not available - insights will be generated later"
+    }
+
+def error_insights(error: Exception) -> Dict[str, Any]:
+    return {
+        "top_label": "unknown",
+        "top_confidence": 0.0,
+        "all_predictions": [],
+        "error": str(error)
+    }
+
+def preprocess_image(image_bytes: bytes, processor: CLIPProcessor) -> torch.Tensor:
+    """
+    Decode image bytes into the normalized pixel tensor CLIP expects.
+    
+    Returns:
+        Tensor of shape (1, 3, H, W)
+    """
+    image = load_image_for_clip(image_bytes)
+    return images_to_pixel_values([image], processor)
+
+def analyze_pixel_values(pixel_values: torch.Tensor) -> Dict[str, Any]:
+    """
+    Analyze an already-preprocessed image using CLIP.
     
     Args:
-        image_bytes: Raw bytes of the image file
+        pixel_values: Tensor of shape (1, 3, H, W) from preprocess_image
     
     Returns:
-        Dictionary containing:
-        - top_label: Most confident prediction label
-        - top_confidence: Confidence score of top prediction
-        - all_predictions: List of all predictions with scores
+        Same dictionary as analyze_image
     """
     try:
         model, processor = get_model_and_processor()
         
         if model is None or processor is None:
-            return {
-                "top_label": "unknown",
-                "top_confidence": 0.0,
-                "all_predictions": [],
-                "message": "AI model not available - insights will be generated later"
-            }
-        
-        # Load image from bytes
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            return unavailable_insights()
         
-        # Prepare text prompts for zero-shot classification
-        text_prompts = [f"a photo of {label}" for label in FASHION_LABELS]
-        
-        # Process inputs
-        inputs = processor(
-            text=text_prompts,
-            images=image,
-            return_tensors="pt",
-            padding=True
-        )
+        # Text embeddings for the fixed labels come from the cache
+        text_embeds = get_label_embeddings(model, processor)
         
         # Run inference with no gradient computation
         with torch.no_grad():
-            outputs = model(**inputs)
+            image_embeds = as_feature_tensor(
+                model.get_image_features(pixel_values=pixel_values)
+            )
+            image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
             
             # Get image-text similarity scores
-            logits_per_image = outputs.logits_per_image
+            logits_per_image = model.logit_scale.exp() * image_embeds @ text_embeds.t()
             probs = logits_per_image.softmax(dim=1)
         
         # Convert to list of predictions
@@ -162,12 +267,33 @@ def analyze_image(image_bytes: bytes) -> Dict[str, Any]:
     except Exception as e:
         print(f"Error analyzing image with CLIP: {e}")
         # Return default insights on error
-        return {
-            "top_label": "unknown",
-            "top_confidence": 0.0,
-            "all_predictions": [],
-            "error": str(e)
-        }
+        return error_insights(e)
+
+def analyze_image(image_bytes: bytes) -> Dict[str, Any]:
+    """
+    Analyze an image using CLIP for fashion-related insights.
+    
+    Args:
+        image_bytes: Raw bytes of the image file
+    
+    Returns:
+        Dictionary containing:
+        - top_label: Most confident prediction label
+        - top_confidence: Confidence score of top prediction
+        - all_predictions: List of all predictions with scores
+    """
+    try:
+        model, processor = get_model_and_processor()
+        
+        if model is None or processor is None:
+            return unavailable_insights()
+        
+        return analyze_pixel_values(preprocess_image(image_bytes, processor))
+        
+    except Exception as e:
+        print(f"Error analyzing image with CLIP: {e}")
+        # Return default insights on error
+        return error_insights(e)
 
 def get_fashion_recommendations(clip_insights: Dict[str, Any], user_preferences: Dict[str, str] = None) -> Dict[str, List[str]]:
     """
@@ -0,0 +1,211 @@
+"""
+Dominant Color Extraction
+Finds a garment's main colors from its pixels instead of CLIP color prompts.
+
+The image is downsampled, the background is masked with a border-seeded
+flood fill, the remaining pixels are clustered with k-means in CIE Lab space,
+and each cluster is mapped to the nearest color of the wardrobe vocabulary.
+Results are deterministic, so outfit matching sees the same color every time.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Bump when the extraction logic changes (part of the classifier version)
+COLOR_EXTRACTOR_VERSION = 1
+
+# Longest side of the working thumbnail
+THUMBNAIL_SIZE = 64
+NUM_CLUSTERS = 4
+KMEANS_ITERATIONS = 8
+
+# Lab distance for "same color as the background"
+BACKGROUND_DISTANCE = 18.0
+# Border pixels must be at least this uniform for background removal
+MAX_BORDER_SPREAD = 14.0
+# Below this foreground share the mask is ignored (e.g. white garment on white)
+MIN_FOREGROUND_SHARE = 0.05
+
+# A second color is reported from this share of the foreground
+SECONDARY_SHARE = 0.15
+# Three or more colors at this share, none dominant, make an item multicolor
+MULTICOLOR_SHARE = 0.18
+MULTICOLOR_MAX_TOP_SHARE = 0.45
+
+# Neutrals don't make an item multicolor on their own (shading, lining, background leftovers)
+NEUTRAL_COLORS = {"black", "white", "gray", "silver", "cream", "beige"}
+
+# Reference sRGB values for the classifier's color vocabulary
+# (several shades per name where one reference is not enough)
+COLOR_REFERENCES: List[Tuple[str, Tuple[int, int, int]]] = [
+    ("red", (200, 30, 40)), ("red", (230, 50, 50)),
+    ("blue", (40, 80, 200)), ("blue", (100, 150, 230)), ("blue", (70, 130, 180)),
+    ("green", (40, 140, 60)), ("green", (120, 180, 100)), ("green", (85, 107, 47)),
+    ("yellow", (240, 210, 40)), ("yellow", (250, 235, 120)),
+    ("black", (20, 20, 20)), ("black", (45, 45, 50)),
+    ("white", (245, 245, 245)),
+    ("gray", (128, 128, 128)), ("gray", (90, 90, 90)),
+    ("pink", (240, 150, 180)), ("pink", (255, 105, 180)), ("pink", (220, 120, 140)),
+    ("purple", (120, 50, 150)), ("purple", (180, 130, 200)),
+    ("orange", (240, 130, 30)), ("orange", (230, 100, 60)),
+    ("brown", (110, 70, 40)), ("brown", (150, 100, 60)),
+    ("beige", (220, 200, 165)), ("beige", (200, 180, 140)),
+    ("navy", (25, 35, 80)), ("navy", (30, 45, 100)),
+    ("maroon", (120, 20, 35)), ("maroon", (90, 15, 30)),
+    ("gold", (212, 175, 55)), ("gold", (190, 150, 60)),
+    ("silver", (192, 192, 192)),
+    ("cream", (250, 240, 215)),
+    ("emerald", (20, 130, 90)), ("emerald", (0, 100, 70))
+]
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert sRGB values (0-255, shape (..., 3)) to CIE Lab (D65)
+    """
+    srgb = np.asarray(rgb, dtype=np.float32) / 255.0
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041]
+    ], dtype=np.float32)
+    xyz = xyz / np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+
+    epsilon = 216 / 24389
+    kappa = 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+    lightness = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack([lightness, a, b], axis=-1)
+
+
+_REFERENCE_NAMES = [name for name, _ in COLOR_REFERENCES]
+_REFERENCE_LAB = rgb_to_lab(np.array([rgb for _, rgb in COLOR_REFERENCES], dtype=np.float32))
+
+
+def nearest_color_names(lab: np.ndarray) -> List[str]:
+    """Map Lab values of shape (N, 3) to the closest vocabulary color names"""
+    distances = np.linalg.norm(lab[:, None, :] - _REFERENCE_LAB[None, :, :], axis=-1)
+    return [_REFERENCE_NAMES[i] for i in distances.argmin(axis=1)]
+
+
+def _thumbnail_lab(image: Image.Image) -> np.ndarray:
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BILINEAR)
+    return rgb_to_lab(np.asarray(thumbnail))
+
+
+def foreground_mask(lab: np.ndarray) -> np.ndarray:
+    """
+    Mask of garment pixels: everything not reachable from the border through
+    pixels close to the (uniform) border color
+
+    Args:
+        lab: Lab image of shape (H, W, 3)
+
+    Returns:
+        Boolean array of shape (H, W)
+    """
+    height, width, _ = lab.shape
+    border = np.zeros((height, width), dtype=bool)
+    border[:2, :] = border[-2:, :] = True
+    border[:, :2] = border[:, -2:] = True
+
+    background_color = np.median(lab[border], axis=0)
+    border_spread = np.median(np.linalg.norm(lab[border] - background_color, axis=-1))
+    if border_spread > MAX_BORDER_SPREAD:
+        # Busy background or the garment fills the frame: keep everything
+        return np.ones((height, width), dtype=bool)
+
+    similar = np.linalg.norm(lab - background_color, axis=-1) < BACKGROUND_DISTANCE
+    background = border & similar
+    # Flood fill by repeated 4-neighbour dilation, restricted to similar pixels
+    while True:
+        grown = background.copy()
+        grown[1:, :] |= background[:-1, :]
+        grown[:-1, :] |= background[1:, :]
+        grown[:, 1:] |= background[:, :-1]
+        grown[:, :-1] |= background[:, 1:]
+        grown &= similar
+        if np.array_equal(grown, background):
+            break
+        background = grown
+
+    # Drop the one-pixel halo where garment and background blend after resizing
+    foreground = ~background
+    eroded = foreground.copy()
+    eroded[1:, :] &= foreground[:-1, :]
+    eroded[:-1, :] &= foreground[1:, :]
+    eroded[:, 1:] &= foreground[:, :-1]
+    eroded[:, :-1] &= foreground[:, 1:]
+    return eroded if eroded.any() else foreground
+
+
+def kmeans_lab(pixels: np.ndarray, num_clusters: int = NUM_CLUSTERS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Deterministic k-means over Lab pixels
+
+    Returns:
+        Tuple of (centers of shape (K, 3), pixel share of each center)
+    """
+    num_clusters = max(1, min(num_clusters, pixels.shape[0]))
+    # Spread the initial centers over the lightness range
+    order = np.argsort(pixels[:, 0])
+    centers = pixels[order[np.linspace(0, len(order) - 1, num_clusters).astype(int)]].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.linalg.norm(pixels[:, None, :] - centers[None, :, :], axis=-1).argmin(axis=1)
+        for cluster in range(num_clusters):
+            members = pixels[assignment == cluster]
+            if len(members):
+                centers[cluster] = members.mean(axis=0)
+
+    assignment = np.linalg.norm(pixels[:, None, :] - centers[None, :, :], axis=-1).argmin(axis=1)
+    shares = np.bincount(assignment, minlength=num_clusters) / len(pixels)
+    return centers, shares
+
+
+def extract_colors(image: Image.Image) -> Dict:
+    """
+    Dominant colors of a garment photo
+
+    Args:
+        image: PIL Image
+
+    Returns:
+        Dictionary containing:
+        - color: Main vocabulary color, or "multicolor"
+        - secondary_color: Next most common color (None if there is none)
+        - color_shares: {color: share of garment pixels}
+    """
+    lab = _thumbnail_lab(image)
+    mask = foreground_mask(lab)
+    if mask.mean() < MIN_FOREGROUND_SHARE:
+        mask = np.ones(mask.shape, dtype=bool)
+
+    centers, shares = kmeans_lab(lab[mask].reshape(-1, 3))
+
+    color_shares: Dict[str, float] = {}
+    for name, share in zip(nearest_color_names(centers), shares):
+        if share > 0:
+            color_shares[name] = color_shares.get(name, 0.0) + float(share)
+    ranked = sorted(color_shares.items(), key=lambda entry: entry[1], reverse=True)
+
+    significant = [name for name, share in ranked if share >= MULTICOLOR_SHARE]
+    chromatic = [name for name in significant if name not in NEUTRAL_COLORS]
+    secondary: Optional[str]
+    if len(significant) >= 3 and len(chromatic) >= 2 and ranked[0][1] < MULTICOLOR_MAX_TOP_SHARE:
+        color, secondary = "multicolor", ranked[0][0]
+    else:
+        color = ranked[0][0]
+        secondary = ranked[1][0] if len(ranked) > 1 and ranked[1][1] >= SECONDARY_SHARE else None
+
+    return {
+        "color": color,
+        "secondary_color": secondary,
+        "color_shares": {name: round(share, 3) for name, share in ranked}
+    }
@@ -0,0 +1,166 @@
+"""
+Compact Vector File
+Fixed-width float16 / int8 embeddings packed into one memory-mapped file.
+
+Each row holds a float32 scale followed by the vector's codes:
+- float16: codes are the vector itself, scale is 1
+- int8: codes are round(v / scale) with scale = max|v| / 127 (per vector)
+- float32: uncompressed, for comparison
+
+A 512-d Fashion-CLIP embedding takes 1 KB as float16 and 516 bytes as int8.
+Reads copy the requested rows out of the mapped file (the page cache) and
+dequantize them to float32 in one vectorized step.
+Row numbers ("slots") are assigned by the caller; the file grows by doubling.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Sequence, Tuple
+
+import numpy as np
+
+SUPPORTED_DTYPES = ("float16", "int8", "float32")
+INITIAL_CAPACITY = 1024
+
+
+def row_dtype(dim: int, dtype: str) -> np.dtype:
+    """Structured dtype of one stored row"""
+    return np.dtype([("scale", "<f4"), ("codes", np.dtype(dtype).newbyteorder("<"), (dim,))])
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode float vectors for storage
+
+    Args:
+        vectors: Array of shape (N, dim)
+        dtype: One of SUPPORTED_DTYPES
+
+    Returns:
+        Tuple of (codes of shape (N, dim), float32 scales of shape (N,))
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(dtype), np.ones(vectors.shape[0], dtype=np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Decode stored rows back to float32 vectors"""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+class CompactVectorFile:
+    """Growable memory-mapped array of quantized vectors"""
+
+    def __init__(self, path: str, dim: int, dtype: str = "float16"):
+        """
+        Args:
+            path: Data file path (a .json sidecar records dim and dtype)
+            dim: Vector dimension
+            dtype: Storage type for new files; existing files keep their own
+        """
+        self.path = Path(path)
+        self.meta_path = self.path.with_suffix(self.path.suffix + ".json")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.meta_path.exists():
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["dim"] != dim:
+                raise ValueError(f"{self.path} holds {meta['dim']}-d vectors, got {dim}-d")
+            if meta["dtype"] != dtype:
+                print(f"[WARNING] {self.path.name} is stored as {meta['dtype']}; ignoring requested {dtype}")
+            dtype = meta["dtype"]
+        else:
+            if dtype not in SUPPORTED_DTYPES:
+                raise ValueError(f"Unsupported embedding dtype {dtype!r}")
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim, "dtype": dtype}, f)
+
+        self.dim = dim
+        self.dtype = dtype
+        self.row_dtype = row_dtype(dim, dtype)
+        self._lock = threading.Lock()
+        self._rows = None
+        self._open(INITIAL_CAPACITY)
+
+    @property
+    def capacity(self) -> int:
+        return self._rows.shape[0]
+
+    def _open(self, min_capacity: int) -> None:
+        """(Re)map the file, growing it to at least min_capacity rows"""
+        size = self.path.stat().st_size if self.path.exists() else 0
+        capacity = size // self.row_dtype.itemsize
+        if capacity < min_capacity:
+            capacity = max(min_capacity, capacity * 2, INITIAL_CAPACITY)
+            with open(self.path, "ab") as f:
+                f.truncate(capacity * self.row_dtype.itemsize)
+
+        if self._rows is not None:
+            self._rows.flush()
+        self._rows = np.memmap(self.path, dtype=self.row_dtype, mode="r+", shape=(capacity,))
+
+    def _ensure(self, slot: int) -> None:
+        # Another process may have grown the file already; remap either way
+        if slot >= self.capacity:
+            self._open(slot + 1)
+
+    def write(self, slots: Sequence[int], vectors: np.ndarray) -> None:
+        """
+        Store vectors at the given slots
+
+        Args:
+            slots: Row numbers, one per vector
+            vectors: Array of shape (len(slots), dim)
+        """
+        if len(slots) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(slots), self.dim)
+        codes, scales = quantize(vectors, self.dtype)
+        with self._lock:
+            self._ensure(max(slots))
+            slots = np.asarray(slots, dtype=np.int64)
+            self._rows["codes"][slots] = codes
+            self._rows["scale"][slots] = scales
+            self._rows.flush()
+
+    def read(self, slots: Sequence[int]) -> np.ndarray:
+        """
+        Load vectors as float32
+
+        Returns:
+            Array of shape (len(slots), dim)
+        """
+        if len(slots) == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        with self._lock:
+            self._ensure(max(slots))
+            rows = self._rows[np.asarray(slots, dtype=np.int64)]
+        return dequantize(rows["codes"], rows["scale"])
+
+    def nbytes(self, num_rows: int) -> int:
+        """On-disk size of num_rows rows"""
+        return num_rows * self.row_dtype.itemsize
+
+    def close(self) -> None:
+        with self._lock:
+            if self._rows is not None:
+                self._rows.flush()
+                self._rows = None
+
+
+def vector_file_name(model: str) -> str:
+    """File name for a model's vectors"""
+    return f"{model.replace('/', '__')}.vec"
+
+
+def default_vector_dir(store_path: str) -> str:
+    """Directory holding the vector files next to a store database"""
+    return os.path.splitext(store_path)[0] + "_vectors"
@@ -0,0 +1,216 @@
+"""
+Near-Duplicate Upload Detection
+Spots uploads of a garment that is already in the user's wardrobe.
+
+Two checks, cheapest first:
+1. Perceptual hash (64-bit dHash) against a per-user in-memory hash index.
+   Catches re-uploads, re-encodes, resizes and light edits without running
+   the model at all.
+2. Fashion-CLIP embedding cosine similarity against the user's vector index,
+   once the upload has been classified. Catches different photos of the same
+   garment that the hash misses.
+
+What happens to a duplicate is set by DUPLICATE_UPLOAD_POLICY: "flag"
+(default: store it, tagged), "dedupe" (return the existing item), "reject"
+(HTTP 409) or "off". A grayscale hash cannot tell colorways apart, so under
+"dedupe" and "reject" a hash match only counts once the existing item's stored
+embedding confirms it.
+
+The hash index is cached per process and per user and reloaded from the
+embedding store after DUPLICATE_INDEX_TTL_SECONDS, so uploads handled by
+other workers on the same store are picked up with at most that delay.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.components.ai.embedding_store import get_embedding_store
+from app.components.ai.image_preprocessing import load_image_for_clip
+
+DUPLICATE_UPLOAD_POLICY = os.getenv("DUPLICATE_UPLOAD_POLICY", "flag").lower()
+# Max differing bits (out of 64) for two hashes to count as the same image
+DUPLICATE_HASH_DISTANCE = int(os.getenv("DUPLICATE_HASH_DISTANCE", "6"))
+# Min embedding cosine similarity for two photos to count as the same garment
+DUPLICATE_EMBEDDING_SIMILARITY = float(os.getenv("DUPLICATE_EMBEDDING_SIMILARITY", "0.97"))
+# Number of users whose hash index is kept in memory
+DUPLICATE_INDEX_CACHE_USERS = int(os.getenv("DUPLICATE_INDEX_CACHE_USERS", "1024"))
+# Seconds before a user's cached hash index is reloaded from the store
+DUPLICATE_INDEX_TTL_SECONDS = float(os.getenv("DUPLICATE_INDEX_TTL_SECONDS", "30"))
+
+HASH_SIZE = 8
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash: compares neighbouring pixels of a tiny grayscale thumbnail
+
+    Args:
+        image: PIL Image
+        hash_size: Hash is hash_size * hash_size bits
+
+    Returns:
+        Hash as an int
+    """
+    thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distances(hashes: np.ndarray, image_hash: int) -> np.ndarray:
+    """Number of differing bits between image_hash and every hash in a uint64 array"""
+    xor = np.bitwise_xor(hashes, np.uint64(image_hash))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class DuplicateDetector:
+    """Per-user perceptual-hash index plus an embedding similarity check"""
+
+    def __init__(
+        self,
+        hash_distance: int = DUPLICATE_HASH_DISTANCE,
+        embedding_similarity: float = DUPLICATE_EMBEDDING_SIMILARITY,
+        max_users: int = DUPLICATE_INDEX_CACHE_USERS,
+        index_ttl: float = DUPLICATE_INDEX_TTL_SECONDS
+    ):
+        self.hash_distance = hash_distance
+        self.embedding_similarity = embedding_similarity
+        self.max_users = max(1, max_users)
+        self.index_ttl = index_ttl
+
+        # user_id -> (item_ids, uint64 hashes); loaded from the store on first use
+        self._users: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+        # user_id -> monotonic time the index was loaded
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hash_image(self, image) -> Optional[int]:
+        """
+        Perceptual hash of an upload
+
+        Args:
+            image: PIL Image, raw bytes or path
+
+        Returns:
+            64-bit hash, or None if the image cannot be decoded
+        """
+        try:
+            return dhash(load_image_for_clip(image))
+        except Exception as e:
+            print(f"[WARNING] Could not hash image for duplicate check: {e}")
+            return None
+
+    def _user_hashes(self, user_id: str) -> Tuple[List[str], np.ndarray]:
+        """Hash index of one user (caller holds the lock)"""
+        cached = self._users.get(user_id)
+        now = time.monotonic()
+        if cached is None or now - self._loaded_at.get(user_id, 0.0) > self.index_ttl:
+            stored = get_embedding_store().get_user_hashes(user_id)
+            cached = (list(stored), np.array(list(stored.values()), dtype=np.uint64))
+            self._users[user_id] = cached
+            self._loaded_at[user_id] = now
+            while len(self._users) > self.max_users:
+                evicted, _ = self._users.popitem(last=False)
+                self._loaded_at.pop(evicted, None)
+        self._users.move_to_end(user_id)
+        return cached
+
+    def find_by_hash(self, user_id: str, image_hash: Optional[int]) -> Optional[Dict]:
+        """
+        Closest existing item by perceptual hash, if within the distance limit
+
+        Returns:
+            {"item_id", "method": "hash", "distance"} or None
+        """
+        if image_hash is None:
+            return None
+
+        with self._lock:
+            item_ids, hashes = self._user_hashes(user_id)
+            if not item_ids:
+                return None
+            distances = hamming_distances(hashes, image_hash)
+
+        best = int(np.argmin(distances))
+        if distances[best] > self.hash_distance:
+            return None
+        return {"item_id": item_ids[best], "method": "hash", "distance": int(distances[best])}
+
+    def confirm_hash_match(self, duplicate: Optional[Dict], embedding: Optional[List[float]], model: str) -> bool:
+        """
+        Whether the upload's embedding agrees with a hash match
+
+        The hash only sees grayscale structure, so the same cut in another
+        color (or two similar product shots) can match. The match is confirmed
+        when the existing item's stored embedding is at least as similar as
+        embedding_similarity; without a stored embedding it is not confirmed.
+        """
+        if duplicate is None or not embedding:
+            return False
+
+        stored = get_embedding_store().get_many([duplicate["item_id"]], model).get(duplicate["item_id"])
+        if stored is None:
+            return False
+        upload = np.asarray(embedding, dtype=np.float32)
+        stored = np.asarray(stored, dtype=np.float32)
+        norms = float(np.linalg.norm(upload) * np.linalg.norm(stored))
+        similarity = float(upload @ stored) / norms if norms else 0.0
+        duplicate["similarity"] = round(similarity, 4)
+        return similarity >= self.embedding_similarity
+
+    def find_by_embedding(self, user_id: str, embedding: Optional[List[float]], model: str) -> Optional[Dict]:
+        """
+        Most similar existing item by Fashion-CLIP embedding, if above the similarity limit
+
+        Returns:
+            {"item_id", "method": "embedding", "similarity"} or None
+        """
+        if not embedding:
+            return None
+
+        from app.components.ai.vector_index import get_user_index
+        hits = get_user_index(user_id, model).search(np.asarray(embedding, dtype=np.float32), k=1)
+        if not hits or hits[0][1] < self.embedding_similarity:
+            return None
+        return {"item_id": hits[0][0], "method": "embedding", "similarity": round(hits[0][1], 4)}
+
+    def add(self, user_id: str, item_id: str, image_hash: Optional[int]) -> None:
+        """Remember the hash of a newly stored item"""
+        if image_hash is None:
+            return
+
+        get_embedding_store().put_hash(item_id, user_id, image_hash)
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None:
+                item_ids, hashes = cached
+                self._users[user_id] = (item_ids + [item_id], np.append(hashes, np.uint64(image_hash)))
+
+    def remove(self, user_id: str, item_id: str) -> None:
+        """Drop a deleted item from the in-memory index (the store deletes its own row)"""
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None and item_id in cached[0]:
+                item_ids, hashes = cached
+                keep = [i for i, existing in enumerate(item_ids) if existing != item_id]
+                self._users[user_id] = ([item_ids[i] for i in keep], hashes[keep])
+
+
+# Global instance (lazy loaded)
+_duplicate_detector = None
+
+def get_duplicate_detector() -> DuplicateDetector:
+    """Get or create the shared duplicate detector"""
+    global _duplicate_detector
+    if _duplicate_detector is None:
+        _duplicate_detector = DuplicateDetector()
+    return _duplicate_detector
@@ -0,0 +1,304 @@
+"""
+Wardrobe Embedding Store
+Keeps the Fashion-CLIP image embedding of every wardrobe item.
+
+Label-set changes only affect the text side of CLIP, so with the image
+embeddings at hand an item can be re-categorized with one matrix product
+instead of re-downloading and re-encoding its photo.
+
+A local SQLite file (EMBEDDING_STORE_PATH) maps item ids to row numbers
+("slots"); the vectors themselves live in one compact memory-mapped file per
+model (float16 by default, EMBEDDING_STORE_DTYPE=int8 halves that again).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.components.ai.compact_vectors import CompactVectorFile, default_vector_dir, vector_file_name
+
+DEFAULT_EMBEDDING_STORE_PATH = ".cache/wardrobe_embeddings.sqlite3"
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float16").lower()
+
+
+class EmbeddingStore:
+    """item_id -> embedding store: SQLite index over memory-mapped vector files"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_EMBEDDING_STORE_PATH,
+        dtype: str = EMBEDDING_STORE_DTYPE,
+        vector_dir: Optional[str] = None
+    ):
+        self.path = path
+        self.dtype = dtype
+        if path == ":memory:":
+            self.vector_dir = Path(vector_dir or tempfile.mkdtemp(prefix="embeddings_"))
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.vector_dir = Path(vector_dir or default_vector_dir(path))
+        self._vector_files: Dict[str, CompactVectorFile] = {}
+
+        # One connection shared across threads; the lock serializes access.
+        # Autocommit mode, with explicit transactions where slots are assigned.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS item_vectors (
+                    item_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_item_vectors_user ON item_vectors(user_id, model)"
+            )
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_item_vectors_slot ON item_vectors(model, slot)"
+            )
+            # Slots of deleted items, reused by the next put
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS free_slots (model TEXT NOT NULL, slot INTEGER NOT NULL, PRIMARY KEY (model, slot))"
+            )
+            # 64-bit perceptual hashes (hex) used for duplicate detection
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS item_hashes (
+                    item_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    image_hash TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_item_hashes_user ON item_hashes(user_id)")
+
+    def _vectors(self, model: str, dim: Optional[int] = None) -> Optional[CompactVectorFile]:
+        """Vector file of a model, created on the first put when dim is known (caller holds the lock)"""
+        vectors = self._vector_files.get(model)
+        if vectors is None:
+            path = self.vector_dir / vector_file_name(model)
+            if dim is None:
+                meta_path = path.with_suffix(path.suffix + ".json")
+                if not meta_path.exists():
+                    return None
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    dim = json.load(f)["dim"]
+            vectors = CompactVectorFile(str(path), dim, self.dtype)
+            self._vector_files[model] = vectors
+        return vectors
+
+    def _allocate_slot(self, item_id: str, model: str) -> int:
+        """The item's current slot, a freed one, or a new one (caller holds the lock, inside a transaction)"""
+        row = self._conn.execute(
+            "SELECT model, slot FROM item_vectors WHERE item_id = ?", (item_id,)
+        ).fetchone()
+        if row is not None:
+            if row[0] == model:
+                return row[1]
+            self._conn.execute("INSERT OR IGNORE INTO free_slots (model, slot) VALUES (?, ?)", row)
+            self._conn.execute("DELETE FROM item_vectors WHERE item_id = ?", (item_id,))
+
+        free = self._conn.execute(
+            "SELECT slot FROM free_slots WHERE model = ? ORDER BY slot LIMIT 1", (model,)
+        ).fetchone()
+        if free is not None:
+            self._conn.execute("DELETE FROM free_slots WHERE model = ? AND slot = ?", (model, free[0]))
+            return free[0]
+
+        highest = self._conn.execute(
+            "SELECT MAX(slot) FROM item_vectors WHERE model = ?", (model,)
+        ).fetchone()[0]
+        return 0 if highest is None else highest + 1
+
+    def put(self, item_id: str, user_id: str, embedding: Sequence[float], model: str) -> None:
+        """
+        Store (or replace) the embedding of one wardrobe item
+
+        Args:
+            item_id: Wardrobe item UUID
+            user_id: Owner's UUID
+            embedding: Normalized image embedding
+            model: Model the embedding was computed with
+        """
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        item_id = str(item_id)
+        with self._lock:
+            vectors = self._vectors(model, dim=vector.shape[0])
+            if vectors.dim != vector.shape[0]:
+                raise ValueError(f"Expected a {vectors.dim}-d embedding for {model}, got {vector.shape[0]}-d")
+
+            # IMMEDIATE takes the write lock up front, so concurrent processes never share a slot
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                slot = self._allocate_slot(item_id, model)
+                vectors.write([slot], vector[None, :])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO item_vectors (item_id, user_id, model, slot, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (item_id, str(user_id), model, slot, datetime.now().isoformat())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _read(self, rows: List[Tuple[str, int]], model: str) -> Tuple[List[str], np.ndarray]:
+        """Load the vectors for (item_id, slot) rows (caller holds the lock)"""
+        vectors = self._vectors(model)
+        if vectors is None or not rows:
+            return [], np.zeros((0, vectors.dim if vectors else 0), dtype=np.float32)
+        return [row[0] for row in rows], vectors.read([row[1] for row in rows])
+
+    def get_many(self, item_ids: Sequence[str], model: str) -> Dict[str, np.ndarray]:
+        """
+        Look up stored embeddings
+
+        Args:
+            item_ids: Wardrobe item UUIDs
+            model: Only embeddings computed with this model are returned
+
+        Returns:
+            Dictionary of {item_id: float32 vector} for the items that have one
+        """
+        found = {}
+        ids = [str(item_id) for item_id in item_ids]
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT item_id, slot FROM item_vectors WHERE model = ? AND item_id IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                found_ids, matrix = self._read(rows, model)
+            found.update(zip(found_ids, matrix))
+        return found
+
+    def get_user_embeddings(self, user_id: str, model: str) -> Tuple[List[str], np.ndarray]:
+        """
+        All stored embeddings for one user
+
+        Returns:
+            Tuple of (item_ids, matrix of shape (len(item_ids), dim))
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, slot FROM item_vectors WHERE user_id = ? AND model = ? ORDER BY slot",
+                (str(user_id), model)
+            ).fetchall()
+            return self._read(rows, model)
+
+    def get_embedding(self, item_id: str, model: str) -> Optional[Tuple[str, np.ndarray]]:
+        """
+        Stored embedding of one item
+
+        Returns:
+            Tuple of (user_id, vector), or None if the item has no embedding
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_id, slot FROM item_vectors WHERE item_id = ? AND model = ?",
+                (str(item_id), model)
+            ).fetchone()
+            if row is None:
+                return None
+            _, matrix = self._read([(str(item_id), row[1])], model)
+        return row[0], matrix[0]
+
+    def user_version(self, user_id: str, model: str) -> Tuple[int, str]:
+        """
+        Cheap fingerprint of a user's embeddings, changes on every put or delete
+
+        Returns:
+            Tuple of (item count, latest update timestamp)
+        """
+        with self._lock:
+            count, latest = self._conn.execute(
+                "SELECT COUNT(*), MAX(updated_at) FROM item_vectors WHERE user_id = ? AND model = ?",
+                (str(user_id), model)
+            ).fetchone()
+        return int(count), latest or ""
+
+    def put_hash(self, item_id: str, user_id: str, image_hash: int) -> None:
+        """Store the perceptual hash of one wardrobe item"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO item_hashes (item_id, user_id, image_hash) VALUES (?, ?, ?)",
+                (str(item_id), str(user_id), f"{image_hash:016x}")
+            )
+
+    def get_user_hashes(self, user_id: str) -> Dict[str, int]:
+        """All stored perceptual hashes of one user as {item_id: hash}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, image_hash FROM item_hashes WHERE user_id = ?",
+                (str(user_id),)
+            ).fetchall()
+        return {item_id: int(image_hash, 16) for item_id, image_hash in rows}
+
+    def delete(self, item_id: str) -> None:
+        """Forget the embedding and hash of a deleted item"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT model, slot FROM item_vectors WHERE item_id = ?", (str(item_id),)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("INSERT OR IGNORE INTO free_slots (model, slot) VALUES (?, ?)", row)
+                    self._conn.execute("DELETE FROM item_vectors WHERE item_id = ?", (str(item_id),))
+                self._conn.execute("DELETE FROM item_hashes WHERE item_id = ?", (str(item_id),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict:
+        """Item counts and storage footprint per model"""
+        with self._lock:
+            counts = self._conn.execute(
+                "SELECT model, COUNT(*) FROM item_vectors GROUP BY model"
+            ).fetchall()
+            result = {}
+            for model, count in counts:
+                vectors = self._vectors(model)
+                result[model] = {
+                    "items": count,
+                    "dtype": vectors.dtype if vectors else None,
+                    "dim": vectors.dim if vectors else None,
+                    "bytes": vectors.nbytes(count) if vectors else 0
+                }
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            for vectors in self._vector_files.values():
+                vectors.close()
+            self._vector_files.clear()
+            self._conn.close()
+
+
+# Global instance (lazy loaded)
+_embedding_store: Optional[EmbeddingStore] = None
+
+def get_embedding_store() -> EmbeddingStore:
+    """Get or create the shared embedding store"""
+    global _embedding_store
+    if _embedding_store is None:
+        _embedding_store = EmbeddingStore(os.getenv("EMBEDDING_STORE_PATH", DEFAULT_EMBEDDING_STORE_PATH))
+    return _embedding_store
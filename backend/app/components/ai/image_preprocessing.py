@@ -0,0 +1,157 @@
+"""
+Image Preprocessing for CLIP
+Decodes uploads close to the model's input size and builds pixel tensors directly.
+
+CLIP only looks at a 224x224 center crop, but phone photos are 12+ megapixels.
+JPEGs are decoded with draft mode (the decoder's built-in 1/2, 1/4 or 1/8
+scaling), other formats are reduced right after decode, EXIF orientation is
+applied, and the normalized tensor is produced in one step instead of going
+through CLIPProcessor's generic image pipeline.
+"""
+
+import io
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image, ImageOps
+
+# Fallback CLIP preprocessing constants (used if the processor config is unusual)
+DEFAULT_SHORTEST_EDGE = 224
+DEFAULT_CROP_SIZE = (224, 224)
+DEFAULT_IMAGE_MEAN = (0.48145466, 0.4578275, 0.40821073)
+DEFAULT_IMAGE_STD = (0.26862954, 0.26130258, 0.27577711)
+
+# Keep at least this much resolution headroom over the target before resizing
+REDUCE_HEADROOM = 2
+
+
+def _size_value(size: Any, key: str) -> Optional[int]:
+    """Read a field from a processor size config (dict in older transformers, SizeDict in newer)"""
+    if size is None:
+        return None
+    if isinstance(size, dict):
+        return size.get(key)
+    return getattr(size, key, None)
+
+
+class ClipImageConfig:
+    """The resize/crop/normalize settings of a CLIP image processor"""
+
+    def __init__(
+        self,
+        shortest_edge: int = DEFAULT_SHORTEST_EDGE,
+        crop_size: Tuple[int, int] = DEFAULT_CROP_SIZE,
+        image_mean: Tuple[float, ...] = DEFAULT_IMAGE_MEAN,
+        image_std: Tuple[float, ...] = DEFAULT_IMAGE_STD,
+        resample: int = Image.BICUBIC
+    ):
+        self.shortest_edge = shortest_edge
+        self.crop_height, self.crop_width = crop_size
+        mean = np.asarray(image_mean, dtype=np.float32)
+        std = np.asarray(image_std, dtype=np.float32)
+        # (x / 255 - mean) / std folded into one multiply-add
+        self._scale = 1.0 / (255.0 * std)
+        self._offset = -mean / std
+        self.resample = resample
+
+    @classmethod
+    def from_processor(cls, processor) -> Optional["ClipImageConfig"]:
+        """
+        Read the settings from a CLIPProcessor (or its image processor)
+
+        Returns:
+            ClipImageConfig, or None when the processor does not follow the
+            standard CLIP resize-shortest-edge + center-crop recipe
+        """
+        image_processor = getattr(processor, "image_processor", processor)
+        try:
+            shortest_edge = _size_value(image_processor.size, "shortest_edge")
+            crop_height = _size_value(image_processor.crop_size, "height")
+            crop_width = _size_value(image_processor.crop_size, "width")
+            if not (shortest_edge and crop_height and crop_width):
+                return None
+            if not (image_processor.do_resize and image_processor.do_center_crop
+                    and image_processor.do_rescale and image_processor.do_normalize):
+                return None
+            if abs(image_processor.rescale_factor - 1.0 / 255.0) > 1e-9:
+                return None
+            return cls(
+                shortest_edge=shortest_edge,
+                crop_size=(crop_height, crop_width),
+                image_mean=tuple(image_processor.image_mean),
+                image_std=tuple(image_processor.image_std),
+                resample=int(getattr(image_processor, "resample", Image.BICUBIC))
+            )
+        except AttributeError:
+            return None
+
+    @property
+    def min_decode_size(self) -> int:
+        """Smallest short side worth decoding to"""
+        return max(self.shortest_edge, self.crop_height, self.crop_width)
+
+    def to_array(self, image: Image.Image) -> np.ndarray:
+        """Resize, center-crop and normalize one RGB image into a (3, H, W) float32 array"""
+        width, height = image.size
+        short, long = (width, height) if width <= height else (height, width)
+        new_short = self.shortest_edge
+        new_long = int(new_short * long / short)
+        new_size = (new_short, new_long) if width <= height else (new_long, new_short)
+        if new_size != image.size:
+            image = image.resize(new_size, resample=self.resample)
+
+        left = (image.size[0] - self.crop_width) // 2
+        top = (image.size[1] - self.crop_height) // 2
+        image = image.crop((left, top, left + self.crop_width, top + self.crop_height))
+
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels = pixels * self._scale + self._offset
+        return pixels.transpose(2, 0, 1)
+
+
+def load_image_for_clip(image, min_size: int = DEFAULT_SHORTEST_EDGE) -> Image.Image:
+    """
+    Decode an image at reduced resolution, upright, as RGB
+
+    Args:
+        image: PIL Image, raw bytes, or path to an image file
+        min_size: The short side is kept at or above this many pixels
+
+    Returns:
+        RGB PIL Image whose short side is between min_size and a few times min_size
+    """
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+
+    source = io.BytesIO(image) if isinstance(image, (bytes, bytearray, memoryview)) else image
+    with Image.open(source) as opened:
+        target = min_size * REDUCE_HEADROOM
+        if opened.format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale (never below target)
+            opened.draft("RGB", (target, target))
+        decoded = ImageOps.exif_transpose(opened)
+
+        # Formats without draft support: cheap box reduction right after decode
+        factor = min(decoded.size) // target
+        if factor >= 2:
+            decoded = decoded.reduce(factor)
+
+        return decoded.convert("RGB")
+
+
+def images_to_pixel_values(images: List[Image.Image], processor) -> torch.Tensor:
+    """
+    Stack RGB images into the normalized pixel tensor a CLIP model expects
+
+    Args:
+        images: RGB PIL Images
+        processor: CLIPProcessor whose image settings should be matched
+
+    Returns:
+        Tensor of shape (N, 3, H, W)
+    """
+    config = ClipImageConfig.from_processor(processor)
+    if config is None:
+        return processor(images=images, return_tensors="pt")["pixel_values"]
+    return torch.from_numpy(np.stack([config.to_array(image) for image in images]))
@@ -0,0 +1,172 @@
+"""
+Dynamic Micro-Batching for Model Inference
+Coalesces images submitted by concurrent requests into one batched forward pass.
+
+Requests arriving within INFERENCE_BATCH_MAX_WAIT_MS of each other (up to
+INFERENCE_BATCH_MAX_SIZE images) share a single Fashion-CLIP pass, and each
+caller gets back only its own result.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.components.ai.inference_executor import run_inference
+
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_MAX_SIZE", "16"))
+DEFAULT_MAX_WAIT_MS = float(os.getenv("INFERENCE_BATCH_MAX_WAIT_MS", "10"))
+
+
+class InferenceBatcher:
+    """Collect single-image requests and run them through a batch function"""
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        name: str = "inference"
+    ):
+        """
+        Args:
+            process_batch: Function (blocking or async) mapping a list of inputs to a list of results
+            max_batch_size: Largest number of inputs per batch
+            max_wait_ms: How long the first request in a batch waits for company
+            name: Label used in logs and metrics
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._batch_size_counts: Dict[int, int] = {}
+        self._total_queue_wait = 0.0
+        self._total_batch_seconds = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one input and wait for its result
+
+        Args:
+            item: Input accepted by process_batch
+
+        Returns:
+            The result process_batch produced for this input
+        """
+        self._ensure_worker()
+
+        future = self._loop.create_future()
+        self._submitted += 1
+        await self._queue.put((item, future, time.perf_counter()))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+
+        return await future
+
+    def _ensure_worker(self) -> None:
+        """Start (or restart) the collector task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+
+        # Keep the queue if the collector merely died, so requests already
+        # waiting in it are picked up by the new task; a queue is bound to
+        # its loop, so only a new loop gets a new one
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue()
+        self._loop = loop
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Collector loop: wait for a request, gather company, run the batch"""
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = self._loop.time() + self.max_wait
+
+                while len(batch) < self.max_batch_size:
+                    # Take whatever is already queued without waiting
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._process(batch)
+            except BaseException:
+                # The collector is going away; don't leave its callers waiting forever
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+                raise
+
+    async def _process(self, batch: List) -> None:
+        """Run one batch off the event loop and hand results back to callers"""
+        started = time.perf_counter()
+        items = [item for item, _, _ in batch]
+        self._total_queue_wait += sum(started - queued_at for _, _, queued_at in batch)
+
+        try:
+            results = await self._run_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} inputs")
+        except Exception as e:
+            print(f"[ERROR] {self.name} batch of {len(items)} failed: {e}")
+            self._failed += len(items)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._batches += 1
+            self._batch_size_counts[len(items)] = self._batch_size_counts.get(len(items), 0) + 1
+            self._total_batch_seconds += time.perf_counter() - started
+
+        self._completed += len(items)
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have gone away (client disconnect) while we worked
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_batch(self, items: List[Any]) -> List[Any]:
+        """Run process_batch without blocking the event loop"""
+        if asyncio.iscoroutinefunction(self.process_batch):
+            return await self.process_batch(items)
+        return await run_inference(self.process_batch, items)
+
+    def _batched_items(self) -> int:
+        return sum(size * count for size, count in self._batch_size_counts.items())
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch-size metrics"""
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self._max_queue_depth,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_items() / self._batches, 2) if self._batches else 0.0,
+            "batch_size_counts": dict(sorted(self._batch_size_counts.items())),
+            "avg_queue_wait_ms": round(self._total_queue_wait / self._batched_items() * 1000.0, 2) if self._batches else 0.0,
+            "avg_batch_ms": round(self._total_batch_seconds / self._batches * 1000.0, 2) if self._batches else 0.0
+        }
@@ -0,0 +1,203 @@
+"""
+Inference Executor
+Runs Fashion-CLIP and CLIP inference off the asyncio event loop.
+
+Model calls take hundreds of milliseconds of CPU time. Running them inline in an
+async handler stalls every other request in the process (including /health), so
+they go through a small dedicated thread pool instead. PyTorch releases the GIL
+inside its kernels, so the event loop keeps serving I/O while inference runs.
+
+With INFERENCE_MODE=process the model wrappers below hand the work to the
+worker processes in inference_workers instead.
+"""
+
+import asyncio
+import copy
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.components.ai.inference_workers import (
+    process_mode_enabled,
+    get_inference_worker_pool,
+    shutdown_inference_worker_pool
+)
+
+# Number of inference calls allowed to run at the same time
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "1"))
+
+# Optional cap on PyTorch intra-op threads (defaults to PyTorch's own choice)
+INFERENCE_TORCH_THREADS = os.getenv("INFERENCE_TORCH_THREADS")
+
+_inference_executor = None
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    """Get or create the bounded inference thread pool"""
+    global _inference_executor
+    if _inference_executor is None:
+        if INFERENCE_TORCH_THREADS:
+            import torch
+            torch.set_num_threads(int(INFERENCE_TORCH_THREADS))
+
+        _inference_executor = ThreadPoolExecutor(
+            max_workers=max(1, INFERENCE_THREADS),
+            thread_name_prefix="inference"
+        )
+    return _inference_executor
+
+
+def shutdown_inference_executor() -> None:
+    """Stop the inference thread pool and worker processes (called on server shutdown)"""
+    global _inference_executor
+    shutdown_inference_worker_pool()
+    if _inference_executor is not None:
+        _inference_executor.shutdown(wait=False, cancel_futures=True)
+        _inference_executor = None
+
+
+async def run_inference(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking model call on the inference executor and await its result
+
+    Args:
+        func: Blocking callable
+        *args, **kwargs: Arguments forwarded to func
+
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_inference_executor(),
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+async def analyze_image_async(image_bytes: bytes) -> Dict[str, Any]:
+    """Awaitable wrapper around clip_insights.analyze_image"""
+    if process_mode_enabled():
+        return await get_inference_worker_pool().analyze_image(image_bytes)
+    from app.components.ai.clip_insights import analyze_image
+    return await run_inference(analyze_image, image_bytes)
+
+
+async def categorize_wardrobe_item_async(image) -> Dict:
+    """Awaitable wrapper around WardrobeClassifier.categorize_wardrobe_item"""
+    results = await categorize_wardrobe_items_async([image])
+    return results[0]
+
+
+async def categorize_wardrobe_items_async(images: List) -> List[Dict]:
+    """Awaitable wrapper around WardrobeClassifier.categorize_wardrobe_items"""
+    if process_mode_enabled():
+        return await get_inference_worker_pool().categorize_wardrobe_items(images)
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+    return await run_inference(get_wardrobe_classifier().categorize_wardrobe_items, images)
+
+
+async def categorize_embeddings_async(image_embeds, colors: Optional[List] = None) -> List[Dict]:
+    """
+    Awaitable wrapper around WardrobeClassifier.categorize_embeddings
+
+    Args:
+        image_embeds: Normalized image embeddings, array-like of shape (N, embed_dim)
+        colors: Optional per-item {"color", "secondary_color"} to keep
+    """
+    import torch
+    image_embeds = torch.as_tensor(image_embeds, dtype=torch.float32)
+    if process_mode_enabled():
+        return await get_inference_worker_pool().categorize_embeddings(image_embeds, colors)
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+    return await run_inference(get_wardrobe_classifier().categorize_embeddings, image_embeds, colors)
+
+
+async def encode_text_query_async(query: str) -> List[float]:
+    """Awaitable wrapper around WardrobeClassifier.encode_text_query"""
+    if process_mode_enabled():
+        return await get_inference_worker_pool().encode_text_query(query)
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+    return await run_inference(get_wardrobe_classifier().encode_text_query, query)
+
+
+async def categorize_wardrobe_items_cached(images: List) -> List[Dict]:
+    """
+    Categorize wardrobe images, running Fashion-CLIP only for unseen pixels
+
+    Images are decoded and hashed first; cache hits (and repeats within the
+    same call) are answered without inference, and new results are stored.
+
+    Args:
+        images: List of PIL Images, raw image bytes or image paths
+
+    Returns:
+        List of classification dictionaries, in the same order as images
+    """
+    from app.components.ai.classification_cache import classification_key, get_classification_cache
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+
+    classifier = get_wardrobe_classifier()
+    cache = get_classification_cache()
+
+    def lookup():
+        decoded, results = classifier.decode_images(images)
+        version = classifier.classification_version()
+        misses: Dict[str, Any] = {}
+        pending = []
+        for index, image in decoded:
+            key = classification_key(image, version)
+            cached = cache.get(key) if key not in misses else None
+            if cached is not None:
+                results[index] = cached
+                continue
+            misses.setdefault(key, image)
+            pending.append((index, key))
+        return results, misses, pending
+
+    results, misses, pending = await run_inference(lookup)
+    if not misses:
+        return results
+
+    keys = list(misses)
+    classifications = dict(zip(keys, await categorize_wardrobe_items_async([misses[key] for key in keys])))
+
+    def store():
+        for key, classification in classifications.items():
+            cache.put(key, classification)
+
+    await run_inference(store)
+
+    for index, key in pending:
+        results[index] = copy.deepcopy(classifications[key])
+    return results
+
+
+async def warmup_models() -> Dict[str, Dict]:
+    """
+    Load both models and run one dummy inference each
+
+    Returns:
+        Per-model load state after warmup
+    """
+    if process_mode_enabled():
+        await get_inference_worker_pool().warmup()
+    else:
+        from app.components.ai.wardrobe_classifier import warmup_fashion_model
+        from app.components.ai.clip_insights import warmup_clip_model
+        await run_inference(warmup_fashion_model)
+        await run_inference(warmup_clip_model)
+    return get_model_status()
+
+
+def get_model_status() -> Dict[str, Dict]:
+    """Per-model load state for the readiness endpoint"""
+    if process_mode_enabled():
+        return get_inference_worker_pool().model_status()
+
+    from app.components.ai.wardrobe_classifier import get_fashion_model_status
+    from app.components.ai.clip_insights import get_clip_model_status
+    return {
+        "fashion_clip": get_fashion_model_status(),
+        "clip": get_clip_model_status()
+    }
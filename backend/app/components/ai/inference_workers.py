@@ -0,0 +1,316 @@
+"""
+Inference Worker Processes
+Hosts the Fashion-CLIP and CLIP models in separate worker processes.
+
+Enabled with INFERENCE_MODE=process. The API process only decodes and
+preprocesses images; the resulting pixel tensors are written into a shared
+memory block and the worker maps that block directly instead of receiving a
+pickled copy. Only the small result dictionaries travel back through the pipe.
+
+This keeps PyTorch's intra-op threads and the GIL out of the FastAPI process,
+and lets inference capacity (INFERENCE_WORKER_PROCESSES) scale separately
+from uvicorn workers.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread").lower()
+INFERENCE_WORKER_PROCESSES = int(os.getenv("INFERENCE_WORKER_PROCESSES", "2"))
+# PyTorch intra-op threads per worker; 0 keeps PyTorch's default
+INFERENCE_WORKER_TORCH_THREADS = int(os.getenv("INFERENCE_WORKER_TORCH_THREADS", "0"))
+# Load the models in each worker process before it takes its first task
+INFERENCE_WORKER_WARMUP = os.getenv("WARMUP_MODELS", "false").lower() in ("1", "true", "yes")
+
+
+def process_mode_enabled() -> bool:
+    """True when inference should run in dedicated worker processes"""
+    return INFERENCE_MODE == "process"
+
+
+# ====================================
+# Worker side
+# ====================================
+
+def _init_worker(torch_threads: int, warmup: bool) -> None:
+    """Initializer for each worker process"""
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+    print(f"[WORKER] Inference worker {os.getpid()} started", flush=True)
+    if warmup:
+        # Every process loads its models before its first task, whichever
+        # process the pool hands that task to
+        try:
+            _warmup_worker()
+        except Exception as e:
+            # Never break the pool; the model state reports the failure
+            print(f"[ERROR] Inference worker {os.getpid()} warmup failed: {e}", flush=True)
+
+
+def _attach_shared_tensor(name: str, shape: Tuple[int, ...]) -> Tuple[SharedMemory, torch.Tensor]:
+    """Map a float32 tensor that lives in a shared memory block (no copy)"""
+    # Spawned workers share the API process's resource tracker, so the block
+    # stays registered once and the API process's unlink() cleans it up
+    shm = SharedMemory(name=name)
+
+    count = 1
+    for dim in shape:
+        count *= dim
+    tensor = torch.frombuffer(shm.buf, dtype=torch.float32, count=count).view(shape)
+    return shm, tensor
+
+
+def _run_on_shared_tensor(func: Callable[[torch.Tensor], Any], name: str, shape: Tuple[int, ...]) -> Any:
+    shm, pixel_values = _attach_shared_tensor(name, shape)
+    try:
+        return func(pixel_values)
+    finally:
+        # Drop the view before closing, otherwise the buffer is still exported
+        del pixel_values
+        shm.close()
+
+
+def _categorize_shared(name: str, shape: Tuple[int, ...], colors: Optional[List] = None) -> Tuple[List[Dict], Dict]:
+    """Worker task: categorize a batch of wardrobe images (returns results and stage timings)"""
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+    classifier = get_wardrobe_classifier()
+    results = _run_on_shared_tensor(
+        lambda pixel_values: classifier.categorize_pixel_values(pixel_values, colors), name, shape
+    )
+    return results, classifier.stage_timings.drain()
+
+
+def _categorize_embeddings_shared(name: str, shape: Tuple[int, ...], colors: Optional[List] = None) -> Tuple[List[Dict], Dict]:
+    """Worker task: categorize items from stored image embeddings (returns results and stage timings)"""
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+    classifier = get_wardrobe_classifier()
+    results = _run_on_shared_tensor(
+        lambda image_embeds: classifier.categorize_embeddings(image_embeds, colors), name, shape
+    )
+    return results, classifier.stage_timings.drain()
+
+
+def _encode_text_query(query: str) -> List[float]:
+    """Worker task: embed a wardrobe search query"""
+    from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+    return get_wardrobe_classifier().encode_text_query(query)
+
+
+def _analyze_shared(name: str, shape: Tuple[int, ...]) -> Dict[str, Any]:
+    """Worker task: CLIP fashion insights for one profile image"""
+    from app.components.ai.clip_insights import analyze_pixel_values
+    return _run_on_shared_tensor(analyze_pixel_values, name, shape)
+
+
+def _warmup_worker() -> Dict[str, Any]:
+    """Worker task: load both models and run one dummy inference each"""
+    from app.components.ai.wardrobe_classifier import warmup_fashion_model
+    from app.components.ai.clip_insights import warmup_clip_model
+    return {
+        "pid": os.getpid(),
+        "fashion_clip": warmup_fashion_model(),
+        "clip": warmup_clip_model()
+    }
+
+
+# ====================================
+# API process side
+# ====================================
+
+class InferenceWorkerPool:
+    """Pool of model-hosting processes fed through shared memory"""
+
+    def __init__(
+        self,
+        num_workers: int = INFERENCE_WORKER_PROCESSES,
+        torch_threads: int = INFERENCE_WORKER_TORCH_THREADS,
+        warmup_on_start: bool = INFERENCE_WORKER_WARMUP
+    ):
+        self.num_workers = max(1, num_workers)
+        # spawn: never fork a process that already holds PyTorch thread pools
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(torch_threads, warmup_on_start)
+        )
+        # Latest warmup report per worker pid that has reported
+        self._worker_status: Dict[int, Dict[str, Any]] = {}
+        self._warming_up = False
+
+    async def _submit(self, task: Callable, pixel_values: torch.Tensor, *args) -> Any:
+        """Copy pixel_values into shared memory and run task on a worker (extra args are pickled)"""
+        pixel_values = pixel_values.contiguous().to(torch.float32)
+        shape = tuple(pixel_values.shape)
+
+        shm = SharedMemory(create=True, size=max(1, pixel_values.numel() * 4))
+        try:
+            shared = torch.frombuffer(shm.buf, dtype=torch.float32, count=pixel_values.numel()).view(shape)
+            shared.copy_(pixel_values)
+            del shared
+
+            future = self._executor.submit(task, shm.name, shape, *args)
+            result = asyncio.wrap_future(future)
+            try:
+                return await asyncio.shield(result)
+            except asyncio.CancelledError:
+                # A task a worker has already started still maps the block;
+                # let it finish before the block is unlinked underneath it
+                if not future.cancel():
+                    await asyncio.wait({result})
+                raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def categorize_wardrobe_items(self, images: List) -> List[Dict]:
+        """
+        Categorize wardrobe images on a worker process
+
+        Args:
+            images: List of PIL Images, raw image bytes or image paths
+
+        Returns:
+            List of classification dictionaries, in the same order as images
+        """
+        from app.components.ai.inference_executor import run_inference
+        from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+
+        classifier = get_wardrobe_classifier()
+
+        def prepare():
+            decoded, results = classifier.decode_images(images)
+            if not decoded or classifier.processor is None:
+                return decoded, results, None, None
+            decoded_images = [image for _, image in decoded]
+            return (
+                decoded,
+                results,
+                classifier.preprocess_images(decoded_images),
+                classifier.extract_image_colors(decoded_images)
+            )
+
+        # Decoding, resizing and color extraction are CPU work too; keep them off the event loop
+        decoded, results, pixel_values, colors = await run_inference(prepare)
+
+        if pixel_values is None:
+            for index, _ in decoded:
+                results[index] = classifier.low_confidence_result()
+            return results
+
+        try:
+            classifications, timings = await self._submit(_categorize_shared, pixel_values, colors)
+            # Report worker-side stage timings through the API process's classifier
+            classifier.stage_timings.merge(timings)
+        except Exception as e:
+            print(f"[ERROR] Inference worker failed: {e}")
+            classifications = [classifier.error_result() for _ in decoded]
+
+        for (index, _), classification in zip(decoded, classifications):
+            results[index] = classification
+        return results
+
+    async def categorize_embeddings(self, image_embeds: torch.Tensor, colors: Optional[List] = None) -> List[Dict]:
+        """Categorize items from stored image embeddings on a worker process"""
+        from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+
+        classifications, timings = await self._submit(_categorize_embeddings_shared, image_embeds, colors)
+        get_wardrobe_classifier().stage_timings.merge(timings)
+        return classifications
+
+    async def encode_text_query(self, query: str) -> List[float]:
+        """Embed a search query with the text tower on a worker process"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _encode_text_query, query)
+
+    async def analyze_image(self, image_bytes: bytes) -> Dict[str, Any]:
+        """CLIP fashion insights for a profile image, computed on a worker process"""
+        from app.components.ai.inference_executor import run_inference
+        from app.components.ai.clip_insights import get_processor, preprocess_image, error_insights
+
+        try:
+            processor = get_processor()
+            if processor is None:
+                raise RuntimeError("CLIP processor not available")
+            pixel_values = await run_inference(preprocess_image, image_bytes, processor)
+            return await self._submit(_analyze_shared, pixel_values)
+        except Exception as e:
+            print(f"Error analyzing image with CLIP: {e}")
+            return error_insights(e)
+
+    async def warmup(self) -> None:
+        """
+        Load the models in the workers and collect their load state
+
+        One task per worker is submitted at once. The pool may hand two of
+        them to the same process, so this is not relied on to reach every
+        worker: each process also warms up in its initializer before taking
+        any task, and readiness only counts the processes that reported.
+        """
+        self._warming_up = True
+        loop = asyncio.get_running_loop()
+        try:
+            reports = await asyncio.gather(
+                *[loop.run_in_executor(self._executor, _warmup_worker) for _ in range(self.num_workers)],
+                return_exceptions=True
+            )
+            for report in reports:
+                if isinstance(report, Exception):
+                    print(f"[ERROR] Inference worker warmup failed: {report}")
+                    continue
+                self._worker_status[report["pid"]] = report
+        finally:
+            self._warming_up = False
+
+    def model_status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model load state aggregated across the worker processes that reported"""
+        status = {}
+        for model in ("fashion_clip", "clip"):
+            reports = [worker[model] for worker in self._worker_status.values()]
+            states = {report["state"] for report in reports}
+            if "failed" in states:
+                state = "failed"
+            elif reports and states == {"ready"}:
+                state = "ready"
+            elif self._warming_up or "loading" in states:
+                state = "loading"
+            else:
+                state = "not_loaded"
+            status[model] = {
+                "state": state,
+                "workers_ready": sum(1 for report in reports if report["state"] == "ready"),
+                "workers_reported": len(reports),
+                "workers": self.num_workers,
+                "warmed_up": bool(reports) and all(report.get("warmed_up") for report in reports),
+                "error": next((report["error"] for report in reports if report.get("error")), None)
+            }
+        return status
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance (lazy loaded)
+_inference_worker_pool: Optional[InferenceWorkerPool] = None
+
+def get_inference_worker_pool() -> InferenceWorkerPool:
+    """Get or create the inference worker pool"""
+    global _inference_worker_pool
+    if _inference_worker_pool is None:
+        print(f"[WORKER] Starting {INFERENCE_WORKER_PROCESSES} inference worker processes...")
+        _inference_worker_pool = InferenceWorkerPool()
+    return _inference_worker_pool
+
+
+def shutdown_inference_worker_pool() -> None:
+    """Stop the worker processes (called on server shutdown)"""
+    global _inference_worker_pool
+    if _inference_worker_pool is not None:
+        _inference_worker_pool.shutdown()
+        _inference_worker_pool = None
@@ -0,0 +1,392 @@
+"""
+ONNX Runtime Inference Backend
+Optional CPU backend for the Fashion-CLIP and CLIP models.
+
+CLIP_BACKEND selects how the models run:
+- "torch" (default): PyTorch eager model
+- "onnx": vision and text towers exported to ONNX, run with onnxruntime
+- "onnx-int8": same, with weights dynamically quantized to INT8
+
+Exported models are written to ONNX_MODEL_DIR on first use and reused after
+that, so later starts skip loading the PyTorch weights entirely. If onnxruntime
+is not installed or export fails, the PyTorch model is used instead.
+
+Check that a backend still agrees with the eager model before rolling it out:
+
+    python -m app.components.ai.onnx_backend parity --model fashion --backend onnx-int8 --images ../assets
+"""
+
+import argparse
+import inspect
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+CLIP_BACKEND = os.getenv("CLIP_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", ".cache/onnx")
+# Intra-op threads per onnxruntime session; 0 lets onnxruntime decide
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+SUPPORTED_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def as_feature_tensor(features) -> torch.Tensor:
+    """
+    Normalize the return value of get_image_features / get_text_features
+
+    Older transformers releases return the projected embeddings directly,
+    newer ones wrap them in a model output with the projection in pooler_output.
+    """
+    if isinstance(features, torch.Tensor):
+        return features
+    return features.pooler_output
+
+
+def model_cache_name(model_name: str, backend: str = CLIP_BACKEND) -> str:
+    """
+    Name used to key cached embeddings for a model
+
+    Embeddings from a quantized model are close to, but not identical to, the
+    eager model's, so each backend gets its own cache entries.
+    """
+    if backend == "torch":
+        return model_name
+    return f"{model_name}@{backend}"
+
+
+class _VisionTower(torch.nn.Module):
+    """Export wrapper: pixel_values -> projected image embeddings"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return as_feature_tensor(self.model.get_image_features(pixel_values=pixel_values))
+
+
+class _TextTower(torch.nn.Module):
+    """Export wrapper: token ids -> projected text embeddings"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return as_feature_tensor(
+            self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+        )
+
+
+class OnnxCLIPModel:
+    """
+    onnxruntime-backed stand-in for CLIPModel
+
+    Implements the subset of the CLIPModel interface the classifiers use:
+    get_image_features, get_text_features and logit_scale.
+    """
+
+    def __init__(self, vision_path: Path, text_path: Path, logit_scale: float, backend: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS > 0:
+            options.intra_op_num_threads = ONNX_THREADS
+
+        providers = ["CPUExecutionProvider"]
+        self._vision = ort.InferenceSession(str(vision_path), options, providers=providers)
+        self._text = ort.InferenceSession(str(text_path), options, providers=providers)
+        self.logit_scale = torch.tensor(logit_scale)
+        self.backend = backend
+
+    def get_image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        outputs = self._vision.run(None, {"pixel_values": pixel_values.detach().cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+    def get_text_features(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        outputs = self._text.run(None, {
+            "input_ids": input_ids.detach().cpu().numpy().astype("int64"),
+            "attention_mask": attention_mask.detach().cpu().numpy().astype("int64")
+        })
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+    def parameters(self):
+        return iter(())
+
+
+def _artifact_dir(model_name: str) -> Path:
+    return Path(ONNX_MODEL_DIR) / model_name.replace("/", "__")
+
+
+def _artifact_paths(model_name: str, backend: str) -> Dict[str, Path]:
+    directory = _artifact_dir(model_name)
+    suffix = ".int8.onnx" if backend == "onnx-int8" else ".onnx"
+    return {
+        "vision": directory / f"vision{suffix}",
+        "text": directory / f"text{suffix}",
+        "meta": directory / "meta.json"
+    }
+
+
+def _torch_onnx_export(module: torch.nn.Module, args: tuple, path: Path, **kwargs) -> None:
+    """torch.onnx.export using the TorchScript exporter on every torch version"""
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+    torch.onnx.export(module, args, str(path), opset_version=17, do_constant_folding=True, **kwargs)
+
+
+@contextmanager
+def _atomic_output(path: Path):
+    """
+    Yield a temporary path next to path and move it into place on success
+
+    Several worker processes may export at once; each writes its own file and
+    the rename is atomic, so a reader never loads a half-written model.
+    """
+    temp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def export_onnx(model, model_name: str, backend: str) -> Dict[str, Path]:
+    """
+    Export the vision and text towers of a CLIPModel to ONNX
+
+    Args:
+        model: PyTorch CLIPModel in eval mode
+        model_name: Hugging Face model id (used for the artifact directory)
+        backend: "onnx" or "onnx-int8"
+
+    Returns:
+        Dictionary with the vision, text and meta paths
+    """
+    paths = _artifact_paths(model_name, "onnx")
+    paths["vision"].parent.mkdir(parents=True, exist_ok=True)
+
+    if not all(path.exists() for path in paths.values()):
+        print(f"[ONNX] Exporting {model_name} to {paths['vision'].parent}...", flush=True)
+        image_size = model.config.vision_config.image_size
+        with torch.no_grad(), _atomic_output(paths["vision"]) as vision_path:
+            _torch_onnx_export(
+                _VisionTower(model),
+                (torch.zeros(1, 3, image_size, image_size),),
+                vision_path,
+                input_names=["pixel_values"],
+                output_names=["image_embeds"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}}
+            )
+        dummy_ids = torch.ones(2, 8, dtype=torch.long)
+        with torch.no_grad(), _atomic_output(paths["text"]) as text_path:
+            _torch_onnx_export(
+                _TextTower(model),
+                (dummy_ids, torch.ones_like(dummy_ids)),
+                text_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["text_embeds"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "text_embeds": {0: "batch"}
+                }
+            )
+        with _atomic_output(paths["meta"]) as meta_path:
+            meta_path.write_text(json.dumps({
+                "model_name": model_name,
+                "logit_scale": float(model.logit_scale.detach().item())
+            }))
+
+    if backend == "onnx-int8":
+        int8_paths = _artifact_paths(model_name, "onnx-int8")
+        for tower in ("vision", "text"):
+            if not int8_paths[tower].exists():
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                print(f"[ONNX] Quantizing {tower} tower to INT8...", flush=True)
+                with _atomic_output(int8_paths[tower]) as int8_path:
+                    quantize_dynamic(str(paths[tower]), str(int8_path), weight_type=QuantType.QInt8)
+        return int8_paths
+
+    return paths
+
+
+def load_inference_model(
+    model_name: str,
+    load_torch_model: Callable[[], object],
+    backend: str = CLIP_BACKEND
+):
+    """
+    Load a CLIP model for inference on the configured backend
+
+    Args:
+        model_name: Hugging Face model id
+        load_torch_model: Callable returning the eager CLIPModel (eval mode)
+        backend: One of SUPPORTED_BACKENDS
+
+    Returns:
+        CLIPModel for "torch", otherwise an OnnxCLIPModel
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        print(f"[WARNING] Unknown CLIP_BACKEND '{backend}', using torch")
+        backend = "torch"
+
+    if backend == "torch":
+        return load_torch_model()
+
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("[WARNING] onnxruntime is not installed, using the PyTorch model")
+        return load_torch_model()
+
+    torch_model = None
+    try:
+        paths = _artifact_paths(model_name, backend)
+        if not all(path.exists() for path in paths.values()):
+            torch_model = load_torch_model()
+            paths = export_onnx(torch_model, model_name, backend)
+
+        meta = json.loads(paths["meta"].read_text())
+        model = OnnxCLIPModel(paths["vision"], paths["text"], meta["logit_scale"], backend)
+        print(f"[ONNX] {model_name} running on onnxruntime ({backend})", flush=True)
+        return model
+
+    except Exception as e:
+        print(f"[WARNING] ONNX backend failed for {model_name}: {e}; using the PyTorch model")
+        return torch_model if torch_model is not None else load_torch_model()
+
+
+# ====================================
+# Parity check
+# ====================================
+
+def _top1_labels(model, processor, images: List, prompts: List[str], labels: List[str]) -> List[str]:
+    inputs = processor(text=prompts, images=images, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        image_embeds = as_feature_tensor(model.get_image_features(pixel_values=inputs["pixel_values"]))
+        text_embeds = as_feature_tensor(model.get_text_features(
+            input_ids=inputs["input_ids"],
+            attention_mask=inputs["attention_mask"]
+        ))
+    image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+    text_embeds = text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+    indices = (image_embeds @ text_embeds.t()).argmax(dim=-1).tolist()
+    return [labels[i] for i in indices]
+
+
+def check_parity(
+    reference_model,
+    candidate_model,
+    processor,
+    images: List,
+    labels: List[str],
+    prompts: Optional[List[str]] = None
+) -> Dict:
+    """
+    Compare top-1 labels of a candidate backend against the eager model
+
+    Args:
+        reference_model: PyTorch CLIPModel
+        candidate_model: Model under test (e.g. OnnxCLIPModel)
+        processor: CLIPProcessor shared by both
+        images: List of RGB PIL Images
+        labels: Label names
+        prompts: Text prompts for labels (defaults to the labels themselves)
+
+    Returns:
+        Dictionary with agreement ratio and the mismatching images
+
+    Raises:
+        ValueError: If images is empty (nothing would be checked)
+    """
+    if not images:
+        raise ValueError("No images to check parity on")
+    prompts = prompts or labels
+    expected = _top1_labels(reference_model, processor, images, prompts, labels)
+    actual = _top1_labels(candidate_model, processor, images, prompts, labels)
+
+    mismatches = [
+        {"index": i, "expected": e, "actual": a}
+        for i, (e, a) in enumerate(zip(expected, actual)) if e != a
+    ]
+    return {
+        "images": len(images),
+        "agreement": (len(images) - len(mismatches)) / len(images),
+        "mismatches": mismatches
+    }
+
+
+def _main(argv: List[str]) -> int:
+    from PIL import Image
+    from transformers import CLIPModel, CLIPProcessor
+
+    parser = argparse.ArgumentParser(description="Export CLIP models to ONNX and check parity")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--model", choices=["fashion", "clip"], default="fashion")
+    parser.add_argument("--backend", choices=["onnx", "onnx-int8"], default="onnx-int8")
+    parser.add_argument("--images", default="../assets", help="Directory with the fixed parity image set")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args(argv)
+
+    # Find the parity images before loading anything; an empty set would pass trivially
+    image_paths = []
+    if args.command == "parity":
+        image_dir = Path(args.images)
+        if image_dir.is_dir():
+            image_paths = sorted(
+                p for p in image_dir.iterdir()
+                if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp")
+            )
+        if not image_paths:
+            print(f"[ERROR] No .jpg/.jpeg/.png/.webp images found in {image_dir}", file=sys.stderr)
+            return 2
+
+    if args.model == "fashion":
+        from app.components.ai.wardrobe_classifier import FASHION_CLIP_MODEL_NAME, WardrobeClassifier
+        model_name = FASHION_CLIP_MODEL_NAME
+        classifier = WardrobeClassifier()
+        labels = classifier.item_types
+        prompts = classifier.build_text_prompts(labels)
+    else:
+        from app.components.ai.clip_insights import CLIP_MODEL_NAME, FASHION_LABELS, PROMPT_TEMPLATE
+        model_name = CLIP_MODEL_NAME
+        labels = FASHION_LABELS
+        prompts = [PROMPT_TEMPLATE.format(label=label) for label in labels]
+
+    reference = CLIPModel.from_pretrained(model_name).eval()
+    paths = export_onnx(reference, model_name, args.backend)
+    if args.command == "export":
+        return 0
+
+    # Built directly: a silent fallback to the eager model would compare it with itself
+    try:
+        meta = json.loads(paths["meta"].read_text())
+        candidate = OnnxCLIPModel(paths["vision"], paths["text"], meta["logit_scale"], args.backend)
+    except Exception as e:
+        print(f"[ERROR] Could not load the {args.backend} model for {model_name}: {e}", file=sys.stderr)
+        return 2
+
+    processor = CLIPProcessor.from_pretrained(model_name)
+
+    images = [Image.open(p).convert("RGB") for p in image_paths]
+    report = check_parity(reference, candidate, processor, images, labels, prompts)
+    for mismatch in report["mismatches"]:
+        mismatch["image"] = image_paths[mismatch["index"]].name
+
+    print(json.dumps(report, indent=2))
+    return 0 if report["agreement"] >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
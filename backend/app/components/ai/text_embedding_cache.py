@@ -0,0 +1,148 @@
+"""
+Text Embedding Cache
+Keeps CLIP prompt embeddings for the fixed label sets so the text tower runs once per model.
+
+Entries are keyed by model name plus a hash of the label list and prompt template,
+kept in memory and optionally persisted to TEXT_EMBEDDING_CACHE_DIR so restarts
+skip the work. Changing a label list or template produces a new key automatically.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+# Bump when the on-disk layout or embedding computation changes
+CACHE_VERSION = 1
+
+
+def text_embedding_key(model_name: str, labels: List[str], template: str) -> str:
+    """
+    Build the cache key for a label set
+
+    Args:
+        model_name: Hugging Face model id the embeddings were computed with
+        labels: Ordered list of labels
+        template: Prompt template the labels are rendered into
+
+    Returns:
+        Filesystem-safe key string
+    """
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "labels": list(labels), "template": template},
+        sort_keys=True
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    safe_model_name = model_name.replace("/", "__")
+    return f"{safe_model_name}-{digest}"
+
+
+class TextEmbeddingCache:
+    """In-memory text embedding cache with an optional on-disk tier"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._memory: Dict[str, torch.Tensor] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        model_name: str,
+        labels: List[str],
+        template: str,
+        compute: Callable[[], torch.Tensor]
+    ) -> torch.Tensor:
+        """
+        Return cached embeddings for a label set, computing them on first use
+
+        Args:
+            model_name: Model the embeddings belong to
+            labels: Ordered list of labels
+            template: Prompt template used to render the labels
+            compute: Callable that runs the text tower and returns the embeddings
+
+        Returns:
+            Tensor of shape (len(labels), embed_dim)
+        """
+        key = text_embedding_key(model_name, labels, template)
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            # Another thread may have filled the entry while we waited
+            cached = self._memory.get(key)
+            if cached is not None:
+                return cached
+
+            embeds = self._load_from_disk(key)
+            if embeds is None:
+                embeds = compute()
+                self._save_to_disk(key, labels, template, embeds)
+
+            self._memory[key] = embeds
+            return embeds
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (disk entries are kept)"""
+        with self._lock:
+            self._memory.clear()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pt"
+
+    def _load_from_disk(self, key: str) -> Optional[torch.Tensor]:
+        if self.cache_dir is None:
+            return None
+
+        path = self._path_for(key)
+        if not path.exists():
+            return None
+
+        try:
+            entry = torch.load(path, map_location="cpu", weights_only=True)
+            if entry.get("version") != CACHE_VERSION:
+                return None
+            print(f"[CACHE] Loaded text embeddings from {path.name}")
+            return entry["embeddings"]
+        except Exception as e:
+            print(f"[WARNING] Could not read text embedding cache {path}: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, labels: List[str], template: str, embeds: torch.Tensor) -> None:
+        if self.cache_dir is None:
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path_for(key)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            torch.save(
+                {
+                    "version": CACHE_VERSION,
+                    "labels": list(labels),
+                    "template": template,
+                    "embeddings": embeds.detach().cpu()
+                },
+                temp_path
+            )
+            # Atomic rename so concurrent workers never read a partial file
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"[WARNING] Could not write text embedding cache: {e}")
+
+
+# Global instance (lazy loaded)
+_text_embedding_cache = None
+
+def get_text_embedding_cache() -> TextEmbeddingCache:
+    """Get or create the shared text embedding cache"""
+    global _text_embedding_cache
+    if _text_embedding_cache is None:
+        _text_embedding_cache = TextEmbeddingCache(os.getenv("TEXT_EMBEDDING_CACHE_DIR"))
+    return _text_embedding_cache
@@ -0,0 +1,304 @@
+"""
+Try-On Backends
+What actually renders a garment onto the user's photo.
+
+TRYON_BACKEND selects the implementation used by VirtualTryOnService:
+- "gradio" (default): the IDM-VTON Gradio Space named by TRYON_GRADIO_SPACE
+  (a self-hosted copy of the Space works the same way)
+- "local": deterministic garment-over-photo compositing, no network
+- "fake": local compositing after a random delay drawn from a log-normal
+  distribution, with optional injected failures, for load-testing
+  /wardrobe/generate-looks offline
+
+Backends only render. Timeouts, the circuit breaker and the result cache are
+handled by VirtualTryOnService around them; it falls back to a mock composite
+when a backend errors or its circuit is open, while a timed-out try-on returns
+nothing and the look keeps its instant preview.
+"""
+
+import asyncio
+import math
+import os
+import random
+import tempfile
+import threading
+from io import BytesIO
+from typing import Dict, Optional, Protocol
+
+import numpy as np
+
+TRYON_BACKEND = os.getenv("TRYON_BACKEND", "gradio").lower()
+TRYON_GRADIO_SPACE = os.getenv("TRYON_GRADIO_SPACE", "yisol/IDM-VTON")
+
+# Fake backend latency: log-normal around the median, sigma controls the tail
+# (0.5 puts p95 at ~2.3x the median); a failure rate > 0 raises on that share of calls
+TRYON_FAKE_LATENCY_MEDIAN_SECONDS = float(os.getenv("TRYON_FAKE_LATENCY_MEDIAN_SECONDS", "30"))
+TRYON_FAKE_LATENCY_SIGMA = float(os.getenv("TRYON_FAKE_LATENCY_SIGMA", "0.5"))
+TRYON_FAKE_FAILURE_RATE = float(os.getenv("TRYON_FAKE_FAILURE_RATE", "0"))
+# Seed for reproducible load tests; unset draws a new sequence per process
+TRYON_FAKE_SEED = os.getenv("TRYON_FAKE_SEED")
+
+# Longest side of the instant low-res previews shown before the full try-on; 0 disables them
+TRYON_PREVIEW_MAX_SIDE = int(os.getenv("TRYON_PREVIEW_MAX_SIDE", "384"))
+
+# Filename prefix of composited images (never stored in the try-on result cache)
+MOCK_TRYON_PREFIX = "mock_tryon_"
+
+
+class TryOnBackend(Protocol):
+    """Renders one garment onto one user photo"""
+
+    # Short identifier shown in logs and health output
+    name: str
+    # Whether results are deterministic and slow enough to be worth caching
+    cacheable: bool
+
+    @property
+    def params(self) -> Dict:
+        """Generation parameters; part of the try-on result cache key"""
+        ...
+
+    async def generate(self, user_image_path: str, garment_image_path: str) -> str:
+        """
+        Render a try-on
+
+        Args:
+            user_image_path: Path to the user's photo
+            garment_image_path: Path to the garment image
+
+        Returns:
+            Path to the result image (the caller removes it)
+
+        Raises:
+            Exception: If the try-on could not be rendered
+        """
+        ...
+
+
+def composite_tryon(user_image_path: str, garment_image_path: str) -> str:
+    """
+    Composite the garment over the center of the user's photo
+
+    Args:
+        user_image_path: Path to the user's photo
+        garment_image_path: Path to the garment image
+
+    Returns:
+        Path to the composited JPEG in the temp directory
+    """
+    from PIL import Image
+
+    user_img = Image.open(user_image_path).convert("RGBA")
+    garm_img = Image.open(garment_image_path).convert("RGBA")
+
+    # Resize garment to 60% of user width and center it
+    target_width = int(user_img.width * 0.6)
+    aspect_ratio = garm_img.height / garm_img.width
+    target_height = int(target_width * aspect_ratio)
+
+    garm_resized = garm_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+    # Paste in center
+    x = (user_img.width - target_width) // 2
+    y = (user_img.height - target_height) // 2
+
+    # Create composited image
+    result = Image.new("RGB", user_img.size, (255, 255, 255))
+    result.paste(user_img, (0, 0), user_img)
+    result.paste(garm_resized, (x, y), garm_resized)
+
+    temp_path = os.path.join(tempfile.gettempdir(), f"{MOCK_TRYON_PREFIX}{os.urandom(8).hex()}.jpg")
+    result.save(temp_path, "JPEG", quality=90)
+    return temp_path
+
+
+def composite_preview(user_image_path: str, garment_image: bytes, max_side: int = TRYON_PREVIEW_MAX_SIDE) -> bytes:
+    """
+    Fast low-res garment-over-photo composite, shown until the full try-on arrives
+
+    Works at max_side resolution and blends with NumPy in one pass; near-white
+    garment backgrounds (typical product shots) are keyed out so the preview
+    shows the garment rather than a white box. Takes a few milliseconds.
+
+    Args:
+        user_image_path: Path to the user's photo
+        garment_image: Raw garment image bytes
+        max_side: Longest side of the preview in pixels
+
+    Returns:
+        JPEG bytes
+    """
+    from PIL import Image
+
+    user_img = Image.open(user_image_path)
+    # JPEG draft mode decodes straight at reduced scale
+    user_img.draft("RGB", (max_side, max_side))
+    user_img = user_img.convert("RGB")
+    user_img.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+
+    garm_img = Image.open(BytesIO(garment_image))
+    garm_img.draft("RGB", (max_side, max_side))
+    garm_img = garm_img.convert("RGBA")
+
+    # Garment at 60% of the photo width, centered, never taller than 90% of it
+    aspect_ratio = garm_img.height / garm_img.width
+    target_width = max(1, int(user_img.width * 0.6))
+    target_height = max(1, int(target_width * aspect_ratio))
+    if target_height > user_img.height * 0.9:
+        target_height = max(1, int(user_img.height * 0.9))
+        target_width = max(1, int(target_height / aspect_ratio))
+    garm_img = garm_img.resize((target_width, target_height), Image.Resampling.BILINEAR)
+
+    garment = np.asarray(garm_img, dtype=np.float32) / 255.0
+    alpha = garment[..., 3:4]
+    # Fade out near-white pixels: fully transparent above 0.94, opaque below 0.86
+    whiteness = garment[..., :3].min(axis=2, keepdims=True)
+    alpha = alpha * np.clip((0.94 - whiteness) / 0.08, 0.0, 1.0)
+
+    canvas = np.asarray(user_img, dtype=np.float32) / 255.0
+    x = (user_img.width - target_width) // 2
+    y = (user_img.height - target_height) // 2
+    region = canvas[y:y + target_height, x:x + target_width]
+    canvas[y:y + target_height, x:x + target_width] = region * (1.0 - alpha) + garment[..., :3] * alpha
+
+    buffer = BytesIO()
+    Image.fromarray((canvas * 255.0 + 0.5).astype(np.uint8)).save(buffer, "JPEG", quality=80)
+    return buffer.getvalue()
+
+
+class GradioTryOnBackend:
+    """IDM-VTON through gradio_client"""
+
+    name = "gradio"
+    cacheable = True
+
+    def __init__(self, space: str = TRYON_GRADIO_SPACE):
+        self.space = space
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def params(self) -> Dict:
+        # IDM-VTON runs with a fixed seed, so these fully determine the output
+        return {
+            "space": self.space,
+            "api_name": "/tryon",
+            "garment_des": "Garment photo",
+            "is_checked": True,          # auto-mask
+            "is_checked_crop": True,     # auto-crop
+            "denoise_steps": 30,
+            "seed": 42
+        }
+
+    @property
+    def client(self):
+        """Lazy load the Gradio client (retried on the next call if loading failed)"""
+        with self._client_lock:
+            if self._client is None:
+                from gradio_client import Client
+                print(f"[VTON] Loading IDM-VTON model ({self.space})...", flush=True)
+                # gradio_client picks up HF_TOKEN from the environment (avoids anonymous quota limits)
+                if os.getenv("HF_TOKEN"):
+                    print("[VTON] Using Hugging Face Token for authentication", flush=True)
+                else:
+                    print("[VTON] working in anonymous mode (may hit rate limits)", flush=True)
+                self._client = Client(self.space)
+                print("[SUCCESS] IDM-VTON loaded successfully!", flush=True)
+            return self._client
+
+    async def generate(self, user_image_path: str, garment_image_path: str) -> str:
+        from gradio_client import file
+
+        # Loading the client is a network round-trip too
+        client = await asyncio.to_thread(lambda: self.client)
+        params = self.params
+
+        print(f"[INFO] Calling IDM-VTON API (this may take 30-60 seconds)...", flush=True)
+
+        # IDM-VTON expects: dict(background, layers, composite), garm_img, garment_des, is_checked, is_checked_crop, denoise_steps, seed
+        user_image_file = file(user_image_path)
+        garment_image_file = file(garment_image_path)
+
+        image_dict = {
+            "background": user_image_file,
+            "layers": [],
+            "composite": user_image_file
+        }
+
+        result = await asyncio.to_thread(
+            client.predict,
+            image_dict,                   # dict with file objects
+            garment_image_file,           # garm_img with file object
+            params["garment_des"],
+            params["is_checked"],
+            params["is_checked_crop"],
+            params["denoise_steps"],
+            params["seed"],
+            api_name=params["api_name"]
+        )
+
+        # Result is a tuple (output, masked_output), we want the first one
+        if isinstance(result, (list, tuple)):
+            result = result[0]
+        return result
+
+
+class LocalTryOnBackend:
+    """Deterministic compositing stand-in (no model, no network)"""
+
+    name = "local"
+    cacheable = False
+
+    @property
+    def params(self) -> Dict:
+        return {"backend": self.name}
+
+    async def generate(self, user_image_path: str, garment_image_path: str) -> str:
+        return await asyncio.to_thread(composite_tryon, user_image_path, garment_image_path)
+
+
+class FakeTryOnBackend(LocalTryOnBackend):
+    """Local compositing with injected latency and failures, for offline load tests"""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        median_seconds: float = TRYON_FAKE_LATENCY_MEDIAN_SECONDS,
+        sigma: float = TRYON_FAKE_LATENCY_SIGMA,
+        failure_rate: float = TRYON_FAKE_FAILURE_RATE,
+        seed: Optional[int] = int(TRYON_FAKE_SEED) if TRYON_FAKE_SEED else None
+    ):
+        self.median_seconds = max(0.0, median_seconds)
+        self.sigma = max(0.0, sigma)
+        self.failure_rate = min(1.0, max(0.0, failure_rate))
+        self._random = random.Random(seed)
+
+    @property
+    def params(self) -> Dict:
+        return {"backend": self.name, "median_seconds": self.median_seconds, "sigma": self.sigma}
+
+    def sample_latency(self) -> float:
+        """One latency draw, in seconds"""
+        if self.median_seconds == 0:
+            return 0.0
+        return self._random.lognormvariate(math.log(self.median_seconds), self.sigma)
+
+    async def generate(self, user_image_path: str, garment_image_path: str) -> str:
+        latency = self.sample_latency()
+        fail = self._random.random() < self.failure_rate
+        await asyncio.sleep(latency)
+        if fail:
+            raise RuntimeError(f"Injected try-on failure after {latency:.1f}s")
+        return await super().generate(user_image_path, garment_image_path)
+
+
+def create_tryon_backend(kind: str = TRYON_BACKEND) -> TryOnBackend:
+    """Backend named by TRYON_BACKEND"""
+    if kind == "gradio":
+        return GradioTryOnBackend()
+    if kind == "local":
+        return LocalTryOnBackend()
+    if kind == "fake":
+        return FakeTryOnBackend()
+    raise ValueError(f"Unknown TRYON_BACKEND {kind!r} (expected 'gradio', 'local' or 'fake')")
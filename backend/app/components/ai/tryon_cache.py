@@ -0,0 +1,238 @@
+"""
+Try-On Result Cache
+Skips the remote IDM-VTON call for user/garment pairs that were already rendered.
+
+IDM-VTON runs with a fixed seed and fixed denoise steps, so the same user
+photo and garment always produce the same image. Entries are keyed by the
+SHA-256 of both images' decoded pixels plus a hash of the generation
+parameters, and live on disk under TRYON_CACHE_DIR: the result image next to a
+small JSON file holding the tryon_images URL it was uploaded to. The directory
+is capped at TRYON_CACHE_MAX_MB and evicted least-recently-used first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from app.components.ai.classification_cache import pixel_hash
+
+# Bump when the key derivation or entry layout changes
+CACHE_VERSION = 1
+
+# Empty disables the cache
+TRYON_CACHE_DIR = os.getenv("TRYON_CACHE_DIR", ".cache/tryon_results")
+TRYON_CACHE_MAX_MB = float(os.getenv("TRYON_CACHE_MAX_MB", "512"))
+
+
+def image_file_hash(path: str) -> str:
+    """Pixel hash of an image file (re-encoded copies of the same photo still match)"""
+    with Image.open(path) as image:
+        return pixel_hash(image.convert("RGB"))
+
+
+def params_hash(params: Dict) -> str:
+    """Hash of the generation parameters (model, prompt, steps, seed, ...)"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def tryon_key(user_image_path: str, garment_image_path: str, params: Dict) -> str:
+    """
+    Cache key for one try-on
+
+    Args:
+        user_image_path: Path to the user's photo
+        garment_image_path: Path to the garment image
+        params: Generation parameters passed to the try-on model
+
+    Returns:
+        Hex digest combining the three hashes
+    """
+    parts = [image_file_hash(user_image_path), image_file_hash(garment_image_path), params_hash(params)]
+    return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+
+class TryOnCache:
+    """On-disk, size-capped LRU of try-on result images and their uploaded URLs"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_disk_bytes: int = int(TRYON_CACHE_MAX_MB * 1024 * 1024)
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_disk_bytes = max(0, max_disk_bytes)
+
+        self._lock = threading.Lock()
+        # Bytes currently on disk; computed lazily on the first write
+        self._disk_bytes: Optional[int] = None
+
+        # Metrics
+        self._hits = 0
+        self._url_hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Look up a try-on result
+
+        Args:
+            key: Key from tryon_key
+
+        Returns:
+            (path to a temp copy of the image, uploaded URL or None), or None on a miss.
+            The caller owns the copy and removes it like a fresh try-on result.
+        """
+        meta_path, image_path = self._paths_for(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("version") != CACHE_VERSION:
+                raise FileNotFoundError(meta_path)
+
+            fd, copy_path = tempfile.mkstemp(prefix="tryon_cached_", suffix=entry.get("suffix", ".jpg"))
+            os.close(fd)
+            shutil.copyfile(image_path, copy_path)
+            # Refresh mtimes so eviction approximates least-recently-used
+            os.utime(meta_path)
+            os.utime(image_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+        except Exception as e:
+            print(f"[WARNING] Could not read try-on cache entry {key}: {e}")
+            with self._lock:
+                self._misses += 1
+            return None
+
+        url = entry.get("url")
+        with self._lock:
+            self._hits += 1
+            if url:
+                self._url_hits += 1
+        return copy_path, url
+
+    def put(self, key: str, result_path: str) -> None:
+        """Store a try-on result image under key (its URL is added later by set_url)"""
+        try:
+            meta_path, image_path = self._paths_for(key)
+            image_path.parent.mkdir(parents=True, exist_ok=True)
+            previous_size = self._entry_size(key)
+
+            temp_path = image_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            shutil.copyfile(result_path, temp_path)
+            # Atomic rename so concurrent workers never read a partial file
+            os.replace(temp_path, image_path)
+            self._write_meta(key, {"version": CACHE_VERSION, "suffix": Path(result_path).suffix or ".jpg", "url": None})
+
+            self._account(self._entry_size(key) - previous_size)
+        except Exception as e:
+            print(f"[WARNING] Could not write try-on cache: {e}")
+
+    def set_url(self, key: str, url: str) -> None:
+        """Remember the tryon_images URL an entry's image was uploaded to"""
+        meta_path, _ = self._paths_for(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            previous_size = self._entry_size(key)
+            entry["url"] = url
+            self._write_meta(key, entry)
+            self._account(self._entry_size(key) - previous_size)
+        except FileNotFoundError:
+            # Evicted in the meantime
+            pass
+        except Exception as e:
+            print(f"[WARNING] Could not update try-on cache entry {key}: {e}")
+
+    def stats(self) -> Dict:
+        """Hit-rate metrics"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "url_hits": self._url_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes
+            }
+
+    def _paths_for(self, key: str) -> Tuple[Path, Path]:
+        # Shard by the last key characters to keep directories small
+        directory = self.cache_dir / key[-2:]
+        return directory / f"{key}.json", directory / f"{key}.img"
+
+    def _entry_size(self, key: str) -> int:
+        total = 0
+        for path in self._paths_for(key):
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _write_meta(self, key: str, entry: Dict) -> None:
+        meta_path, _ = self._paths_for(key)
+        temp_path = meta_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, meta_path)
+
+    def _account(self, delta: int) -> None:
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._disk_bytes += delta
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last use, bytes, key) for every entry on disk"""
+        entries = []
+        for meta_path in self.cache_dir.glob("*/*.json"):
+            key = meta_path.stem
+            try:
+                entries.append((meta_path.stat().st_mtime, self._entry_size(key), key))
+            except OSError:
+                pass
+        return entries
+
+    def _evict_disk(self) -> None:
+        """Delete the least recently used entries until the cache is ~10% under its limit (caller holds the lock)"""
+        target = int(self.max_disk_bytes * 0.9)
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, key in sorted(entries):
+            if total <= target:
+                break
+            for path in self._paths_for(key):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+
+        self._disk_bytes = total
+        print(f"[CACHE] Evicted {removed} try-on cache entries from disk")
+
+
+# Global instance (lazy loaded)
+_tryon_cache = None
+
+def get_tryon_cache() -> Optional[TryOnCache]:
+    """Get or create the shared try-on cache (None when TRYON_CACHE_DIR is empty)"""
+    global _tryon_cache
+    if _tryon_cache is None and TRYON_CACHE_DIR:
+        _tryon_cache = TryOnCache(TRYON_CACHE_DIR)
+    return _tryon_cache
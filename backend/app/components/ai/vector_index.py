@@ -0,0 +1,200 @@
+"""
+Wardrobe Vector Index
+Nearest-neighbour search over Fashion-CLIP item embeddings, in pure NumPy.
+
+Embeddings are L2-normalized, so cosine similarity is a dot product. Small
+wardrobes are searched exactly; once a user has more than
+VECTOR_INDEX_IVF_THRESHOLD items an IVF index is built instead: items are
+clustered with spherical k-means, and a query only scans the
+VECTOR_INDEX_NPROBE clusters whose centroids are closest to it.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_INDEX_IVF_THRESHOLD = int(os.getenv("VECTOR_INDEX_IVF_THRESHOLD", "2000"))
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+# Number of per-user indexes kept in memory
+VECTOR_INDEX_CACHE_USERS = int(os.getenv("VECTOR_INDEX_CACHE_USERS", "256"))
+
+KMEANS_ITERATIONS = 10
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if k >= scores.shape[0]:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def spherical_kmeans(vectors: np.ndarray, num_clusters: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity
+
+    Args:
+        vectors: Normalized vectors of shape (N, dim)
+        num_clusters: Number of centroids
+        iterations: Lloyd iterations
+        seed: RNG seed, so rebuilding the same data gives the same index
+
+    Returns:
+        Normalized centroids of shape (num_clusters, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(vectors.shape[0], size=num_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=num_clusters)
+
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters from random points
+            sums[empty] = vectors[rng.choice(vectors.shape[0], size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+
+    return centroids
+
+
+class VectorIndex:
+    """Exact or IVF cosine-similarity index over a fixed set of item embeddings"""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        ivf_threshold: int = VECTOR_INDEX_IVF_THRESHOLD,
+        nprobe: int = VECTOR_INDEX_NPROBE
+    ):
+        """
+        Args:
+            ids: Item ids, one per row of vectors
+            vectors: Embeddings of shape (N, dim)
+            ivf_threshold: Above this many items, build an IVF index instead of exact search
+            nprobe: Clusters scanned per IVF query
+        """
+        self.ids = list(ids)
+        self.vectors = _normalize(np.asarray(vectors, dtype=np.float32)) if self.ids else np.zeros((0, 0), dtype=np.float32)
+        self.nprobe = max(1, nprobe)
+
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        if len(self.ids) > ivf_threshold:
+            self._build_ivf()
+
+    @property
+    def approximate(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build_ivf(self) -> None:
+        num_clusters = max(1, int(np.sqrt(len(self.ids))))
+        self.centroids = spherical_kmeans(self.vectors, num_clusters)
+        assignment = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self.lists = [np.flatnonzero(assignment == cluster) for cluster in range(num_clusters)]
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows worth scoring for query (None means all of them)"""
+        if self.centroids is None:
+            return None
+        probe = _top_k(self.centroids @ query, self.nprobe)
+        return np.concatenate([self.lists[cluster] for cluster in probe])
+
+    def search(self, query: np.ndarray, k: int = 10, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """
+        Find the items most similar to a query embedding
+
+        Args:
+            query: Image or text embedding of shape (dim,)
+            k: Number of results
+            exclude: Item ids to leave out (e.g. the query item itself)
+
+        Returns:
+            List of (item_id, cosine similarity), best first
+        """
+        if not self.ids or k <= 0:
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        rows = self._candidates(query)
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        scores = vectors @ query
+
+        excluded = set(exclude)
+        results = []
+        for position in _top_k(scores, k + len(excluded)):
+            row = position if rows is None else rows[position]
+            item_id = self.ids[row]
+            if item_id in excluded:
+                continue
+            results.append((item_id, float(scores[position])))
+            if len(results) == k:
+                break
+        return results
+
+
+class UserIndexCache:
+    """LRU of per-user indexes, rebuilt when the user's embeddings change"""
+
+    def __init__(self, max_users: int = VECTOR_INDEX_CACHE_USERS):
+        self.max_users = max(1, max_users)
+        self._indexes: "OrderedDict[Tuple[str, str], Tuple[Tuple[int, str], VectorIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, model: str) -> VectorIndex:
+        """
+        Index over all stored embeddings of one user
+
+        Args:
+            user_id: Owner's UUID
+            model: Embedding model name
+
+        Returns:
+            VectorIndex (possibly empty)
+        """
+        from app.components.ai.embedding_store import get_embedding_store
+
+        store = get_embedding_store()
+        key = (str(user_id), model)
+        version = store.user_version(user_id, model)
+
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None and cached[0] == version:
+                self._indexes.move_to_end(key)
+                return cached[1]
+
+        ids, vectors = store.get_user_embeddings(user_id, model)
+        index = VectorIndex(ids, vectors)
+
+        with self._lock:
+            self._indexes[key] = (version, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+
+# Global instance (lazy loaded)
+_user_index_cache = None
+
+def get_user_index(user_id: str, model: str) -> VectorIndex:
+    """Get the (cached) vector index for a user's wardrobe"""
+    global _user_index_cache
+    if _user_index_cache is None:
+        _user_index_cache = UserIndexCache()
+    return _user_index_cache.get(user_id, model)
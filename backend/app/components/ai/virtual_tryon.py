@@ -1,67 +1,77 @@
 """
-Virtual Try-On Service using Kolors Virtual Try-On from Hugging Face
+Virtual Try-On Service
+Renders outfits onto the user's photo through the backend selected by
+TRYON_BACKEND (IDM-VTON on Hugging Face by default, see tryon_backends.py).
 """
 import asyncio
-from pathlib import Path
 from typing import Optional, Dict
 import os
 import sys
 import tempfile
 
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.image_fetcher import fetch_image
+from app.components.ai.tryon_backends import (
+    MOCK_TRYON_PREFIX,
+    TRYON_PREVIEW_MAX_SIDE,
+    TryOnBackend,
+    composite_preview,
+    composite_tryon,
+    create_tryon_backend
+)
+from app.components.ai.tryon_cache import get_tryon_cache, tryon_key
+
 # Set UTF-8 encoding for Windows compatibility
 if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-# Lazy import to avoid loading at startup
-_gradio_client = None
+# Try-ons run at the same time for one generate-looks request
+TRYON_CONCURRENCY = int(os.getenv("TRYON_CONCURRENCY", "3"))
+# Overall budget for a request's try-ons; looks still pending then use their preview
+TRYON_DEADLINE_SECONDS = float(os.getenv("TRYON_DEADLINE_SECONDS", "180"))
 
-def get_gradio_client():
-    """Lazy load Gradio Client"""
-    global _gradio_client
-    if _gradio_client is None:
-        try:
-            from gradio_client import Client, file
-            print("[VTON] Loading IDM-VTON model (yisol/IDM-VTON)...", flush=True)
-            
-            # Use HF_TOKEN if available to avoid quota limits
-            hf_token = os.getenv("HF_TOKEN")
-            if hf_token:
-                print("[VTON] Using Hugging Face Token for authentication", flush=True)
-                # Client should automatically pick up HF_TOKEN from environment
-                # or we can try to set it explicitly in os.environ if not present
-                if "HF_TOKEN" not in os.environ:
-                    os.environ["HF_TOKEN"] = hf_token
-                _gradio_client = Client("yisol/IDM-VTON")
-            else:
-                print("[VTON] working in anonymous mode (may hit rate limits)", flush=True)
-                _gradio_client = Client("yisol/IDM-VTON")
-                
-            print("[SUCCESS] IDM-VTON loaded successfully!", flush=True)
-            
-        except Exception as e:
-            print(f"[ERROR] Error loading IDM-VTON: {e}", flush=True)
-            _gradio_client = None
-    return _gradio_client
+TRYON_TIMEOUT_SECONDS = float(os.getenv("TRYON_TIMEOUT_SECONDS", "90"))
+# Circuit breaker: this many failures/timeouts within the window stop calls to the
+# backend for TRYON_BREAKER_RESET_SECONDS (try-ons use the mock fallback meanwhile)
+TRYON_BREAKER_FAILURES = int(os.getenv("TRYON_BREAKER_FAILURES", "3"))
+TRYON_BREAKER_WINDOW_SECONDS = float(os.getenv("TRYON_BREAKER_WINDOW_SECONDS", "300"))
+TRYON_BREAKER_RESET_SECONDS = float(os.getenv("TRYON_BREAKER_RESET_SECONDS", "60"))
+
+# Global instance (lazy loaded)
+_tryon_breaker = None
+
+def get_tryon_breaker() -> CircuitBreaker:
+    """Get or create the circuit breaker around the try-on backend"""
+    global _tryon_breaker
+    if _tryon_breaker is None:
+        _tryon_breaker = CircuitBreaker(
+            "try-on backend",
+            failure_threshold=TRYON_BREAKER_FAILURES,
+            window_seconds=TRYON_BREAKER_WINDOW_SECONDS,
+            reset_seconds=TRYON_BREAKER_RESET_SECONDS
+        )
+    return _tryon_breaker
 
 
 class VirtualTryOnService:
-    """Service for generating virtual try-on images using IDM-VTON"""
+    """Service for generating virtual try-on images through a TryOnBackend"""
     
-    def __init__(self):
-        self._client = None
-    
-    @property
-    def client(self):
-        """Lazy load the Gradio client"""
-        if self._client is None:
-            self._client = get_gradio_client()
-        return self._client
+    def __init__(self, backend: Optional[TryOnBackend] = None):
+        self.backend = backend if backend is not None else create_tryon_backend()
+        # Try-on result path -> result cache key, until record_tryon_upload
+        self._cache_keys: Dict[str, str] = {}
+        # Result path -> tryon_images URL for cached results that were already uploaded
+        self._cached_urls: Dict[str, str] = {}
+        # One in-flight try-on per cache key; identical looks wait and reuse the result
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        # Callers holding or waiting for each key's lock; the lock is dropped at zero
+        self._key_waiters: Dict[str, int] = {}
     
     async def download_image_to_temp(self, image_url: str, prefix: str = "image") -> Optional[str]:
         """
-        Download image from URL to temporary file
+        Download image from URL to temporary file (through the shared image cache)
         
         Args:
             image_url: URL of the image to download
@@ -71,28 +81,25 @@ class VirtualTryOnService:
             Path to downloaded temp file, or None if failed
         """
         try:
-            import httpx
             from PIL import Image
             from io import BytesIO
             
             print(f"[DOWNLOAD] Downloading image from: {image_url[:50]}...", flush=True)
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(image_url)
-                response.raise_for_status()
-                
-                # Open image and convert to RGB
-                image = Image.open(BytesIO(response.content)).convert("RGB")
-                
-                # Save to temp file
-                temp_dir = tempfile.gettempdir()
-                temp_filename = f"{prefix}_{os.urandom(8).hex()}.jpg"
-                temp_path = os.path.join(temp_dir, temp_filename)
-                
-                image.save(temp_path, "JPEG", quality=95)
-                print(f"[SUCCESS] Image downloaded to: {temp_path}", flush=True)
-                
-                return temp_path
+            image_bytes = await fetch_image(image_url)
+            
+            # Open image and convert to RGB
+            image = Image.open(BytesIO(image_bytes)).convert("RGB")
+            
+            # Save to temp file
+            temp_dir = tempfile.gettempdir()
+            temp_filename = f"{prefix}_{os.urandom(8).hex()}.jpg"
+            temp_path = os.path.join(temp_dir, temp_filename)
+            
+            image.save(temp_path, "JPEG", quality=95)
+            print(f"[SUCCESS] Image downloaded to: {temp_path}", flush=True)
+            
+            return temp_path
                 
         except Exception as e:
             print(f"[ERROR] Failed to download image: {e}", flush=True)
@@ -105,7 +112,7 @@ class VirtualTryOnService:
         output_dir: Optional[str] = None
     ) -> Optional[str]:
         """
-        Generate virtual try-on image using IDM-VTON model
+        Generate virtual try-on image with the configured backend
         
         Args:
             user_image_path: Path to user's photo
@@ -115,67 +122,44 @@ class VirtualTryOnService:
         Returns:
             Path to generated try-on image, or None if failed
         """
-        if self.client is None:
-            print("[ERROR] Gradio client not available")
+        # Verify files exist
+        if not os.path.exists(user_image_path):
+            print(f"[ERROR] User image not found: {user_image_path}", flush=True)
             return None
+        if not os.path.exists(garment_image_path):
+            print(f"[ERROR] Garment image not found: {garment_image_path}", flush=True)
+            return None
+        
+        # While the backend keeps failing, don't wait on it again
+        breaker = get_tryon_breaker()
+        if not breaker.allow():
+            print(f"[TRYON] Circuit open for the {self.backend.name} backend, using Mock Try-On right away", flush=True)
+            return self.generate_mock_tryon(user_image_path, garment_image_path)
         
         try:
-            from gradio_client import file
-            
-            print(f"[TRYON] Generating virtual try-on...", flush=True)
+            print(f"[TRYON] Generating virtual try-on ({self.backend.name} backend)...", flush=True)
             print(f"   User image: {user_image_path}", flush=True)
             print(f"   Garment image: {garment_image_path}", flush=True)
             
-            # Verify files exist
-            if not os.path.exists(user_image_path):
-                print(f"[ERROR] User image not found: {user_image_path}", flush=True)
-                return None
-            if not os.path.exists(garment_image_path):
-                print(f"[ERROR] Garment image not found: {garment_image_path}", flush=True)
-                return None
-            
-            # Call IDM-VTON API
-            print(f"[INFO] Calling IDM-VTON API (this may take 30-60 seconds)...", flush=True)
-            
-            # Construct the dictionary correctly using file()
-            # IDM-VTON expects: dict(background, layers, composite), garm_img, garment_des, is_checked, is_checked_crop, denoise_steps, seed
-            
-            # Use file() wrapper for image paths as requested
-            user_image_file = file(user_image_path)
-            garment_image_file = file(garment_image_path)
-            
-            image_dict = {
-                "background": user_image_file,
-                "layers": [],
-                "composite": user_image_file  # User requested composite be the same as background
-            }
-            
             result = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.client.predict,
-                    image_dict,           # dict with file objects
-                    garment_image_file,   # garm_img with file object
-                    "Garment photo",      # garment_des
-                    True,                 # is_checked (auto-mask)
-                    True,                 # is_checked_crop (auto-crop)
-                    30,                   # denoise_steps
-                    42,                   # seed
-                    api_name="/tryon"
-                ),
-                timeout=90.0
+                self.backend.generate(user_image_path, garment_image_path),
+                timeout=TRYON_TIMEOUT_SECONDS
             )
-            
-            # Result is a tuple (output, masked_output), we want the first one
-            if isinstance(result, (list, tuple)):
-                result = result[0]
+            breaker.record_success()
             
             print(f"[SUCCESS] Virtual try-on generated: {result}", flush=True)
             return result
             
         except asyncio.TimeoutError:
-            print(f"[ERROR] Virtual try-on timed out after 90 seconds", flush=True)
+            breaker.record_failure(f"timed out after {TRYON_TIMEOUT_SECONDS:.0f}s")
+            print(f"[ERROR] Virtual try-on timed out after {TRYON_TIMEOUT_SECONDS:.0f} seconds", flush=True)
             return None
+        except asyncio.CancelledError:
+            # Request deadline or job cancel; says nothing about the backend's health
+            breaker.record_cancelled()
+            raise
         except Exception as e:
+            breaker.record_failure(str(e) or type(e).__name__)
             print(f"[ERROR] Virtual try-on error: {e}", flush=True)
             # Fallback to Mock Mode so user sees SOMETHING instead of just the garment
             print("[INFO] Falling back to Mock Try-On due to API error...", flush=True)
@@ -187,34 +171,8 @@ class VirtualTryOnService:
         Used when API fails to allow flow testing.
         """
         try:
-            from PIL import Image
             print("[MOCK] Generating mock try-on (API fallback)...", flush=True)
-            
-            user_img = Image.open(user_img_path).convert("RGBA")
-            garm_img = Image.open(garment_img_path).convert("RGBA")
-            
-            # Simple resize garment to 50% of user width and center it
-            target_width = int(user_img.width * 0.6)
-            aspect_ratio = garm_img.height / garm_img.width
-            target_height = int(target_width * aspect_ratio)
-            
-            garm_resized = garm_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            
-            # Paste in center
-            x = (user_img.width - target_width) // 2
-            y = (user_img.height - target_height) // 2
-            
-            # Create composited image
-            mock_result = Image.new("RGB", user_img.size, (255, 255, 255))
-            mock_result.paste(user_img, (0, 0), user_img)
-            mock_result.paste(garm_resized, (x, y), garm_resized)
-            
-            # Save to temp
-            temp_dir = tempfile.gettempdir()
-            temp_filename = f"mock_tryon_{os.urandom(8).hex()}.jpg"
-            temp_path = os.path.join(temp_dir, temp_filename)
-            mock_result.save(temp_path, "JPEG", quality=90)
-            
+            temp_path = composite_tryon(user_img_path, garment_img_path)
             print(f"[MOCK] Success: {temp_path}", flush=True)
             return temp_path
             
@@ -222,6 +180,47 @@ class VirtualTryOnService:
             print(f"[MOCK] Error generating mock: {e}", flush=True)
             return None
     
+    def select_primary_garment(self, outfit_items: list) -> Dict:
+        """The item an outfit is tried on with: dress > top > first item"""
+        # Priority order: Dresses > Tops > Bottoms
+        for item in outfit_items:
+            category = item.get("category", "").lower()
+            if "dress" in category or "lehenga" in category:
+                return item
+        
+        for item in outfit_items:
+            category = item.get("category", "").lower()
+            if "top" in category or "kurta" in category or "shirt" in category:
+                return item
+        
+        # Fallback to first item
+        return outfit_items[0]
+    
+    async def generate_outfit_preview(self, user_image_path: str, outfit_items: list) -> Optional[bytes]:
+        """
+        Instant low-res preview of an outfit's try-on (local composite, no model)
+        
+        Args:
+            user_image_path: Path to user's photo
+            outfit_items: List of wardrobe item dictionaries
+            
+        Returns:
+            JPEG bytes, or None if previews are disabled or the garment image is unavailable
+        """
+        if TRYON_PREVIEW_MAX_SIDE <= 0 or not outfit_items:
+            return None
+        
+        garment_url = self.select_primary_garment(outfit_items).get("image_url")
+        if not garment_url:
+            return None
+        
+        try:
+            garment_bytes = await fetch_image(garment_url)
+            return await asyncio.to_thread(composite_preview, user_image_path, garment_bytes)
+        except Exception as e:
+            print(f"[WARNING] Could not build try-on preview: {e}", flush=True)
+            return None
+    
     async def generate_outfit_tryon(
         self,
         user_image_path: str,
@@ -240,27 +239,7 @@ class VirtualTryOnService:
             print("[ERROR] No outfit items provided")
             return None
         
-        # Find the primary garment (top, dress, or kurta)
-        primary_garment = None
-        
-        # Priority order: Dresses > Tops > Bottoms
-        for item in outfit_items:
-            category = item.get("category", "").lower()
-            if "dress" in category or "lehenga" in category:
-                primary_garment = item
-                break
-        
-        if not primary_garment:
-            for item in outfit_items:
-                category = item.get("category", "").lower()
-                if "top" in category or "kurta" in category or "shirt" in category:
-                    primary_garment = item
-                    break
-        
-        if not primary_garment:
-            # Fallback to first item
-            primary_garment = outfit_items[0]
-        
+        primary_garment = self.select_primary_garment(outfit_items)
         print(f"[OUTFIT] Using primary garment: {primary_garment.get('name', 'Unknown')}")
         
         # Download the garment image
@@ -277,14 +256,46 @@ class VirtualTryOnService:
             return None
         
         try:
-            # Generate try-on
-            result = await self.generate_tryon(
-                user_image_path=user_image_path,
-                garment_image_path=temp_garment_path,
-                output_dir=output_dir
-            )
+            cache = get_tryon_cache() if self.backend.cacheable else None
+            if cache is None:
+                return await self.generate_tryon(
+                    user_image_path=user_image_path,
+                    garment_image_path=temp_garment_path,
+                    output_dir=output_dir
+                )
             
-            return result
+            key = await asyncio.to_thread(tryon_key, user_image_path, temp_garment_path, self.backend.params)
+            lock = self._key_locks.setdefault(key, asyncio.Lock())
+            self._key_waiters[key] = self._key_waiters.get(key, 0) + 1
+            try:
+                async with lock:
+                    cached = await asyncio.to_thread(cache.get, key)
+                    if cached is not None:
+                        result, url = cached
+                        print(f"[TRYON] Try-on cache hit{' (already uploaded)' if url else ''}", flush=True)
+                        if url:
+                            self._cached_urls[result] = url
+                        self._cache_keys[result] = key
+                        return result
+                    
+                    # Generate try-on
+                    result = await self.generate_tryon(
+                        user_image_path=user_image_path,
+                        garment_image_path=temp_garment_path,
+                        output_dir=output_dir
+                    )
+                    
+                    if result and os.path.exists(result) and not os.path.basename(result).startswith(MOCK_TRYON_PREFIX):
+                        await asyncio.to_thread(cache.put, key, result)
+                        self._cache_keys[result] = key
+                    return result
+            finally:
+                # Counted rather than checked with lock.locked(): a waiter that was
+                # handed the lock but has not resumed yet must keep sharing it
+                self._key_waiters[key] -= 1
+                if self._key_waiters[key] == 0:
+                    del self._key_waiters[key]
+                    del self._key_locks[key]
             
         except Exception as e:
             print(f"[ERROR] Error in outfit try-on: {e}")
@@ -296,6 +307,23 @@ class VirtualTryOnService:
                     os.remove(temp_garment_path)
                 except Exception as e:
                     print(f"[WARNING] Could not remove temp file: {e}")
+    
+    def cached_tryon_url(self, result_path: str) -> Optional[str]:
+        """tryon_images URL of a cached result that was already uploaded, or None"""
+        return self._cached_urls.get(result_path)
+    
+    def record_tryon_upload(self, result_path: str, url: Optional[str]) -> None:
+        """
+        Remember where a generate_outfit_tryon result was uploaded
+        
+        Call once per result, after uploading it (url None if the upload failed),
+        so the next identical try-on reuses the URL instead of uploading again.
+        """
+        key = self._cache_keys.pop(result_path, None)
+        cached_url = self._cached_urls.pop(result_path, None)
+        cache = get_tryon_cache()
+        if key and url and url != cached_url and cache is not None:
+            cache.set_url(key, url)
 
 
 # Global instance (lazy loaded)
@@ -6,7 +6,17 @@ Automatically categorizes uploaded clothing items using Fashion-CLIP model.
 from transformers import CLIPProcessor, CLIPModel
 from PIL import Image
 import torch
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+from app.components.ai.text_embedding_cache import get_text_embedding_cache
+from app.components.ai.image_preprocessing import load_image_for_clip, images_to_pixel_values
+from app.components.ai.color_extractor import extract_colors, COLOR_EXTRACTOR_VERSION
+from app.components.ai.onnx_backend import as_feature_tensor, load_inference_model, model_cache_name
 
 # Enable AVIF support
 try:
@@ -15,48 +25,169 @@ try:
 except ImportError:
     print("Warning: AVIF support not available")
 
+FASHION_CLIP_MODEL_NAME = "patrickjohncyh/fashion-clip"
+
+# Maximum number of images stacked into one forward pass
+DEFAULT_BATCH_SIZE = int(os.getenv("CLASSIFIER_BATCH_SIZE", "16"))
+
 # Global variables for model caching
 _fashion_model = None
 _fashion_processor = None
-_model_loading_lock = None
+_model_loading_lock = threading.Lock()
+
+# Load state reported by the readiness endpoint
+_model_status = {"state": "not_loaded", "error": None, "load_seconds": None, "warmed_up": False}
+
+
+class StageTimings:
+    """Thread-safe per-stage counters for the classification cascade"""
+    
+    def __init__(self):
+        self._stages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage: str, items: int, skipped: int, seconds: float) -> None:
+        """Add one batch's run of a stage"""
+        self.merge({stage: {"batches": 1, "items": items, "skipped": skipped, "seconds": seconds}})
+    
+    def merge(self, stages: Dict[str, Dict]) -> None:
+        """Add counters collected elsewhere (e.g. by a worker process)"""
+        with self._lock:
+            for stage, counts in stages.items():
+                totals = self._stages.setdefault(stage, {"batches": 0, "items": 0, "skipped": 0, "seconds": 0.0})
+                for key in totals:
+                    totals[key] += counts.get(key, 0)
+    
+    def drain(self) -> Dict[str, Dict]:
+        """Return the counters collected so far and reset them"""
+        with self._lock:
+            stages, self._stages = self._stages, {}
+        return stages
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Per-stage counters with average time per batch, for the metrics endpoint"""
+        with self._lock:
+            stages = {stage: dict(counts) for stage, counts in self._stages.items()}
+        for counts in stages.values():
+            counts["avg_ms"] = round(1000 * counts["seconds"] / counts["batches"], 3) if counts["batches"] else 0.0
+            counts["seconds"] = round(counts["seconds"], 4)
+        return stages
+
+
+def _load_torch_model() -> CLIPModel:
+    """Load the eager PyTorch Fashion-CLIP model ready for inference"""
+    model = CLIPModel.from_pretrained(FASHION_CLIP_MODEL_NAME)
+    
+    # Set to evaluation mode
+    model.eval()
+    
+    # Disable gradients for inference
+    for param in model.parameters():
+        param.requires_grad = False
+    
+    return model
 
 
 def get_fashion_model_and_processor():
-    """Get loaded Fashion-CLIP model and processor (lazy loading)"""
-    global _fashion_model, _fashion_processor, _model_loading_lock
+    """Get loaded Fashion-CLIP model and processor (lazy, single-flight loading)"""
+    global _fashion_model, _fashion_processor
     
     # If already loaded, return immediately
     if _fashion_model is not None and _fashion_processor is not None:
         return _fashion_model, _fashion_processor
     
-    # Load the model (first time only)
-    try:
-        print("🔄 Loading Fashion-CLIP model (first time only, ~1-2 minutes)...")
-        _fashion_model = CLIPModel.from_pretrained("patrickjohncyh/fashion-clip")
-        _fashion_processor = CLIPProcessor.from_pretrained("patrickjohncyh/fashion-clip")
-        
-        # Set to evaluation mode
-        _fashion_model.eval()
+    # Only one thread loads; the others wait here and reuse its result
+    with _model_loading_lock:
+        if _fashion_model is not None and _fashion_processor is not None:
+            return _fashion_model, _fashion_processor
         
-        # Disable gradients for inference
-        for param in _fashion_model.parameters():
-            param.requires_grad = False
+        # Load the model (first time only)
+        started = time.perf_counter()
+        _model_status.update(state="loading", error=None)
+        try:
+            print("🔄 Loading Fashion-CLIP model (first time only, ~1-2 minutes)...")
+            model = load_inference_model(FASHION_CLIP_MODEL_NAME, _load_torch_model)
+            if _fashion_processor is None:
+                _fashion_processor = CLIPProcessor.from_pretrained(FASHION_CLIP_MODEL_NAME)
+            _fashion_model = model
+            
+            _model_status.update(state="ready", load_seconds=round(time.perf_counter() - started, 2))
+            print("[SUCCESS] Fashion-CLIP model loaded successfully!")
+            return _fashion_model, _fashion_processor
         
-        print("[SUCCESS] Fashion-CLIP model loaded successfully!")
-        return _fashion_model, _fashion_processor
+        except Exception as e:
+            _model_status.update(state="failed", error=str(e))
+            print(f"[ERROR] Error loading Fashion-CLIP model: {e}")
+            print("⚠️  Auto-categorization will be disabled.")
+            return None, None
+
+
+def get_fashion_model_status() -> Dict:
+    """Load state of the Fashion-CLIP model in this process"""
+    return dict(_model_status)
+
+
+def get_fashion_processor():
+    """
+    Get the Fashion-CLIP processor without loading the model
+    
+    Used to preprocess images in a process that hands inference to workers.
+    """
+    global _fashion_processor
+    
+    if _fashion_processor is None:
+        with _model_loading_lock:
+            if _fashion_processor is None:
+                try:
+                    _fashion_processor = CLIPProcessor.from_pretrained(FASHION_CLIP_MODEL_NAME)
+                except Exception as e:
+                    print(f"[ERROR] Error loading Fashion-CLIP processor: {e}")
+                    return None
     
-    except Exception as e:
-        print(f"[ERROR] Error loading Fashion-CLIP model: {e}")
-        print("⚠️  Auto-categorization will be disabled.")
-        return None, None
+    return _fashion_processor
 
 
 class WardrobeClassifier:
     """Classify wardrobe items using Fashion-CLIP"""
     
+    # Prompt templates for main categories and for everything else
+    CATEGORY_PROMPT_TEMPLATE = "a photo of {label} clothing"
+    LABEL_PROMPT_TEMPLATE = "a photo of a {label}"
+    
+    # Below this item-type confidence the item is left Uncategorized
+    CONFIDENCE_THRESHOLD = 0.30
+    
+    # Attribute stages run in order once the item type is known. A stage only
+    # runs for items whose main category is in applies_to (None means every
+    # category) and whose item-type confidence reaches min_confidence; below
+    # that the identification is too uncertain to pay for another pass, so the
+    # item exits the cascade with the stage's default instead of being scored.
+    # Color and style are scored for every identified item, as before the
+    # cascade; only pattern is skipped, for jewelry/accessories and for items
+    # identified with less than 0.50 confidence (these are reported "plain").
+    CASCADE_STAGES = [
+        {
+            "name": "color", "labels": "colors", "default": "unknown",
+            "applies_to": None, "min_confidence": CONFIDENCE_THRESHOLD
+        },
+        {
+            "name": "style", "labels": "styles", "default": "casual",
+            "applies_to": None, "min_confidence": CONFIDENCE_THRESHOLD
+        },
+        {
+            "name": "pattern", "labels": "patterns", "default": "plain",
+            "applies_to": [
+                "Tops & Kurtas", "Bottoms & Shalwar", "Dresses & Lehengas", "Dupattas & Scarves",
+                "Shoes & Sandals", "Cultural / Special"
+            ],
+            "min_confidence": 0.50
+        }
+    ]
+    
     def __init__(self):
         self._model = None
         self._processor = None
+        self.stage_timings = StageTimings()
         
         # Define classification categories
         self.categories = {
@@ -89,6 +220,54 @@ class WardrobeClassifier:
                 "checkered", "polka dot", "geometric"
             ]
         }
+        
+        # Item types identified first, before attributes are scored (comprehensive list)
+        self.item_types = [
+            # Tops
+            "shirt", "t-shirt", "kurta", "blouse", "tunic", "sweater", "jacket", "coat",
+            # Bottoms
+            "pants", "jeans", "trousers", "shalwar", "palazzo pants", "shorts", "skirt", "leggings",
+            # Dresses
+            "dress", "lehenga", "gown", "maxi dress", "anarkali",
+            # Footwear
+            "shoes", "sneakers", "sandals", "heels", "boots", "flats", "slippers",
+            # Accessories
+            "handbag", "purse", "backpack", "clutch", "belt", "sunglasses", "hat", "cap",
+            # Watches & Jewelry
+            "wristwatch", "bracelet", "necklace", "earrings", "ring",
+            # Scarves & Dupattas
+            "scarf", "dupatta", "stole", "shawl"
+        ]
+        
+        # Map identified item type to its main wardrobe category
+        self.item_to_category = {
+            # Tops
+            "shirt": "Tops & Kurtas", "t-shirt": "Tops & Kurtas", "kurta": "Tops & Kurtas",
+            "blouse": "Tops & Kurtas", "tunic": "Tops & Kurtas", "sweater": "Tops & Kurtas",
+            "jacket": "Tops & Kurtas", "coat": "Tops & Kurtas",
+            # Bottoms
+            "pants": "Bottoms & Shalwar", "jeans": "Bottoms & Shalwar", "trousers": "Bottoms & Shalwar",
+            "shalwar": "Bottoms & Shalwar", "palazzo pants": "Bottoms & Shalwar",
+            "shorts": "Bottoms & Shalwar", "skirt": "Bottoms & Shalwar", "leggings": "Bottoms & Shalwar",
+            # Dresses
+            "dress": "Dresses & Lehengas", "lehenga": "Dresses & Lehengas",
+            "gown": "Dresses & Lehengas", "maxi dress": "Dresses & Lehengas",
+            "anarkali": "Dresses & Lehengas",
+            # Footwear
+            "shoes": "Shoes & Sandals", "sneakers": "Shoes & Sandals", "sandals": "Shoes & Sandals",
+            "heels": "Shoes & Sandals", "boots": "Shoes & Sandals", "flats": "Shoes & Sandals",
+            "slippers": "Shoes & Sandals",
+            # Accessories
+            "handbag": "Accessories & Bags", "purse": "Accessories & Bags", "backpack": "Accessories & Bags",
+            "clutch": "Accessories & Bags", "belt": "Accessories & Bags", "sunglasses": "Accessories & Bags",
+            "hat": "Accessories & Bags", "cap": "Accessories & Bags",
+            # Watches & Jewelry
+            "wristwatch": "Accessories & Bags", "bracelet": "Jewelry", "necklace": "Jewelry",
+            "earrings": "Jewelry", "ring": "Jewelry",
+            # Scarves
+            "scarf": "Dupattas & Scarves", "dupatta": "Dupattas & Scarves",
+            "stole": "Dupattas & Scarves", "shawl": "Dupattas & Scarves"
+        }
     
     @property
     def model(self):
@@ -99,11 +278,174 @@ class WardrobeClassifier:
     
     @property
     def processor(self):
-        """Lazy load processor"""
+        """Lazy load processor (does not require the model)"""
         if self._processor is None:
-            self._model, self._processor = get_fashion_model_and_processor()
+            self._processor = get_fashion_processor()
         return self._processor
     
+    def classification_version(self) -> str:
+        """
+        Short fingerprint of everything that determines a classification
+        
+        Covers the model and backend, label sets, prompt templates, the
+        confidence threshold, the cascade stages and the color extractor, so
+        cached results go stale when any of them change.
+        """
+        payload = json.dumps(
+            {
+                "model": model_cache_name(FASHION_CLIP_MODEL_NAME),
+                "categories": self.categories,
+                "item_types": self.item_types,
+                "item_to_category": self.item_to_category,
+                "templates": [self.CATEGORY_PROMPT_TEMPLATE, self.LABEL_PROMPT_TEMPLATE],
+                "threshold": self.CONFIDENCE_THRESHOLD,
+                "stages": self.CASCADE_STAGES,
+                "color_extractor": COLOR_EXTRACTOR_VERSION
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+    
+    def build_text_prompts(self, labels: List[str]) -> List[str]:
+        """Turn labels into the text prompts scored against the image"""
+        text_prompts = []
+        for label in labels:
+            # Use more specific prompts for better accuracy
+            if any(cat in label for cat in ["Tops", "Bottoms", "Dresses", "Shoes", "Jewelry", "Accessories"]):
+                # Main category - use "clothing" context
+                text_prompts.append(self.CATEGORY_PROMPT_TEMPLATE.format(label=label.lower()))
+            else:
+                # Sub-categories and attributes
+                text_prompts.append(self.LABEL_PROMPT_TEMPLATE.format(label=label.lower()))
+        return text_prompts
+    
+    def load_image(self, image) -> Image.Image:
+        """
+        Load an image from a PIL Image, raw bytes or a file path as RGB
+        
+        Files are decoded at reduced resolution (JPEG draft mode) and rotated
+        according to their EXIF orientation.
+        
+        Args:
+            image: PIL Image, bytes, or path to an image file
+        
+        Returns:
+            RGB PIL Image
+        """
+        return load_image_for_clip(image)
+    
+    def preprocess_images(self, images: List[Image.Image]) -> torch.Tensor:
+        """
+        Stack RGB images into one normalized pixel tensor batch
+        
+        Returns:
+            Tensor of shape (N, 3, H, W)
+        """
+        return images_to_pixel_values(images, self.processor)
+    
+    def encode_pixel_values(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """
+        Run the vision tower once over a batch of preprocessed images
+        
+        Returns:
+            L2-normalized tensor of shape (N, embed_dim)
+        """
+        with torch.no_grad():
+            image_embeds = as_feature_tensor(
+                self.model.get_image_features(pixel_values=pixel_values)
+            )
+        return image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+    
+    def encode_image(self, image) -> torch.Tensor:
+        """
+        Run the vision tower once and return the L2-normalized image embedding
+        
+        Args:
+            image: PIL Image
+        
+        Returns:
+            Tensor of shape (1, embed_dim)
+        """
+        return self.encode_pixel_values(self.preprocess_images([image]))
+    
+    def encode_labels(self, labels: List[str]) -> torch.Tensor:
+        """
+        Get text embeddings for the prompts of labels
+        
+        The label sets are fixed, so embeddings are computed once per model
+        and served from the shared text embedding cache afterwards.
+        
+        Returns:
+            L2-normalized tensor of shape (len(labels), embed_dim)
+        """
+        template = f"{self.CATEGORY_PROMPT_TEMPLATE}|{self.LABEL_PROMPT_TEMPLATE}"
+        return get_text_embedding_cache().get_or_compute(
+            model_cache_name(FASHION_CLIP_MODEL_NAME),
+            labels,
+            template,
+            lambda: self._run_text_tower(labels)
+        )
+    
+    def encode_text_query(self, query: str) -> List[float]:
+        """
+        Embed a free-text search query (e.g. "red wedding outfit")
+        
+        Returns:
+            L2-normalized embedding as a list of floats
+        """
+        if self.model is None or self.processor is None:
+            raise RuntimeError("Fashion-CLIP model not available")
+        return self._run_text_tower([query])[0].tolist()
+    
+    def _run_text_tower(self, labels: List[str]) -> torch.Tensor:
+        """Encode the prompts for labels with the text tower (uncached)"""
+        inputs = self.processor(
+            text=self.build_text_prompts(labels),
+            return_tensors="pt",
+            padding=True
+        )
+        with torch.no_grad():
+            text_embeds = as_feature_tensor(
+                self.model.get_text_features(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"]
+                )
+            )
+        return text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+    
+    def score_labels_batch(self, image_embeds: torch.Tensor, labels: List[str]) -> torch.Tensor:
+        """
+        Score already-encoded images against a list of labels
+        
+        Produces the same probabilities as a full CLIP forward pass, without
+        running the vision tower again.
+        
+        Args:
+            image_embeds: Normalized embeddings of shape (N, embed_dim)
+            labels: List of possible labels
+        
+        Returns:
+            Tensor of shape (N, len(labels)) with softmax probabilities
+        """
+        text_embeds = self.encode_labels(labels)
+        with torch.no_grad():
+            logit_scale = self.model.logit_scale.exp()
+            return (logit_scale * image_embeds @ text_embeds.t()).softmax(dim=-1)
+    
+    def score_labels(self, image_embeds: torch.Tensor, labels: List[str]) -> Dict[str, float]:
+        """
+        Score a single encoded image against a list of labels
+        
+        Args:
+            image_embeds: Normalized embedding from encode_image
+            labels: List of possible labels
+        
+        Returns:
+            Dictionary of {label: confidence_score}
+        """
+        probs = self.score_labels_batch(image_embeds, labels)
+        return {label: float(probs[0][i].item()) for i, label in enumerate(labels)}
+    
     def classify_image(self, image, labels: List[str]) -> Dict[str, float]:
         """
         Classify image against a list of labels using Fashion-CLIP
@@ -119,37 +461,7 @@ class WardrobeClassifier:
             return {labels[0]: 0.0}  # Fallback
         
         try:
-            # Prepare text prompts with better context for fashion items
-            text_prompts = []
-            for label in labels:
-                # Use more specific prompts for better accuracy
-                if any(cat in label for cat in ["Tops", "Bottoms", "Dresses", "Shoes", "Jewelry", "Accessories"]):
-                    # Main category - use "clothing" context
-                    text_prompts.append(f"a photo of {label.lower()} clothing")
-                else:
-                    # Sub-categories and attributes
-                    text_prompts.append(f"a photo of a {label.lower()}")
-            
-            # Process inputs
-            inputs = self.processor(
-                text=text_prompts,
-                images=image,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            # Get predictions
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits_per_image = outputs.logits_per_image
-                probs = logits_per_image.softmax(dim=1)
-            
-            # Create results dictionary
-            results = {}
-            for i, label in enumerate(labels):
-                results[label] = float(probs[0][i].item())
-            
-            return results
+            return self.score_labels(self.encode_image(image), labels)
         
         except Exception as e:
             print(f"[ERROR] Classification error: {e}")
@@ -160,150 +472,311 @@ class WardrobeClassifier:
         results = self.classify_image(image, labels)
         return max(results, key=results.get)
     
-    def categorize_wardrobe_item(self, image_path: str) -> Dict:
+    def low_confidence_result(self) -> Dict:
+        """Classification returned when the item could not be identified"""
+        return {
+            "category": "Uncategorized",
+            "sub_category": "item",
+            "color": "unknown",
+            "secondary_color": None,
+            "style": "casual",
+            "pattern": "plain",
+            "name": "Wardrobe Item",
+            "description": "Uploaded item - needs manual categorization",
+            "tags": ["uncategorized", "low-confidence"],
+            "auto_categorized": False
+        }
+    
+    def error_result(self) -> Dict:
+        """Classification returned when categorization failed"""
+        return {
+            "category": "Uncategorized",
+            "sub_category": "item",
+            "color": "unknown",
+            "secondary_color": None,
+            "style": "casual",
+            "pattern": "plain",
+            "name": "Wardrobe Item",
+            "description": "Uploaded item",
+            "tags": ["uncategorized", "error"],
+            "auto_categorized": False
+        }
+    
+    def _build_classification(
+        self,
+        item_results: Dict[str, float],
+        color: str,
+        style: str,
+        pattern: str,
+        secondary_color: Optional[str] = None
+    ) -> Dict:
+        """Turn the per-step predictions for one image into a wardrobe classification"""
+        # STEP 1: First identify what the object actually IS
+        identified_item = max(item_results, key=item_results.get)
+        item_confidence = item_results[identified_item]
+        
+        print(f"🔍 Identified as: {identified_item} (confidence: {item_confidence:.2%})")
+        
+        # If confidence is too low, mark as uncategorized
+        if item_confidence < self.CONFIDENCE_THRESHOLD:
+            print(f"⚠️ Low confidence ({item_confidence:.2%}), marking as Uncategorized")
+            return self.low_confidence_result()
+        
+        # STEP 2: Map identified item to appropriate category
+        main_category = self.item_to_category.get(identified_item, "Uncategorized")
+        sub_category = identified_item
+        
+        # STEP 3-5: Color, style and pattern come from the cascade stages (defaults where skipped)
+        
+        # STEP 6: Generate display name - make it descriptive
+        style_prefix = "" if style.lower() == "casual" else f"{style.title()} "
+        pattern_part = "" if pattern.lower() == "plain" else f"{pattern.title()} "
+        
+        # Better naming based on item type
+        if identified_item in ["wristwatch"]:
+            display_name = f"{color.title()} Watch"
+        else:
+            display_name = f"{color.title()} {pattern_part}{style_prefix}{sub_category.title()}"
+        
+        description = f"{style} {color} {pattern} {identified_item}"
+        
+        # Create tags list
+        tags = [
+            identified_item.lower(),
+            style.lower(),
+            color.lower()
+        ]
+        
+        if pattern != "plain":
+            tags.append(pattern.lower())
+        
+        if secondary_color and secondary_color != color:
+            tags.append(secondary_color.lower())
+        
+        print(f"[SUCCESS] Categorized as: {main_category} > {identified_item} (confidence: {item_confidence:.2%})")
+        
+        return {
+            "category": main_category,
+            "sub_category": identified_item,
+            "color": color,
+            "secondary_color": secondary_color,
+            "style": style,
+            "pattern": pattern,
+            "name": display_name,
+            "description": description,
+            "tags": tags,
+            "auto_categorized": True
+        }
+    
+    def stage_applies(self, stage: Dict, item_type: str, confidence: float) -> bool:
+        """Whether a cascade stage should run for an identified item"""
+        if confidence < max(self.CONFIDENCE_THRESHOLD, stage["min_confidence"]):
+            return False
+        applies_to = stage["applies_to"]
+        return applies_to is None or self.item_to_category.get(item_type) in applies_to
+    
+    def categorize_embeddings(
+        self,
+        image_embeds: torch.Tensor,
+        colors: Optional[List[Optional[Dict]]] = None
+    ) -> List[Dict]:
         """
-        Fully categorize a wardrobe item - IMPROVED: Identify object first, then categorize
+        Categorize a batch of already-encoded images
+        
+        The item type is scored first; attribute stages then only score the
+        rows they apply to (see CASCADE_STAGES), each with one matrix product
+        against cached text embeddings.
         
         Args:
-            image_path: Path to the uploaded image
+            image_embeds: Normalized embeddings of shape (N, embed_dim)
+            colors: Optional per-image {"color", "secondary_color"} from
+                extract_colors; images without one get a CLIP-scored color
         
         Returns:
-            Dictionary with category, color, style, pattern, tags, etc.
+            List of N classification dictionaries, each including the image
+            "embedding" it was derived from
         """
-        try:
-            # Load image
-            image = Image.open(image_path).convert("RGB")
-            
-            # STEP 1: First identify what the object actually IS (comprehensive list)
-            all_item_types = [
-                # Tops
-                "shirt", "t-shirt", "kurta", "blouse", "tunic", "sweater", "jacket", "coat",
-                # Bottoms
-                "pants", "jeans", "trousers", "shalwar", "palazzo pants", "shorts", "skirt", "leggings",
-                # Dresses
-                "dress", "lehenga", "gown", "maxi dress", "anarkali",
-                # Footwear
-                "shoes", "sneakers", "sandals", "heels", "boots", "flats", "slippers",
-                # Accessories
-                "handbag", "purse", "backpack", "clutch", "belt", "sunglasses", "hat", "cap",
-                # Watches & Jewelry
-                "wristwatch", "bracelet", "necklace", "earrings", "ring",
-                # Scarves & Dupattas
-                "scarf", "dupatta", "stole", "shawl"
-            ]
-            
-            # Get what the item actually is
-            item_results = self.classify_image(image, all_item_types)
-            identified_item = max(item_results, key=item_results.get)
-            item_confidence = item_results[identified_item]
-            
-            print(f"🔍 Identified as: {identified_item} (confidence: {item_confidence:.2%})")
-            
-            # If confidence is too low, mark as uncategorized
-            if item_confidence < 0.30:
-                print(f"⚠️ Low confidence ({item_confidence:.2%}), marking as Uncategorized")
-                return {
-                    "category": "Uncategorized",
-                    "sub_category": "item",
-                    "color": "unknown",
-                    "style": "casual",
-                    "pattern": "plain",
-                    "name": "Wardrobe Item",
-                    "description": "Uploaded item - needs manual categorization",
-                    "tags": ["uncategorized", "low-confidence"],
-                    "auto_categorized": False
-                }
-            
-            # STEP 2: Map identified item to appropriate category
-            item_to_category_map = {
-                # Tops
-                "shirt": "Tops & Kurtas", "t-shirt": "Tops & Kurtas", "kurta": "Tops & Kurtas",
-                "blouse": "Tops & Kurtas", "tunic": "Tops & Kurtas", "sweater": "Tops & Kurtas",
-                "jacket": "Tops & Kurtas", "coat": "Tops & Kurtas",
-                # Bottoms
-                "pants": "Bottoms & Shalwar", "jeans": "Bottoms & Shalwar", "trousers": "Bottoms & Shalwar",
-                "shalwar": "Bottoms & Shalwar", "palazzo pants": "Bottoms & Shalwar",
-                "shorts": "Bottoms & Shalwar", "skirt": "Bottoms & Shalwar", "leggings": "Bottoms & Shalwar",
-                # Dresses
-                "dress": "Dresses & Lehengas", "lehenga": "Dresses & Lehengas",
-                "gown": "Dresses & Lehengas", "maxi dress": "Dresses & Lehengas",
-                "anarkali": "Dresses & Lehengas",
-                # Footwear
-                "shoes": "Shoes & Sandals", "sneakers": "Shoes & Sandals", "sandals": "Shoes & Sandals",
-                "heels": "Shoes & Sandals", "boots": "Shoes & Sandals", "flats": "Shoes & Sandals",
-                "slippers": "Shoes & Sandals",
-                # Accessories
-                "handbag": "Accessories & Bags", "purse": "Accessories & Bags", "backpack": "Accessories & Bags",
-                "clutch": "Accessories & Bags", "belt": "Accessories & Bags", "sunglasses": "Accessories & Bags",
-                "hat": "Accessories & Bags", "cap": "Accessories & Bags",
-                # Watches & Jewelry
-                "wristwatch": "Accessories & Bags", "bracelet": "Jewelry", "necklace": "Jewelry",
-                "earrings": "Jewelry", "ring": "Jewelry",
-                # Scarves
-                "scarf": "Dupattas & Scarves", "dupatta": "Dupattas & Scarves",
-                "stole": "Dupattas & Scarves", "shawl": "Dupattas & Scarves"
-            }
-            
-            main_category = item_to_category_map.get(identified_item, "Uncategorized")
-            sub_category = identified_item
-            
-            # STEP 3: Determine color
-            color = self.get_top_prediction(image, self.categories["colors"])
-            
-            # STEP 4: Determine style
-            style = self.get_top_prediction(image, self.categories["styles"])
-            
-            # STEP 5: Determine pattern
-            pattern = self.get_top_prediction(image, self.categories["patterns"])
-            
-            # STEP 6: Generate display name - make it descriptive
-            style_prefix = "" if style.lower() == "casual" else f"{style.title()} "
-            pattern_part = "" if pattern.lower() == "plain" else f"{pattern.title()} "
-            
-            # Better naming based on item type
-            if identified_item in ["wristwatch"]:
-                display_name = f"{color.title()} Watch"
-            else:
-                display_name = f"{color.title()} {pattern_part}{style_prefix}{sub_category.title()}"
-            
-            description = f"{style} {color} {pattern} {identified_item}"
-            
-            # Create tags list
-            tags = [
-                identified_item.lower(),
-                style.lower(),
-                color.lower()
+        if self.model is None:
+            return [self.low_confidence_result() for _ in range(image_embeds.shape[0])]
+        
+        num_images = image_embeds.shape[0]
+        colors = list(colors) if colors is not None else [None] * num_images
+        
+        started = time.perf_counter()
+        item_probs = self.score_labels_batch(image_embeds, self.item_types)
+        confidences, indices = item_probs.max(dim=-1)
+        identified = [self.item_types[i] for i in indices.tolist()]
+        confidences = confidences.tolist()
+        self.stage_timings.record("item_type", num_images, 0, time.perf_counter() - started)
+        
+        attributes = {"secondary_color": [None] * num_images}
+        for stage in self.CASCADE_STAGES:
+            started = time.perf_counter()
+            values = [stage["default"]] * num_images
+            rows = [
+                row for row in range(num_images)
+                if self.stage_applies(stage, identified[row], confidences[row])
             ]
             
-            if pattern != "plain":
-                tags.append(pattern.lower())
+            if stage["name"] == "color":
+                # Pixel colors where we have them; CLIP only for the rest
+                # (e.g. items re-categorized from stored embeddings)
+                for row in rows:
+                    if colors[row] is not None:
+                        values[row] = colors[row]["color"]
+                        attributes["secondary_color"][row] = colors[row].get("secondary_color")
+                rows = [row for row in rows if colors[row] is None]
             
-            print(f"[SUCCESS] Categorized as: {main_category} > {identified_item} (confidence: {item_confidence:.2%})")
+            if rows:
+                labels = self.categories[stage["labels"]]
+                top = self.score_labels_batch(image_embeds[rows], labels).argmax(dim=-1).tolist()
+                for row, label_index in zip(rows, top):
+                    values[row] = labels[label_index]
             
-            return {
-                "category": main_category,
-                "sub_category": identified_item,
-                "color": color,
-                "style": style,
-                "pattern": pattern,
-                "name": display_name,
-                "description": description,
-                "tags": tags,
-                "auto_categorized": True
-            }
+            attributes[stage["name"]] = values
+            self.stage_timings.record(
+                stage["name"], len(rows), num_images - len(rows), time.perf_counter() - started
+            )
         
-        except Exception as e:
-            print(f"[ERROR] Error categorizing item: {e}")
-            # Return fallback
-            return {
-                "category": "Uncategorized",
-                "sub_category": "item",
-                "color": "unknown",
-                "style": "casual",
-                "pattern": "plain",
-                "name": "Wardrobe Item",
-                "description": "Uploaded item",
-                "tags": ["uncategorized", "error"],
-                "auto_categorized": False
+        results = []
+        for row in range(num_images):
+            item_results = {
+                label: float(item_probs[row][i].item())
+                for i, label in enumerate(self.item_types)
             }
+            classification = self._build_classification(
+                item_results,
+                color=attributes["color"][row],
+                style=attributes["style"][row],
+                pattern=attributes["pattern"][row],
+                secondary_color=attributes["secondary_color"][row]
+            )
+            # Kept with the item so it can be re-categorized without the image
+            classification["embedding"] = image_embeds[row].tolist()
+            results.append(classification)
+        return results
+    
+    def categorize_pixel_values(
+        self,
+        pixel_values: torch.Tensor,
+        colors: Optional[List[Optional[Dict]]] = None
+    ) -> List[Dict]:
+        """
+        Categorize a batch of preprocessed images with a single vision pass
+        
+        Args:
+            pixel_values: Tensor of shape (N, 3, H, W) from preprocess_images
+            colors: Optional per-image colors from extract_image_colors
+        
+        Returns:
+            List of N classification dictionaries
+        """
+        if self.model is None:
+            return [self.low_confidence_result() for _ in range(pixel_values.shape[0])]
+        started = time.perf_counter()
+        image_embeds = self.encode_pixel_values(pixel_values)
+        self.stage_timings.record("vision", pixel_values.shape[0], 0, time.perf_counter() - started)
+        return self.categorize_embeddings(image_embeds, colors)
+    
+    def extract_image_colors(self, images: List[Image.Image]) -> List[Optional[Dict]]:
+        """
+        Dominant colors of decoded images (None where extraction fails)
+        """
+        colors = []
+        for image in images:
+            try:
+                colors.append(extract_colors(image))
+            except Exception as e:
+                print(f"[WARNING] Color extraction failed, using CLIP color: {e}")
+                colors.append(None)
+        return colors
+    
+    def decode_images(self, images: List) -> Tuple[List[Tuple[int, Image.Image]], List[Optional[Dict]]]:
+        """
+        Decode a list of inputs, isolating images that fail to load
+        
+        Returns:
+            Tuple of ([(index, RGB image), ...], results) where results holds an
+            error classification for every input that could not be decoded
+        """
+        results: List[Optional[Dict]] = [None] * len(images)
+        decoded = []
+        for index, image in enumerate(images):
+            try:
+                decoded.append((index, self.load_image(image)))
+            except Exception as e:
+                print(f"[ERROR] Error loading image {index}: {e}")
+                results[index] = self.error_result()
+        return decoded, results
+    
+    def categorize_wardrobe_items(self, images: List, batch_size: int = DEFAULT_BATCH_SIZE) -> List[Dict]:
+        """
+        Fully categorize several wardrobe items in batched forward passes
+        
+        Args:
+            images: List of PIL Images, raw image bytes or image paths
+            batch_size: Maximum number of images per forward pass
+        
+        Returns:
+            List of classification dictionaries, in the same order as images
+        """
+        decoded, results = self.decode_images(images)
+        
+        if self.model is None or self.processor is None:
+            for index, _ in decoded:
+                results[index] = self.low_confidence_result()
+            return results
+        
+        for start in range(0, len(decoded), batch_size):
+            chunk = decoded[start:start + batch_size]
+            try:
+                chunk_images = [image for _, image in chunk]
+                pixel_values = self.preprocess_images(chunk_images)
+                colors = self.extract_image_colors(chunk_images)
+                for (index, _), classification in zip(chunk, self.categorize_pixel_values(pixel_values, colors)):
+                    results[index] = classification
+            except Exception as e:
+                print(f"[ERROR] Error categorizing batch of {len(chunk)} items: {e}")
+                for index, _ in chunk:
+                    results[index] = self.error_result()
+        
+        return results
+    
+    def categorize_wardrobe_item(self, image) -> Dict:
+        """
+        Fully categorize a wardrobe item - IMPROVED: Identify object first, then categorize
+        
+        Args:
+            image: Path to the uploaded image, raw image bytes, or a PIL Image
+        
+        Returns:
+            Dictionary with category, color, style, pattern, tags, etc.
+        """
+        return self.categorize_wardrobe_items([image])[0]
+
+
+# Global instance (lazy loaded)
+_wardrobe_classifier = None
 
+def get_wardrobe_classifier() -> WardrobeClassifier:
+    """Get or create the shared wardrobe classifier instance"""
+    global _wardrobe_classifier
+    if _wardrobe_classifier is None:
+        _wardrobe_classifier = WardrobeClassifier()
+    return _wardrobe_classifier
+
+
+def warmup_fashion_model() -> Dict:
+    """
+    Load Fashion-CLIP and run one dummy classification
+    
+    This also fills the text embedding cache, so the first real upload
+    pays for neither model loading nor prompt encoding.
+    """
+    classifier = get_wardrobe_classifier()
+    if classifier.model is not None:
+        classifier.categorize_wardrobe_items([Image.new("RGB", (224, 224), (255, 255, 255))])
+        # Keep the dummy run out of the stage metrics
+        classifier.stage_timings.drain()
+        _model_status["warmed_up"] = True
+    return get_fashion_model_status()
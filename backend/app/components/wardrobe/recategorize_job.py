@@ -0,0 +1,188 @@
+"""
+Wardrobe Recategorization Jobs
+Re-categorizes a user's whole wardrobe on the background job queue.
+
+POST /wardrobe/recategorize/{user_id} enqueues a "recategorize" job over the
+user's current items (see app/core/jobs.py); the handler works in batches:
+1. Items with a stored Fashion-CLIP embedding are re-scored with one matrix
+   product per batch.
+2. The other items' images are fetched concurrently (bounded by
+   RECATEGORIZE_DOWNLOAD_CONCURRENCY, through the shared image cache) and
+   classified in one batched pass.
+3. The rows are updated, and progress plus a checkpoint are saved.
+
+A job interrupted by a restart resumes after the last checkpointed batch.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.database import get_user_wardrobe, get_wardrobe_items_by_ids, update_wardrobe_item
+from app.core.image_fetcher import fetch_image
+from app.core.jobs import JobContext, JobQueue
+from app.components.ai.embedding_store import get_embedding_store
+from app.components.ai.inference_executor import categorize_embeddings_async, categorize_wardrobe_items_cached
+from app.components.ai.wardrobe_classifier import DEFAULT_BATCH_SIZE, FASHION_CLIP_MODEL_NAME
+
+RECATEGORIZE_JOB_TYPE = "recategorize"
+# Images downloaded at the same time by one job
+RECATEGORIZE_DOWNLOAD_CONCURRENCY = int(os.getenv("RECATEGORIZE_DOWNLOAD_CONCURRENCY", "8"))
+
+# Per-item errors kept in the job progress
+MAX_REPORTED_ERRORS = 50
+
+
+async def _download_image(url: str, semaphore: asyncio.Semaphore) -> bytes:
+    async with semaphore:
+        return await fetch_image(url)
+
+
+def _classification_updates(classification: Dict) -> Dict:
+    """Row update for a new classification"""
+    return {
+        "name": classification["name"],
+        "description": classification["description"],
+        "category": classification["category"],
+        "sub_category": classification["sub_category"],
+        "color": classification["color"],
+        "style": classification["style"],
+        "pattern": classification["pattern"],
+        "tags": classification["tags"],
+        "auto_categorized": True,
+        "updated_at": datetime.now().isoformat()
+    }
+
+
+async def enqueue_recategorize_job(queue: JobQueue, user_id: str) -> Dict:
+    """
+    Queue recategorization of all of a user's items
+
+    Returns the user's unfinished job instead if there is one.
+    """
+    existing = await queue.find_active(RECATEGORIZE_JOB_TYPE, user_id)
+    if existing is not None:
+        return existing
+
+    items = await get_user_wardrobe(user_id)
+    item_ids = [item["id"] for item in items if item.get("id")]
+    return await queue.enqueue(RECATEGORIZE_JOB_TYPE, {"user_id": user_id, "item_ids": item_ids}, user_id=user_id)
+
+
+async def _recategorize_batch(user_id: str, item_ids: List[str], progress: Dict) -> None:
+    """Classify and update one batch of items, adding the outcome to progress"""
+    items = {item["id"]: item for item in await get_wardrobe_items_by_ids(user_id, item_ids)}
+    # Items deleted since the job was queued
+    skipped = len(item_ids) - len(items)
+    errors = []
+    classified = []
+
+    # Items with a stored embedding only need the (cached) text side of CLIP
+    store = get_embedding_store()
+    stored = await asyncio.to_thread(store.get_many, list(items), FASHION_CLIP_MODEL_NAME)
+    embedded_items = [item for item in items.values() if item["id"] in stored]
+    if embedded_items:
+        # Without the pixels, keep the color already extracted for the item
+        colors = [
+            {"color": item["color"], "secondary_color": None}
+            if item.get("color") not in (None, "", "unknown") else None
+            for item in embedded_items
+        ]
+        classifications = await categorize_embeddings_async(
+            np.stack([stored[item["id"]] for item in embedded_items]),
+            colors
+        )
+        classified.extend(zip(embedded_items, classifications))
+
+    # Older items: download their images concurrently and classify them in one pass
+    missing_items = [item for item in items.values() if item["id"] not in stored]
+    skipped += sum(1 for item in missing_items if not item.get("image_url"))
+    missing_items = [item for item in missing_items if item.get("image_url")]
+    semaphore = asyncio.Semaphore(max(1, RECATEGORIZE_DOWNLOAD_CONCURRENCY))
+    downloads = await asyncio.gather(
+        *[_download_image(item["image_url"], semaphore) for item in missing_items],
+        return_exceptions=True
+    )
+    downloaded_items, images = [], []
+    for item, download in zip(missing_items, downloads):
+        if isinstance(download, Exception):
+            errors.append({"item_id": item["id"], "error": f"Download failed: {download}"})
+        else:
+            downloaded_items.append(item)
+            images.append(download)
+
+    if images:
+        classifications = await categorize_wardrobe_items_cached(images)
+        for item, classification in zip(downloaded_items, classifications):
+            # Undecodable images keep their current category
+            if "error" in classification.get("tags", []):
+                errors.append({"item_id": item["id"], "error": "Image could not be classified"})
+                continue
+            if classification.get("embedding"):
+                try:
+                    await asyncio.to_thread(
+                        store.put, item["id"], user_id, classification["embedding"], FASHION_CLIP_MODEL_NAME
+                    )
+                except Exception as e:
+                    print(f"[WARNING] Could not store embedding for item {item['id']}: {e}")
+            classified.append((item, classification))
+
+    updated = 0
+    for item, classification in classified:
+        try:
+            await update_wardrobe_item(item["id"], user_id, _classification_updates(classification))
+            updated += 1
+        except Exception as e:
+            print(f"Error recategorizing item {item['id']}: {e}")
+            errors.append({"item_id": item["id"], "error": str(e)})
+
+    progress["processed"] += len(item_ids)
+    progress["updated"] += updated
+    progress["failed"] += len(errors)
+    progress["skipped"] += skipped
+    progress["from_stored_embeddings"] += len(embedded_items)
+    progress["errors"] = (progress["errors"] + errors)[:MAX_REPORTED_ERRORS]
+
+
+async def run_recategorize_job(ctx: JobContext) -> Dict:
+    """
+    Job handler: recategorize the items listed in the job params
+
+    Checkpoints the position in the item list after every batch, so a
+    resumed job skips the batches that were already saved.
+    """
+    user_id = ctx.params["user_id"]
+    item_ids = ctx.params["item_ids"]
+    cursor = (ctx.checkpoint or {}).get("cursor", 0)
+    # Counters saved together with the checkpoint, so they match the cursor
+    saved = (ctx.checkpoint or {}).get("progress", {})
+    progress = {
+        "total": len(item_ids),
+        "processed": saved.get("processed", 0),
+        "updated": saved.get("updated", 0),
+        "failed": saved.get("failed", 0),
+        "skipped": saved.get("skipped", 0),
+        "from_stored_embeddings": saved.get("from_stored_embeddings", 0),
+        "errors": saved.get("errors", [])
+    }
+    await ctx.report(progress)
+    print(f"[JOB] Recategorizing {len(item_ids) - cursor} of {len(item_ids)} items for user {user_id}")
+
+    while cursor < len(item_ids):
+        batch = item_ids[cursor:cursor + DEFAULT_BATCH_SIZE]
+        await _recategorize_batch(user_id, batch, progress)
+        cursor += len(batch)
+        await ctx.report(progress, checkpoint={"cursor": cursor, "progress": progress})
+
+    return {
+        "message": f"Successfully recategorized {progress['updated']} items!",
+        **progress
+    }
+
+
+def register_recategorize_job(queue: JobQueue) -> None:
+    """Add the recategorize handler to a job queue"""
+    queue.register(RECATEGORIZE_JOB_TYPE, run_recategorize_job, concurrency=2)
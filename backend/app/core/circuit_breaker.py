@@ -0,0 +1,124 @@
+"""
+Circuit Breaker
+Fast-fails calls to a remote dependency that keeps failing.
+
+closed     Calls go through. failure_threshold failures or timeouts within
+           window_seconds open the circuit; a success clears the count.
+open       Calls are refused for reset_seconds, so callers go straight to
+           their fallback instead of waiting on the timeout again.
+half_open  After reset_seconds one probe call is let through at a time; its
+           success closes the circuit, its failure opens it again.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Failure-counting breaker around one remote dependency"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        window_seconds: float = 300.0,
+        reset_seconds: float = 60.0
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.window_seconds = window_seconds
+        self.reset_seconds = reset_seconds
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures: deque = deque()
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+
+        # Metrics
+        self._rejected = 0
+        self._times_opened = 0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go out now
+
+        Returns:
+            True if the caller should make the call (and then record its
+            outcome), False if it should use its fallback right away
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+                print(f"[BREAKER] {self.name}: half-open, probing")
+
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """The call succeeded"""
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"[BREAKER] {self.name}: recovered, closing circuit")
+            self._state = CLOSED
+            self._failures.clear()
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        """The call failed or timed out"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_error = error
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window_seconds:
+                self._failures.popleft()
+            if self._state == CLOSED and len(self._failures) >= self.failure_threshold:
+                self._open(now)
+
+    def record_cancelled(self) -> None:
+        """The call was abandoned before it finished; frees the half-open probe slot"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, now: float) -> None:
+        """Open the circuit (caller holds the lock)"""
+        self._state = OPEN
+        self._opened_at = now
+        self._failures.clear()
+        self._times_opened += 1
+        print(f"[BREAKER] {self.name}: circuit open for {self.reset_seconds:.0f}s ({self._last_error})")
+
+    def status(self) -> Dict:
+        """State and counters for health output"""
+        with self._lock:
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": self._state,
+                "recent_failures": len(self._failures),
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": retry_in,
+                "rejected_calls": self._rejected,
+                "times_opened": self._times_opened,
+                "last_error": self._last_error
+            }
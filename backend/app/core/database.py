@@ -243,6 +243,26 @@ async def get_user_wardrobe(user_id: str) -> list:
         print(f"Error fetching wardrobe: {e}")
         raise e
 
+async def get_wardrobe_items_by_ids(user_id: str, item_ids: list) -> list:
+    """
+    Get specific wardrobe items of a user.
+    
+    Args:
+        user_id: User's UUID
+        item_ids: Item UUIDs to fetch
+    
+    Returns:
+        List of wardrobe items (in no particular order)
+    """
+    if not item_ids:
+        return []
+    try:
+        response = supabase.table("wardrobe_items").select("*").eq("user_id", user_id).in_("id", list(item_ids)).execute()
+        return response.data if response.data else []
+    except Exception as e:
+        print(f"Error fetching wardrobe items: {e}")
+        raise e
+
 async def delete_wardrobe_item(item_id: str, user_id: str) -> bool:
     """
     Delete a wardrobe item.
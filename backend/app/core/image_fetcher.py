@@ -0,0 +1,301 @@
+"""
+Image Fetcher
+One download path for profile photos and wardrobe images.
+
+Images are fetched with a shared keep-alive httpx.AsyncClient and kept in a
+content-addressed cache under IMAGE_CACHE_DIR:
+- blobs/: one file per distinct image, named by the SHA-256 of its bytes
+- urls/: per URL, the blob it last returned plus its ETag / Last-Modified
+
+A cached URL younger than IMAGE_CACHE_FRESH_SECONDS is served without a
+request; older ones are revalidated with a conditional GET, and a 304 keeps
+the blob. The blobs are capped at IMAGE_CACHE_MAX_MB and evicted least
+recently used first. Concurrent fetches of one URL share a single download.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Empty disables the disk cache (images are still fetched through the shared client)
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", ".cache/images")
+IMAGE_CACHE_MAX_MB = float(os.getenv("IMAGE_CACHE_MAX_MB", "1024"))
+# Cached URLs younger than this are served without revalidation
+IMAGE_CACHE_FRESH_SECONDS = float(os.getenv("IMAGE_CACHE_FRESH_SECONDS", "300"))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "30"))
+IMAGE_FETCH_MAX_CONNECTIONS = int(os.getenv("IMAGE_FETCH_MAX_CONNECTIONS", "20"))
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageFetcher:
+    """Pooled HTTP client in front of a content-addressed on-disk image cache"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = IMAGE_CACHE_DIR,
+        max_disk_bytes: int = int(IMAGE_CACHE_MAX_MB * 1024 * 1024),
+        fresh_seconds: float = IMAGE_CACHE_FRESH_SECONDS,
+        timeout: float = IMAGE_FETCH_TIMEOUT,
+        max_connections: int = IMAGE_FETCH_MAX_CONNECTIONS
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max(0, max_disk_bytes)
+        self.fresh_seconds = fresh_seconds
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # URL -> download in progress
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        # Blob bytes currently on disk; computed lazily on the first write
+        self._disk_bytes: Optional[int] = None
+
+        # Metrics
+        self._hits = 0
+        self._revalidated = 0
+        self._downloads = 0
+        self._downloaded_bytes = 0
+        self._shared = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client (created on first use, in the running event loop)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def fetch(self, url: str) -> bytes:
+        """
+        Get an image's bytes, from the cache when possible
+
+        Args:
+            url: Image URL
+
+        Returns:
+            Raw image bytes
+
+        Raises:
+            httpx.HTTPError: If the download fails
+        """
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(url))
+            self._inflight[url] = future
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        else:
+            with self._lock:
+                self._shared += 1
+        # One caller giving up must not cancel the download for the others
+        return await asyncio.shield(future)
+
+    async def _fetch(self, url: str) -> bytes:
+        if self.cache_dir is None:
+            response = await self.client.get(url)
+            response.raise_for_status()
+            self._count_download(len(response.content))
+            return response.content
+
+        cached = await asyncio.to_thread(self._load, url)
+        if cached is not None:
+            meta, data = cached
+            if time.time() - meta.get("validated_at", 0) < self.fresh_seconds:
+                with self._lock:
+                    self._hits += 1
+                return data
+
+        headers = {}
+        if cached is not None:
+            if cached[0].get("etag"):
+                headers["If-None-Match"] = cached[0]["etag"]
+            if cached[0].get("last_modified"):
+                headers["If-Modified-Since"] = cached[0]["last_modified"]
+
+        response = await self.client.get(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            meta, data = cached
+            meta["validated_at"] = time.time()
+            await asyncio.to_thread(self._write_meta, url, meta)
+            with self._lock:
+                self._revalidated += 1
+            return data
+
+        response.raise_for_status()
+        data = response.content
+        self._count_download(len(data))
+        await asyncio.to_thread(
+            self._store,
+            url,
+            data,
+            response.headers.get("etag"),
+            response.headers.get("last-modified")
+        )
+        return data
+
+    def _count_download(self, size: int) -> None:
+        with self._lock:
+            self._downloads += 1
+            self._downloaded_bytes += size
+
+    def stats(self) -> Dict:
+        """Cache and download metrics"""
+        with self._lock:
+            lookups = self._hits + self._revalidated + self._downloads
+            return {
+                "hits": self._hits,
+                "revalidated": self._revalidated,
+                "downloads": self._downloads,
+                "downloaded_bytes": self._downloaded_bytes,
+                "shared_downloads": self._shared,
+                "hit_rate": round((self._hits + self._revalidated) / lookups, 3) if lookups else 0.0,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes if self.cache_dir else None
+            }
+
+    async def close(self) -> None:
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ---- disk cache (called in worker threads) ----
+
+    def _meta_path(self, url: str) -> Path:
+        url_hash = _sha256(url.encode("utf-8"))
+        return self.cache_dir / "urls" / url_hash[:2] / f"{url_hash}.json"
+
+    def _blob_path(self, content_hash: str) -> Path:
+        return self.cache_dir / "blobs" / content_hash[:2] / content_hash
+
+    def _load(self, url: str) -> Optional[Tuple[Dict, bytes]]:
+        """Cached metadata and bytes for a URL, or None"""
+        try:
+            with open(self._meta_path(url), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            blob_path = self._blob_path(meta["content_hash"])
+            data = blob_path.read_bytes()
+            # Refresh mtime so eviction approximates least-recently-used
+            os.utime(blob_path)
+            return meta, data
+        except (FileNotFoundError, KeyError):
+            # Never fetched, or the blob was evicted
+            return None
+        except Exception as e:
+            print(f"[WARNING] Could not read image cache for {url[:50]}: {e}")
+            return None
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        # Atomic rename so concurrent workers never read a partial file
+        os.replace(temp_path, path)
+
+    def _write_meta(self, url: str, meta: Dict) -> None:
+        try:
+            self._write_atomic(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+        except Exception as e:
+            print(f"[WARNING] Could not write image cache metadata: {e}")
+
+    def _store(self, url: str, data: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Save a downloaded image and point its URL at it"""
+        try:
+            content_hash = _sha256(data)
+            blob_path = self._blob_path(content_hash)
+            added = 0
+            if blob_path.exists():
+                os.utime(blob_path)
+            else:
+                self._write_atomic(blob_path, data)
+                added = len(data)
+            self._write_meta(url, {
+                "url": url,
+                "content_hash": content_hash,
+                "etag": etag,
+                "last_modified": last_modified,
+                "validated_at": time.time()
+            })
+
+            with self._lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(size for _, size, _ in self._blobs())
+                else:
+                    self._disk_bytes += added
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict_disk()
+        except Exception as e:
+            print(f"[WARNING] Could not write image cache: {e}")
+
+    def _blobs(self) -> List[Tuple[float, int, Path]]:
+        blobs = []
+        for path in (self.cache_dir / "blobs").glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+                blobs.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                pass
+        return blobs
+
+    def _evict_disk(self) -> None:
+        """Delete the least recently used blobs until the cache is ~10% under its limit (caller holds the lock)"""
+        target = int(self.max_disk_bytes * 0.9)
+        blobs = self._blobs()
+        total = sum(size for _, size, _ in blobs)
+        removed = 0
+        for _, size, path in sorted(blobs, key=lambda blob: blob[0]):
+            if total <= target:
+                break
+            try:
+                # URL entries pointing here become misses on their next fetch
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        self._disk_bytes = total
+        print(f"[CACHE] Evicted {removed} cached images from disk")
+
+
+# Global instance (lazy loaded)
+_image_fetcher: Optional[ImageFetcher] = None
+
+def get_image_fetcher() -> ImageFetcher:
+    """Get or create the shared image fetcher"""
+    global _image_fetcher
+    if _image_fetcher is None:
+        _image_fetcher = ImageFetcher()
+    return _image_fetcher
+
+
+async def fetch_image(url: str) -> bytes:
+    """Image bytes for a URL through the shared fetcher and cache"""
+    return await get_image_fetcher().fetch(url)
+
+
+async def close_image_fetcher() -> None:
+    """Close the shared HTTP client (called on server shutdown)"""
+    global _image_fetcher
+    if _image_fetcher is not None:
+        await _image_fetcher.close()
+        _image_fetcher = None
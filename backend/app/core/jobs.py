@@ -0,0 +1,678 @@
+"""
+Background Job Queue
+Runs long AI work (look generation, recategorization, ...) outside the HTTP
+request that asked for it.
+
+A route enqueues a job and returns its id right away; clients poll
+GET /jobs/{job_id} for status, progress and result, and cancel with
+DELETE /jobs/{job_id}. Finished jobs are kept for their type's TTL, then purged.
+
+Handlers are registered per job type with their own concurrency: every API
+process runs that many asyncio workers for the type
+(JOB_CONCURRENCY_<TYPE> overrides the default).
+
+Backends (JOB_BACKEND):
+- memory: in-process only; queued and running jobs are lost on restart
+- sqlite: durable local file (JOB_DB_PATH). A running job holds a lease its
+  worker keeps renewing; jobs of a process that died are picked up again once
+  the lease expires, and a clean shutdown hands them back at once.
+
+A job whose lease expired JOB_MAX_ATTEMPTS times (e.g. it keeps crashing its
+worker) is marked failed instead of being picked up again. Every backend call
+made from the event loop (workers, progress reports, and the JobQueue methods
+routes use) runs on a thread, so a busy SQLite file never blocks the loop.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite").lower()
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", ".cache/jobs.sqlite3")
+# Finished jobs (and their results) are kept this long
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+# A running job whose worker stopped renewing its lease this long ago is retried
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+# How often idle workers look for jobs enqueued by other processes
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# Attempts after which a job whose lease expired is failed instead of retried
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Error recorded on a job that ran out of attempts
+_ATTEMPTS_EXHAUSTED = "Job was interrupted too many times"
+
+# Internal fields left out of the job status returned to clients
+_PRIVATE_FIELDS = ("checkpoint", "owner", "heartbeat", "ttl")
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled or taken over"""
+
+
+def job_concurrency(job_type: str, default: int) -> int:
+    """Worker count for a job type, from JOB_CONCURRENCY_<TYPE> if set"""
+    return max(1, int(os.getenv(f"JOB_CONCURRENCY_{job_type.upper()}", str(default))))
+
+
+def public_job(job: Optional[Dict]) -> Optional[Dict]:
+    """Job status as returned to clients"""
+    if job is None:
+        return None
+    return {key: value for key, value in job.items() if key not in _PRIVATE_FIELDS}
+
+
+def _new_job(job_type: str, params: Dict, user_id: Optional[str], ttl: float) -> Dict:
+    return {
+        "job_id": uuid.uuid4().hex,
+        "job_type": job_type,
+        "user_id": user_id,
+        "status": QUEUED,
+        "params": params,
+        "progress": {},
+        "checkpoint": None,
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "owner": None,
+        "heartbeat": None,
+        "ttl": ttl,
+        "created_at": datetime.now().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "expires_at": None
+    }
+
+
+class InMemoryJobBackend:
+    """Jobs kept in a dict; lives and dies with the process"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_type: str, params: Dict, user_id: Optional[str], ttl: float) -> Dict:
+        job = _new_job(job_type, params, user_id, ttl)
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            return copy.deepcopy(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (job["expires_at"] is not None and job["expires_at"] < time.time()):
+                return None
+            return copy.deepcopy(job)
+
+    def find_active(self, job_type: str, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job["job_type"] == job_type and job["user_id"] == user_id and job["status"] in ACTIVE_STATUSES:
+                    return copy.deepcopy(job)
+        return None
+
+    def claim(
+        self,
+        job_types: Sequence[str],
+        owner: str,
+        lease_seconds: float,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            for job in self._jobs.values():
+                if job["job_type"] not in job_types:
+                    continue
+                stale = job["status"] == RUNNING and (job["heartbeat"] or 0) < now - lease_seconds
+                if stale and job["attempts"] >= max_attempts:
+                    job.update(
+                        status=FAILED, error=_ATTEMPTS_EXHAUSTED, owner=None, heartbeat=None,
+                        finished_at=datetime.now().isoformat(), expires_at=now + job["ttl"]
+                    )
+                    continue
+                if job["status"] == QUEUED or stale:
+                    job.update(
+                        status=RUNNING, owner=owner, heartbeat=now, attempts=job["attempts"] + 1,
+                        started_at=job["started_at"] or datetime.now().isoformat()
+                    )
+                    return copy.deepcopy(job)
+        return None
+
+    def heartbeat(self, job_id: str, owner: str, progress: Optional[Dict] = None, checkpoint: Any = None) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != RUNNING or job["owner"] != owner:
+                return False
+            job["heartbeat"] = time.time()
+            if progress is not None:
+                job["progress"] = copy.deepcopy(progress)
+            if checkpoint is not None:
+                job["checkpoint"] = copy.deepcopy(checkpoint)
+            return True
+
+    def finish(self, job_id: str, owner: str, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != RUNNING or job["owner"] != owner:
+                return False
+            job.update(
+                status=status, result=copy.deepcopy(result), error=error, owner=None, heartbeat=None,
+                finished_at=datetime.now().isoformat(), expires_at=time.time() + job["ttl"]
+            )
+            return True
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in ACTIVE_STATUSES:
+                job.update(
+                    status=CANCELLED, owner=None, heartbeat=None,
+                    finished_at=datetime.now().isoformat(), expires_at=time.time() + job["ttl"]
+                )
+            return copy.deepcopy(job)
+
+    def release(self, job_id: str, owner: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == RUNNING and job["owner"] == owner:
+                job.update(status=QUEUED, owner=None, heartbeat=None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job["expires_at"] is not None and job["expires_at"] < now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+
+class SQLiteJobBackend:
+    """Jobs in a local SQLite file, shared by every process on the host"""
+
+    _JSON_FIELDS = ("params", "progress", "checkpoint", "result")
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        # One connection shared across threads; the lock serializes access
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    user_id TEXT,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    checkpoint TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    heartbeat REAL,
+                    ttl REAL NOT NULL,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    expires_at REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, job_type, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, job_type, status)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expiry ON jobs(expires_at)")
+
+    def _job(self, row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        for field in self._JSON_FIELDS:
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def create(self, job_type: str, params: Dict, user_id: Optional[str], ttl: float) -> Dict:
+        job = _new_job(job_type, params, user_id, ttl)
+        row = dict(job)
+        for field in self._JSON_FIELDS:
+            row[field] = json.dumps(job[field]) if job[field] is not None else None
+        columns = ", ".join(row)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({columns}) VALUES ({', '.join('?' for _ in row)})",
+                tuple(row.values())
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE job_id = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (job_id, time.time())
+            ).fetchone()
+        return self._job(row)
+
+    def find_active(self, job_type: str, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT * FROM jobs WHERE user_id = ? AND job_type = ? AND status IN (?, ?)
+                ORDER BY created_at DESC LIMIT 1
+                """,
+                (user_id, job_type, *ACTIVE_STATUSES)
+            ).fetchone()
+        return self._job(row)
+
+    def claim(
+        self,
+        job_types: Sequence[str],
+        owner: str,
+        lease_seconds: float,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ) -> Optional[Dict]:
+        if not job_types:
+            return None
+        now = time.time()
+        placeholders = ", ".join("?" for _ in job_types)
+        with self._lock:
+            # BEGIN IMMEDIATE: two processes never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"""
+                    UPDATE jobs SET status = ?, error = ?, owner = NULL, heartbeat = NULL,
+                    finished_at = ?, expires_at = ? + ttl
+                    WHERE job_type IN ({placeholders}) AND status = ? AND heartbeat < ? AND attempts >= ?
+                    """,
+                    (
+                        FAILED, _ATTEMPTS_EXHAUSTED, datetime.now().isoformat(), now,
+                        *job_types, RUNNING, now - lease_seconds, max_attempts
+                    )
+                )
+                row = self._conn.execute(
+                    f"""
+                    SELECT job_id FROM jobs
+                    WHERE job_type IN ({placeholders})
+                    AND (status = ? OR (status = ? AND heartbeat < ?))
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (*job_types, QUEUED, RUNNING, now - lease_seconds)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, attempts = attempts + 1,
+                    started_at = COALESCE(started_at, ?)
+                    WHERE job_id = ?
+                    """,
+                    (RUNNING, owner, now, datetime.now().isoformat(), row["job_id"])
+                )
+                job = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._job(job)
+
+    def heartbeat(self, job_id: str, owner: str, progress: Optional[Dict] = None, checkpoint: Any = None) -> bool:
+        assignments = ["heartbeat = ?"]
+        values: List[Any] = [time.time()]
+        if progress is not None:
+            assignments.append("progress = ?")
+            values.append(json.dumps(progress))
+        if checkpoint is not None:
+            assignments.append("checkpoint = ?")
+            values.append(json.dumps(checkpoint))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {', '.join(assignments)} WHERE job_id = ? AND status = ? AND owner = ?",
+                (*values, job_id, RUNNING, owner)
+            )
+            return cursor.rowcount == 1
+
+    def finish(self, job_id: str, owner: str, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, heartbeat = NULL,
+                finished_at = ?, expires_at = ? + ttl
+                WHERE job_id = ? AND status = ? AND owner = ?
+                """,
+                (
+                    status, json.dumps(result) if result is not None else None, error,
+                    datetime.now().isoformat(), time.time(), job_id, RUNNING, owner
+                )
+            )
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, owner = NULL, heartbeat = NULL, finished_at = ?, expires_at = ? + ttl
+                WHERE job_id = ? AND status IN (?, ?)
+                """,
+                (CANCELLED, datetime.now().isoformat(), time.time(), job_id, *ACTIVE_STATUSES)
+            )
+        return self.get(job_id)
+
+    def release(self, job_id: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, heartbeat = NULL WHERE job_id = ? AND status = ? AND owner = ?",
+                (QUEUED, job_id, RUNNING, owner)
+            )
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobContext:
+    """What a handler sees of its job"""
+
+    def __init__(self, queue: "JobQueue", job: Dict):
+        self._queue = queue
+        self.job_id = job["job_id"]
+        self.user_id = job["user_id"]
+        self.params = job["params"]
+        # Progress and checkpoint saved by an earlier attempt (empty on the first one)
+        self.progress = job["progress"] or {}
+        self.checkpoint = job["checkpoint"]
+        self.attempt = job["attempts"]
+
+    async def report(self, progress: Dict, checkpoint: Any = None) -> None:
+        """
+        Publish progress (and optionally a checkpoint to resume from)
+
+        Raises:
+            JobCancelled: If the job was cancelled or another worker took it over
+        """
+        self.progress = progress
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        renewed = await asyncio.to_thread(
+            self._queue.backend.heartbeat, self.job_id, self._queue.owner, progress, checkpoint
+        )
+        if not renewed:
+            raise JobCancelled(self.job_id)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+
+class JobQueue:
+    """Registry of job handlers plus the asyncio workers that run them"""
+
+    def __init__(
+        self,
+        backend,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        poll_seconds: float = JOB_POLL_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ):
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._handlers: Dict[str, Dict] = {}
+        self._wakeup: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        # job_id -> handler task of jobs running in this process
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def register(
+        self,
+        job_type: str,
+        handler: JobHandler,
+        concurrency: int = 1,
+        ttl: float = JOB_RESULT_TTL_SECONDS
+    ) -> None:
+        """
+        Register the coroutine that runs jobs of job_type
+
+        Args:
+            job_type: Name used when enqueueing
+            handler: async handler(ctx: JobContext) -> JSON-serializable result
+            concurrency: Jobs of this type run at once per process (JOB_CONCURRENCY_<TYPE> overrides)
+            ttl: Seconds a finished job and its result are kept
+        """
+        self._handlers[job_type] = {
+            "handler": handler,
+            "concurrency": job_concurrency(job_type, concurrency),
+            "ttl": ttl
+        }
+
+    async def enqueue(self, job_type: str, params: Dict, user_id: Optional[str] = None) -> Dict:
+        """
+        Queue a job
+
+        Args:
+            job_type: A registered job type
+            params: JSON-serializable handler arguments
+            user_id: Owner, checked by the status endpoints
+
+        Returns:
+            Public job status
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type {job_type!r}")
+        job = await asyncio.to_thread(
+            self.backend.create, job_type, params, user_id, self._handlers[job_type]["ttl"]
+        )
+        event = self._wakeup.get(job_type)
+        if event is not None:
+            event.set()
+        print(f"[JOB] Queued {job_type} job {job['job_id']}")
+        return public_job(job)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Public status of a job (None if unknown or expired)"""
+        return public_job(await asyncio.to_thread(self.backend.get, job_id))
+
+    async def find_active(self, job_type: str, user_id: str) -> Optional[Dict]:
+        """The user's queued or running job of a type, if any"""
+        return public_job(await asyncio.to_thread(self.backend.find_active, job_type, user_id))
+
+    async def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a queued or running job
+
+        Jobs running in this process stop at once; jobs running elsewhere stop
+        at their next progress report.
+        """
+        job = await asyncio.to_thread(self.backend.cancel, job_id)
+        task = self._running.get(job_id)
+        if task is not None and not task.done():
+            task.cancel()
+        return public_job(job)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "jobs": await asyncio.to_thread(self.backend.stats),
+            "running_here": len(self._running),
+            "concurrency": {job_type: entry["concurrency"] for job_type, entry in self._handlers.items()}
+        }
+
+    def start(self) -> None:
+        """Start the workers of every registered job type (call from the running event loop)"""
+        if self._workers:
+            return
+        for job_type, entry in self._handlers.items():
+            self._wakeup[job_type] = asyncio.Event()
+            for _ in range(entry["concurrency"]):
+                self._workers.append(asyncio.create_task(self._worker(job_type)))
+        self._workers.append(asyncio.create_task(self._purge_loop()))
+
+    async def shutdown(self) -> None:
+        """Stop the workers and hand running jobs back to the queue"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = {}
+
+    async def _worker(self, job_type: str) -> None:
+        while True:
+            claim = asyncio.ensure_future(asyncio.to_thread(
+                self.backend.claim, [job_type], self.owner, self.lease_seconds, self.max_attempts
+            ))
+            try:
+                job = await asyncio.shield(claim)
+            except asyncio.CancelledError:
+                # Shutting down mid-claim: hand back a job the thread still claimed
+                claimed, = await asyncio.gather(claim, return_exceptions=True)
+                if isinstance(claimed, dict):
+                    self.backend.release(claimed["job_id"], self.owner)
+                raise
+            except Exception as e:
+                print(f"[ERROR] Could not claim {job_type} job: {e}")
+                job = None
+
+            if job is None:
+                event = self._wakeup[job_type]
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Keep the worker alive; the job's lease expires and it is retried or failed
+                print(f"[ERROR] Worker for {job_type} jobs failed on job {job['job_id']}: {e}")
+
+    async def _heartbeat_loop(self, job_id: str, task: asyncio.Task) -> None:
+        # Renews the lease while the handler works between progress reports
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await asyncio.to_thread(self.backend.heartbeat, job_id, self.owner)
+            except Exception as e:
+                # Transient (e.g. database locked): try again on the next beat
+                print(f"[WARNING] Could not renew lease of job {job_id}: {e}")
+                continue
+            if not renewed:
+                task.cancel()
+                return
+
+    async def _run(self, job: Dict) -> None:
+        job_id = job["job_id"]
+        entry = self._handlers[job["job_type"]]
+        if job["attempts"] > 1:
+            print(f"[JOB] Resuming {job['job_type']} job {job_id} (attempt {job['attempts']})")
+        else:
+            print(f"[JOB] Running {job['job_type']} job {job_id}")
+
+        started = time.perf_counter()
+        task = asyncio.create_task(entry["handler"](JobContext(self, job)))
+        self._running[job_id] = task
+        heartbeat = asyncio.create_task(self._heartbeat_loop(job_id, task))
+        try:
+            # asyncio.wait doesn't raise when only the handler was cancelled
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # Shutting down: stop the handler and let the next start resume the job
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.to_thread(self.backend.release, job_id, self.owner)
+            raise
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+
+        elapsed = time.perf_counter() - started
+        if task.cancelled() or isinstance(task.exception(), JobCancelled):
+            print(f"[JOB] {job['job_type']} job {job_id} cancelled after {elapsed:.1f}s")
+        elif task.exception() is not None:
+            error = task.exception()
+            print(f"[ERROR] {job['job_type']} job {job_id} failed after {elapsed:.1f}s: {error}")
+            await asyncio.to_thread(
+                self.backend.finish, job_id, self.owner, FAILED,
+                error=getattr(error, "detail", None) or str(error)
+            )
+        else:
+            try:
+                await asyncio.to_thread(self.backend.finish, job_id, self.owner, COMPLETED, result=task.result())
+            except (TypeError, ValueError) as e:
+                # Result could not be stored (not JSON-serializable); retrying won't help
+                print(f"[ERROR] Could not save result of {job['job_type']} job {job_id}: {e}")
+                await asyncio.to_thread(
+                    self.backend.finish, job_id, self.owner, FAILED, error=f"Could not save job result: {e}"
+                )
+                return
+            print(f"[JOB] {job['job_type']} job {job_id} completed in {elapsed:.1f}s")
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.backend.purge_expired)
+                if purged:
+                    print(f"[JOB] Purged {purged} expired jobs")
+            except Exception as e:
+                print(f"[ERROR] Could not purge expired jobs: {e}")
+            await asyncio.sleep(60)
+
+
+def create_job_backend(kind: str = JOB_BACKEND):
+    """Backend named by JOB_BACKEND"""
+    if kind == "memory":
+        return InMemoryJobBackend()
+    if kind == "sqlite":
+        return SQLiteJobBackend()
+    raise ValueError(f"Unknown JOB_BACKEND {kind!r} (expected 'memory' or 'sqlite')")
+
+
+# Global instance (lazy loaded)
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Get or create the shared job queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(create_job_backend())
+    return _job_queue
@@ -1,23 +1,64 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os 
 
 from app.routes.auth import router as auth_router
-from app.routes.wardrobe import router as wardrobe_router
+from app.routes.wardrobe import router as wardrobe_router, get_classification_batcher, register_wardrobe_jobs
+from app.routes.jobs import router as jobs_router
+from app.core.jobs import get_job_queue
+from app.core.image_fetcher import get_image_fetcher, close_image_fetcher
 from app.components.ai.clip_insights import load_clip_model
+from app.components.ai.classification_cache import get_classification_cache
+from app.components.ai.tryon_cache import get_tryon_cache
+from app.components.ai.tryon_backends import TRYON_BACKEND
+from app.components.ai.virtual_tryon import get_tryon_breaker
+from app.components.ai.embedding_store import get_embedding_store
+from app.components.ai.wardrobe_classifier import get_wardrobe_classifier
+from app.components.ai.inference_executor import (
+    shutdown_inference_executor,
+    warmup_models,
+    get_model_status
+)
+
+# Load both models and run a dummy inference in the background at startup
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "false").lower() in ("1", "true", "yes")
+
+async def _warmup_in_background():
+    try:
+        print("[WARMUP] Loading CLIP and Fashion-CLIP models in the background...")
+        status = await warmup_models()
+        print(f"[WARMUP] Done: {status}")
+    except Exception as e:
+        print(f"[WARMUP] Model warmup failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Server startup and shutdown."""
     print("Starting LibaasAI Backend...")
-    print("CLIP model will be loaded lazily when first needed.")
-    print("Fashion-CLIP model will be loaded lazily for wardrobe categorization.")
+    warmup_task = None
+    if WARMUP_MODELS:
+        # /ready reports 503 until this finishes; /health stays available
+        warmup_task = asyncio.create_task(_warmup_in_background())
+    else:
+        print("CLIP model will be loaded lazily when first needed.")
+        print("Fashion-CLIP model will be loaded lazily for wardrobe categorization.")
     print("Kolors Virtual Try-On will be loaded when generating looks.")
+    # Background jobs; also resumes jobs interrupted by the last shutdown
+    job_queue = get_job_queue()
+    register_wardrobe_jobs(job_queue)
+    job_queue.start()
     print("Server startup complete!")
     print("API docs available at: http://127.0.0.1:8000/docs")
     yield
     print("Shutting down...")
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await get_job_queue().shutdown()
+    await close_image_fetcher()
+    shutdown_inference_executor()
 
 app = FastAPI(
     title="LibaasAI Backend",
@@ -39,6 +80,7 @@ app.add_middleware(
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(wardrobe_router)
+app.include_router(jobs_router)
 
 @app.get("/")
 async def root():
@@ -50,5 +92,41 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "libaas-ai-backend"}
+    return {
+        "status": "healthy",
+        "service": "libaas-ai-backend",
+        # An open circuit means try-ons currently use the mock fallback
+        "circuit_breakers": {
+            "virtual_tryon": {"backend": TRYON_BACKEND, **get_tryon_breaker().status()}
+        }
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe for the load balancer.
+    
+    With WARMUP_MODELS enabled this returns 503 until both models are loaded
+    and warmed up. With lazy loading the worker is always routable.
+    """
+    models = get_model_status()
+    ready = not WARMUP_MODELS or all(
+        model["state"] == "ready" and model.get("warmed_up") for model in models.values()
+    )
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "warmup_enabled": WARMUP_MODELS, "models": models}
+    )
 
+@app.get("/metrics/inference")
+async def inference_metrics():
+    """Queue depth and batch-size metrics for the shared inference batcher, plus cache hit rates."""
+    return {
+        "fashion_clip": get_classification_batcher().stats(),
+        "classifier_stages": get_wardrobe_classifier().stage_timings.stats(),
+        "classification_cache": get_classification_cache().stats(),
+        "embedding_store": get_embedding_store().stats(),
+        "image_cache": get_image_fetcher().stats(),
+        "tryon_cache": get_tryon_cache().stats() if get_tryon_cache() is not None else None,
+        "jobs": await get_job_queue().stats()
+    }
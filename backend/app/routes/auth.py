@@ -10,7 +10,7 @@ import json
 from app.core.database import create_user, get_user_by_email, upload_image_to_storage
 from app.schemas import SignupResponse, LoginRequest, LoginResponse, ClipInsights
 from app.components.auth.utils import hash_password, verify_password, generate_unique_filename, validate_image_type
-from app.components.ai.clip_insights import analyze_image
+from app.components.ai.inference_executor import analyze_image_async
 
 router = APIRouter()
 
@@ -73,8 +73,8 @@ async def signup(
                 content_type=image.content_type
             )
             
-            # 5. Generate AI insights using CLIP
-            clip_insights_data = analyze_image(image_bytes)
+            # 5. Generate AI insights using CLIP (off the event loop)
+            clip_insights_data = await analyze_image_async(image_bytes)
         
         # 6. Create user in database
         user_data = {
@@ -0,0 +1,77 @@
+"""
+Job API Routes
+Status, results and cancellation of background jobs (see app/core/jobs.py).
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+import os
+
+from app.core.jobs import ACTIVE_STATUSES, get_job_queue
+
+# How often the event stream checks a job for changes
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "0.5"))
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+async def _get_user_job(job_id: str, user_id: Optional[str]) -> dict:
+    """Job by id, or 404 if it is unknown, expired or belongs to another user"""
+    job = await get_job_queue().get(job_id)
+    if job is None or (user_id is not None and job["user_id"] != user_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, user_id: Optional[str] = None):
+    """
+    Status of a background job.
+
+    status is one of queued, running, completed, failed or cancelled;
+    progress is updated while it runs and result is set once it completes.
+    """
+    return {"success": True, "job": await _get_user_job(job_id, user_id)}
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, user_id: Optional[str] = None):
+    """
+    Server-sent events for a job.
+
+    Sends the job (same shape as GET /jobs/{job_id}) whenever its status or
+    progress changes, e.g. each try-on preview and result of a generate-looks
+    job, and closes once it has finished.
+    """
+    await _get_user_job(job_id, user_id)
+
+    async def stream():
+        last = None
+        while True:
+            job = await get_job_queue().get(job_id)
+            if job is None:
+                yield "event: gone\ndata: {}\n\n"
+                return
+            payload = json.dumps(job, default=str)
+            if payload != last:
+                last = payload
+                yield f"data: {payload}\n\n"
+            if job["status"] not in ACTIVE_STATUSES:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str, user_id: Optional[str] = None):
+    """Cancel a queued or running job (finished jobs are left as they are)."""
+    await _get_user_job(job_id, user_id)
+    return {"success": True, "job": await get_job_queue().cancel(job_id)}
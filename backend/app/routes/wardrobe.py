@@ -5,35 +5,110 @@ Handle wardrobe item upload, categorization, listing, and management.
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse
-from typing import Optional, Dict
+from typing import Awaitable, Callable, Optional, Dict, List, Tuple
+import asyncio
+import numpy as np
 import uuid
 from datetime import datetime
-import tempfile
 import os
 
+from app.core.jobs import JobContext, JobQueue, get_job_queue
 from app.core.database import (
     create_wardrobe_item,
     get_user_wardrobe,
+    get_wardrobe_items_by_ids,
     delete_wardrobe_item,
     update_wardrobe_item,
     upload_wardrobe_image,
     upload_tryon_image
 )
-from app.components.ai.wardrobe_classifier import WardrobeClassifier
-from app.components.ai.virtual_tryon import get_virtual_tryon_service
+from app.components.ai.wardrobe_classifier import FASHION_CLIP_MODEL_NAME
+from app.components.ai.inference_batcher import InferenceBatcher
+from app.components.ai.inference_executor import (
+    run_inference,
+    categorize_wardrobe_items_cached,
+    encode_text_query_async
+)
+from app.components.ai.embedding_store import get_embedding_store
+from app.components.ai.vector_index import get_user_index
+from app.components.ai.duplicate_detector import get_duplicate_detector, DUPLICATE_UPLOAD_POLICY
+from app.components.wardrobe.recategorize_job import (
+    RECATEGORIZE_JOB_TYPE,
+    enqueue_recategorize_job,
+    register_recategorize_job
+)
+from app.components.ai.virtual_tryon import get_virtual_tryon_service, TRYON_CONCURRENCY, TRYON_DEADLINE_SECONDS
 from app.components.ai.outfit_generator import generate_outfit_recommendations
 
 router = APIRouter(prefix="/wardrobe", tags=["wardrobe"])
 
-# Lazy classifier instance
-_classifier = None
+GENERATE_LOOKS_JOB_TYPE = "generate_looks"
+OUTFIT_RECOMMENDATIONS_JOB_TYPE = "outfit_recommendations"
+
+# Shared micro-batching queue for concurrent uploads
+_classification_batcher = None
+
+def get_classification_batcher() -> InferenceBatcher:
+    """Get or create the batcher that coalesces upload classifications"""
+    global _classification_batcher
+    if _classification_batcher is None:
+        _classification_batcher = InferenceBatcher(
+            categorize_wardrobe_items_cached,
+            name="fashion-clip"
+        )
+    return _classification_batcher
+
+
+def _store_item_embedding(item_id: Optional[str], user_id: str, classification: Dict) -> None:
+    """Save the Fashion-CLIP embedding that came with a classification (best effort)"""
+    embedding = classification.get("embedding")
+    if not item_id or not embedding:
+        return
+    try:
+        get_embedding_store().put(item_id, user_id, embedding, FASHION_CLIP_MODEL_NAME)
+    except Exception as e:
+        print(f"[WARNING] Could not store embedding for item {item_id}: {e}")
+
 
-def get_classifier():
-    """Get or create classifier instance (lazy loading)"""
-    global _classifier
-    if _classifier is None:
-        _classifier = WardrobeClassifier()
-    return _classifier
+async def _existing_duplicate(user_id: str, duplicate: Optional[Dict]) -> Optional[Dict]:
+    """Fetch the item a duplicate match points at (None if it no longer exists)"""
+    if duplicate is None or DUPLICATE_UPLOAD_POLICY == "off":
+        return None
+    items = await get_wardrobe_items_by_ids(user_id, [duplicate["item_id"]])
+    return items[0] if items else None
+
+
+def _duplicate_response(existing_item: Dict, duplicate: Dict) -> JSONResponse:
+    """Response for an upload that matches an existing item (dedupe or reject policy)"""
+    print(f"[DUPLICATE] Upload matches item {duplicate['item_id']} ({duplicate['method']})")
+    if DUPLICATE_UPLOAD_POLICY == "reject":
+        return JSONResponse(
+            content={
+                "success": False,
+                "detail": "This item is already in your wardrobe",
+                "duplicate_of": duplicate,
+                "item": existing_item
+            },
+            status_code=409
+        )
+    return JSONResponse(
+        content={
+            "success": True,
+            "item": existing_item,
+            "duplicate": True,
+            "duplicate_of": duplicate,
+            "message": f"{existing_item.get('name', 'This item')} is already in your wardrobe"
+        },
+        status_code=200
+    )
+
+
+def _job_accepted(job: Dict, message: str = "Queued") -> JSONResponse:
+    """202 response for a queued job; poll /jobs/{job_id} for the result"""
+    return JSONResponse(
+        content={"success": True, "job_id": job["job_id"], "job": job, "message": message},
+        status_code=202
+    )
 
 
 @router.post("/upload")
@@ -43,6 +118,9 @@ async def upload_wardrobe_item(
 ):
     """
     Upload and auto-categorize a wardrobe item using Fashion-CLIP.
+    
+    Uploads that duplicate an existing item are handled according to
+    DUPLICATE_UPLOAD_POLICY before anything is stored.
     """
     try:
         # 1. Validate file type
@@ -52,31 +130,58 @@ async def upload_wardrobe_item(
         # 2. Read file
         file_bytes = await file.read()
         
-        # 3. Generate unique filename
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        unique_filename = f"{user_id}/{uuid.uuid4()}.{file_extension}"
+        # 3. Look for a near-duplicate of an existing item (perceptual hash, no model
+        #    needed, so it runs on a plain thread instead of the inference pool)
+        detector = get_duplicate_detector()
+        image_hash = await asyncio.to_thread(detector.hash_image, file_bytes)
+        duplicate = await asyncio.to_thread(detector.find_by_hash, user_id, image_hash)
+        existing_item = await _existing_duplicate(user_id, duplicate)
         
-        # 4. Save to temporary location for classification (cross-platform)
-        temp_dir = tempfile.gettempdir()
-        temp_filename = f"{uuid.uuid4()}.{file_extension}"
-        temp_path = os.path.join(temp_dir, temp_filename)
+        # 4. Auto-categorize using Fashion-CLIP, straight from the uploaded bytes
+        #    (cached by pixel hash, batched with concurrent uploads)
+        print(f"Categorizing wardrobe item for user {user_id}...")
+        classification = await get_classification_batcher().submit(file_bytes)
+        
+        # 5. A hash match only dedupes once the embeddings agree (the hash is
+        #    grayscale, so another colorway of the same cut can match); otherwise
+        #    look for a different photo of the same garment (embedding similarity)
+        if existing_item is not None and DUPLICATE_UPLOAD_POLICY in ("dedupe", "reject"):
+            confirmed = await asyncio.to_thread(
+                detector.confirm_hash_match,
+                duplicate,
+                classification.get("embedding"),
+                FASHION_CLIP_MODEL_NAME
+            )
+            if confirmed:
+                return _duplicate_response(existing_item, duplicate)
+            existing_item = None
+        
+        if existing_item is None and DUPLICATE_UPLOAD_POLICY != "off":
+            duplicate = await run_inference(
+                detector.find_by_embedding,
+                user_id,
+                classification.get("embedding"),
+                FASHION_CLIP_MODEL_NAME
+            )
+            existing_item = await _existing_duplicate(user_id, duplicate)
+            if existing_item is not None and DUPLICATE_UPLOAD_POLICY in ("dedupe", "reject"):
+                return _duplicate_response(existing_item, duplicate)
         
-        with open(temp_path, "wb") as f:
-            f.write(file_bytes)
+        if existing_item is not None and DUPLICATE_UPLOAD_POLICY == "flag":
+            classification["tags"] = classification["tags"] + ["possible-duplicate"]
         
-        # 5. Auto-categorize using Fashion-CLIP
-        print(f"Categorizing wardrobe item for user {user_id}...")
-        classifier = get_classifier()
-        classification = classifier.categorize_wardrobe_item(temp_path)
+        # 6. Generate unique filename
+        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
+        unique_filename = f"{user_id}/{uuid.uuid4()}.{file_extension}"
         
-        # 6. Upload image to Supabase Storage
+        # 7. Upload image to Supabase Storage
         image_url = await upload_wardrobe_image(
             file_bytes,
             unique_filename,
             file.content_type
         )
         
-        # 7. Create wardrobe item record
+        # 8. Create wardrobe item record
         item_data = {
             "user_id": user_id,
             "name": classification["name"],
@@ -96,20 +201,21 @@ async def upload_wardrobe_item(
         if not created_item:
             raise HTTPException(status_code=500, detail="Failed to create wardrobe item")
         
-        # 8. Clean up temp file
-        try:
-            os.remove(temp_path)
-        except Exception as e:
-            print(f"Warning: Could not remove temp file {temp_path}: {e}")
+        # 9. Keep the image embedding and hash so the item can be re-categorized
+        #    without its image and recognized if uploaded again
+        await asyncio.to_thread(_store_item_embedding, created_item.get("id"), user_id, classification)
+        if created_item.get("id"):
+            await asyncio.to_thread(detector.add, user_id, created_item["id"], image_hash)
         
-        return JSONResponse(
-            content={
-                "success": True,
-                "item": created_item,
-                "message": f"Added {classification['name']} to your wardrobe!"
-            },
-            status_code=201
-        )
+        response = {
+            "success": True,
+            "item": created_item,
+            "message": f"Added {classification['name']} to your wardrobe!"
+        }
+        if existing_item is not None and DUPLICATE_UPLOAD_POLICY == "flag":
+            response["duplicate_of"] = duplicate
+        
+        return JSONResponse(content=response, status_code=201)
     
     except HTTPException:
         raise
@@ -137,6 +243,93 @@ async def get_wardrobe_items(user_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch wardrobe: {str(e)}")
 
 
+async def _ranked_items(user_id: str, hits: list) -> list:
+    """Fetch the wardrobe items for (item_id, score) hits, keeping the ranking"""
+    items = await get_wardrobe_items_by_ids(user_id, [item_id for item_id, _ in hits])
+    items_by_id = {item["id"]: item for item in items}
+    ranked = []
+    for item_id, score in hits:
+        # Items deleted from the database but still in the index are skipped
+        if item_id in items_by_id:
+            ranked.append({**items_by_id[item_id], "score": round(score, 4)})
+    return ranked
+
+
+@router.get("/search/{user_id}")
+async def search_wardrobe(user_id: str, q: str, limit: int = 10):
+    """
+    Semantic text search over a user's wardrobe (e.g. "red wedding outfit").
+    
+    The query is embedded once with the Fashion-CLIP text tower and matched
+    against the stored item image embeddings.
+    """
+    try:
+        query = q.strip()
+        if not query:
+            raise HTTPException(status_code=400, detail="Query must not be empty")
+        limit = max(1, min(limit, 100))
+        
+        query_embedding = np.asarray(await encode_text_query_async(query), dtype=np.float32)
+        
+        def search():
+            index = get_user_index(user_id, FASHION_CLIP_MODEL_NAME)
+            return index.search(query_embedding, k=limit), index.approximate
+        
+        hits, approximate = await run_inference(search)
+        items = await _ranked_items(user_id, hits)
+        
+        return {
+            "success": True,
+            "query": query,
+            "count": len(items),
+            "approximate": approximate,
+            "items": items
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error searching wardrobe: {e}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/items/{item_id}/similar")
+async def similar_wardrobe_items(item_id: str, user_id: str, limit: int = 10):
+    """
+    Find the items in a user's wardrobe that look most like a given item.
+    """
+    try:
+        limit = max(1, min(limit, 100))
+        
+        stored = await asyncio.to_thread(get_embedding_store().get_embedding, item_id, FASHION_CLIP_MODEL_NAME)
+        if stored is None or stored[0] != user_id:
+            raise HTTPException(
+                status_code=404,
+                detail="No embedding for this item (re-categorize the wardrobe to create one)"
+            )
+        
+        def search():
+            index = get_user_index(user_id, FASHION_CLIP_MODEL_NAME)
+            return index.search(stored[1], k=limit, exclude=[item_id]), index.approximate
+        
+        hits, approximate = await run_inference(search)
+        items = await _ranked_items(user_id, hits)
+        
+        return {
+            "success": True,
+            "item_id": item_id,
+            "count": len(items),
+            "approximate": approximate,
+            "items": items
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error finding similar items: {e}")
+        raise HTTPException(status_code=500, detail=f"Similarity search failed: {str(e)}")
+
+
 @router.delete("/items/{item_id}")
 async def delete_wardrobe_item_endpoint(item_id: str, user_id: str):
     """
@@ -146,6 +339,8 @@ async def delete_wardrobe_item_endpoint(item_id: str, user_id: str):
         success = await delete_wardrobe_item(item_id, user_id)
         
         if success:
+            await asyncio.to_thread(get_embedding_store().delete, item_id)
+            get_duplicate_detector().remove(user_id, item_id)
             return {
                 "success": True,
                 "message": "Item deleted successfully"
@@ -205,85 +400,34 @@ async def update_wardrobe_item_endpoint(
 async def recategorize_all_items(user_id: str):
     """
     Re-categorize all wardrobe items for a user using Fashion-CLIP.
-    Useful for items that were uploaded before Fashion-CLIP was working.
+    Useful for items that were uploaded before Fashion-CLIP was working,
+    or after the label sets change.
+    
+    Runs as a background job: the response carries the job id to poll at
+    /jobs/{job_id}. If the user already has a job running, that job is
+    returned instead of starting another.
     """
     try:
-        from app.core.database import get_user_wardrobe, update_wardrobe_item
-        from PIL import Image
-        import requests
-        from io import BytesIO
-        
-        # Get all user's wardrobe items
-        items = await get_user_wardrobe(user_id)
-        
-        if not items:
-            return {
-                "success": True,
-                "message": "No items to recategorize",
-                "updated": 0
-            }
-        
-        classifier = get_classifier()
-        updated_count = 0
-        
-        for item in items:
-            try:
-                # Download image from Supabase
-                image_url = item.get("image_url")
-                if not image_url:
-                    continue
-                
-                response = requests.get(image_url)
-                image = Image.open(BytesIO(response.content)).convert("RGB")
-                
-                # Save temporarily for classification
-                temp_dir = tempfile.gettempdir()
-                temp_filename = f"{uuid.uuid4()}.jpg"
-                temp_path = os.path.join(temp_dir, temp_filename)
-                image.save(temp_path)
-                
-                # Classify
-                classification = classifier.categorize_wardrobe_item(temp_path)
-                
-                # Update item
-                updates = {
-                    "name": classification["name"],
-                    "description": classification["description"],
-                    "category": classification["category"],
-                    "sub_category": classification["sub_category"],
-                    "color": classification["color"],
-                    "style": classification["style"],
-                    "pattern": classification["pattern"],
-                    "tags": classification["tags"],
-                    "auto_categorized": True,
-                    "updated_at": datetime.now().isoformat()
-                }
-                
-                await update_wardrobe_item(item["id"], user_id, updates)
-                updated_count += 1
-                
-                # Cleanup
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
-                
-            except Exception as e:
-                print(f"Error recategorizing item {item.get('id')}: {e}")
-                continue
-        
-        return {
-            "success": True,
-            "message": f"Successfully recategorized {updated_count} items!",
-            "updated": updated_count,
-            "total": len(items)
-        }
+        job = await enqueue_recategorize_job(get_job_queue(), user_id)
+        return _job_accepted(job, f"Recategorizing {len(job['params']['item_ids'])} items in the background")
     
     except Exception as e:
         print(f"Error in recategorization: {e}")
         raise HTTPException(status_code=500, detail=f"Recategorization failed: {str(e)}")
 
 
+@router.get("/recategorize/jobs/{job_id}")
+async def get_recategorize_job(job_id: str, user_id: Optional[str] = None):
+    """
+    Progress of a recategorization job: status, processed/total, and the
+    errors of items that could not be updated (same as /jobs/{job_id}).
+    """
+    job = await get_job_queue().get(job_id)
+    if job is None or job["job_type"] != RECATEGORIZE_JOB_TYPE or (user_id is not None and job["user_id"] != user_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": job}
+
+
 def _generate_outfit_description(outfit: Dict, event_type: str, user_profile: Optional[Dict]) -> str:
     """Generate a personalized description for an outfit"""
     items = outfit.get("items", [])
@@ -326,11 +470,327 @@ def _generate_outfit_description(outfit: Dict, event_type: str, user_profile: Op
     return ". ".join(description_parts) + "."
 
 
+async def _tryon_look(
+    virtual_tryon_service,
+    user_image_temp_path: str,
+    user_id: str,
+    idx: int,
+    items: list
+) -> Optional[str]:
+    """
+    Try-on, upload and clean up for one look
+    
+    Returns:
+        Uploaded try-on image URL, or None if the try-on failed
+    """
+    try:
+        print(f"[TRYON] Generating virtual try-on for look {idx}...")
+        
+        # Generate try-on image
+        tryon_result_path = await virtual_tryon_service.generate_outfit_tryon(
+            user_image_path=user_image_temp_path,
+            outfit_items=items
+        )
+        
+        if not tryon_result_path or not os.path.exists(tryon_result_path):
+            print(f"[WARNING] Virtual try-on failed for look {idx}, using its preview or garment image")
+            return None
+        
+        tryon_image_url = None
+        try:
+            # Cached results may already be in storage
+            tryon_image_url = virtual_tryon_service.cached_tryon_url(tryon_result_path)
+            if not tryon_image_url:
+                # Upload try-on image to Supabase
+                with open(tryon_result_path, "rb") as f:
+                    tryon_bytes = f.read()
+                
+                tryon_filename = f"{user_id}/tryon_{uuid.uuid4()}.jpg"
+                tryon_image_url = await upload_tryon_image(
+                    tryon_bytes,
+                    tryon_filename,
+                    "image/jpeg"
+                )
+        finally:
+            virtual_tryon_service.record_tryon_upload(tryon_result_path, tryon_image_url)
+            # Clean up temp try-on file
+            try:
+                os.remove(tryon_result_path)
+            except:
+                pass
+        
+        print(f"[SUCCESS] Virtual try-on generated and uploaded for look {idx}")
+        return tryon_image_url
+    
+    except Exception as e:
+        print(f"[ERROR] Virtual try-on error for look {idx}: {e}")
+        return None
+
+
+async def _add_tryon_previews(
+    virtual_tryon_service,
+    user_image_temp_path: str,
+    user_id: str,
+    looks: list
+) -> None:
+    """
+    Upload an instant low-res try-on preview for each look (local composite, no model)
+    
+    Sets tryon_image_url and tryon_status "preview" on the looks that got one.
+    """
+    async def add_preview(look: Dict) -> None:
+        try:
+            preview = await virtual_tryon_service.generate_outfit_preview(user_image_temp_path, look["items"])
+            if preview is None:
+                return
+            look["tryon_image_url"] = await upload_tryon_image(
+                preview,
+                f"{user_id}/tryon_preview_{uuid.uuid4()}.jpg",
+                "image/jpeg"
+            )
+            look["tryon_status"] = "preview"
+        except Exception as e:
+            print(f"[WARNING] Try-on preview failed for look {look['id']}: {e}")
+    
+    await asyncio.gather(*[add_preview(look) for look in looks])
+
+
+async def _generate_tryon_images(
+    virtual_tryon_service,
+    user_image_temp_path: str,
+    user_id: str,
+    outfits: list,
+    on_progress: Optional[Callable[[Dict[int, Optional[str]]], Awaitable[None]]] = None
+) -> Tuple[Dict[int, Optional[str]], List[int]]:
+    """
+    Run the looks' try-ons concurrently, at most TRYON_CONCURRENCY at a time
+    
+    Try-ons still running after TRYON_DEADLINE_SECONDS are cancelled so the
+    finished looks can be returned; on_progress gets the results so far as
+    each one completes.
+    
+    Returns:
+        (try-on URL per look number, look numbers that missed the deadline)
+    """
+    semaphore = asyncio.Semaphore(max(1, TRYON_CONCURRENCY))
+    
+    async def run(idx: int, items: list) -> Optional[str]:
+        async with semaphore:
+            return await _tryon_look(virtual_tryon_service, user_image_temp_path, user_id, idx, items)
+    
+    tasks = {
+        asyncio.create_task(run(idx, outfit.get("items", []))): idx
+        for idx, outfit in enumerate(outfits, 1)
+    }
+    tryon_urls: Dict[int, Optional[str]] = {}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + TRYON_DEADLINE_SECONDS
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tryon_urls[tasks[task]] = task.result()
+            if done and on_progress is not None:
+                await on_progress(tryon_urls)
+    finally:
+        # Deadline reached (or the request/job was cancelled): stop the remaining try-ons
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+    
+    timed_out = sorted(tasks[task] for task in pending)
+    if timed_out:
+        print(f"[WARNING] Try-on deadline of {TRYON_DEADLINE_SECONDS:.0f}s reached, looks {timed_out} use their preview (or garment image if none)")
+    return tryon_urls, timed_out
+
+
+async def _generate_looks(
+    user_id: str,
+    event_type: str,
+    num_looks: int,
+    report_progress: Optional[Callable[[Dict], Awaitable[None]]] = None
+) -> Dict:
+    """
+    Build outfit looks with virtual try-on images (shared by the endpoint and its job)
+    
+    Raises:
+        HTTPException: If the wardrobe is empty or no outfit can be put together
+    """
+    from app.core.database import get_user_wardrobe, get_user_by_id, upload_wardrobe_image
+    from app.components.ai.outfit_recommender import get_outfit_recommender
+    from app.components.ai.virtual_tryon import get_virtual_tryon_service
+    
+    print(f"[GENERATE] Generating {num_looks} looks for user {user_id} ({event_type} event)")
+    
+    # 1. Get user's wardrobe items
+    wardrobe_items = await get_user_wardrobe(user_id)
+    
+    if not wardrobe_items:
+        raise HTTPException(
+            status_code=400, 
+            detail="No wardrobe items found. Please add some clothes to your wardrobe first!"
+        )
+    
+    print(f"[WARDROBE] Found {len(wardrobe_items)} wardrobe items")
+    
+    # 2. Get user profile for personalization
+    user_profile = await get_user_by_id(user_id)
+    
+    # 3. Generate outfit combinations
+    outfit_recommender = get_outfit_recommender()
+    outfits = outfit_recommender.generate_outfits(
+        wardrobe_items=wardrobe_items,
+        event_type=event_type,
+        num_looks=num_looks,
+        user_profile=user_profile
+    )
+    
+    if not outfits:
+        raise HTTPException(
+            status_code=400,
+            detail="Could not generate outfits. Please add more variety to your wardrobe."
+        )
+    
+    print(f"[SUCCESS] Generated {len(outfits)} outfit combinations")
+    
+    # 4. Check if user has a profile image for virtual try-on
+    user_image_url = user_profile.get("image_url") if user_profile else None
+    
+    import sys
+    print(f"[DEBUG] User profile: {user_profile}", flush=True)
+    sys.stdout.flush()
+    print(f"[DEBUG] User image URL: {user_image_url}", flush=True)
+    sys.stdout.flush()
+    
+    # 5. Generate looks with virtual try-on (if user has profile image)
+    generated_looks = []
+    virtual_tryon_service = None
+    user_image_temp_path = None
+    
+    # Download user profile image if available
+    if user_image_url:
+        print(f"[TRYON] User has profile image, enabling virtual try-on...", flush=True)
+        sys.stdout.flush()
+        virtual_tryon_service = get_virtual_tryon_service()
+        user_image_temp_path = await virtual_tryon_service.download_image_to_temp(
+            user_image_url, 
+            f"user_{user_id}"
+        )
+        
+        if not user_image_temp_path:
+            print("[WARNING] Failed to download user profile image, virtual try-on disabled", flush=True)
+            sys.stdout.flush()
+            virtual_tryon_service = None
+    else:
+        print("[INFO] No user profile image found, virtual try-on disabled", flush=True)
+        sys.stdout.flush()
+    
+    # Build the looks in outfit order; try-on images are filled in below
+    for idx, outfit in enumerate(outfits, 1):
+        items = outfit.get("items", [])
+        
+        look = {
+            "id": idx,
+            "match_score": outfit.get("match_score", 85),
+            "description": _generate_outfit_description(
+                outfit, 
+                event_type, 
+                user_profile
+            ),
+            "items": items,
+            "primary_color": outfit.get("primary_color", "unknown"),
+            "style": outfit.get("style", "casual"),
+            "tryon_image_url": None,
+            # pending -> preview -> generated; looks without a try-on end as preview or garment
+            "tryon_status": "pending",
+            "tryon_generated": False,
+            "tryon_timed_out": False
+        }
+        
+        print(f"[SUCCESS] Created look {idx} with {len(items)} items")
+        generated_looks.append(look)
+    
+    async def publish(looks_done: int) -> None:
+        if report_progress is not None:
+            await report_progress({"looks_done": looks_done, "total": len(generated_looks), "looks": generated_looks})
+    
+    # Generate try-on images for all looks concurrently (bounded), within one deadline
+    tryon_urls: Dict[int, Optional[str]] = {}
+    timed_out = []
+    if virtual_tryon_service and user_image_temp_path:
+        # Background jobs show instant low-res previews first; full try-ons replace them as they finish
+        if report_progress is not None:
+            await _add_tryon_previews(virtual_tryon_service, user_image_temp_path, user_id, generated_looks)
+            await publish(0)
+        
+        async def on_tryon(done: Dict[int, Optional[str]]) -> None:
+            for idx, url in done.items():
+                if url:
+                    generated_looks[idx - 1]["tryon_image_url"] = url
+                    generated_looks[idx - 1]["tryon_status"] = "generated"
+            await publish(len(done))
+        
+        tryon_urls, timed_out = await _generate_tryon_images(
+            virtual_tryon_service,
+            user_image_temp_path,
+            user_id,
+            outfits,
+            on_tryon
+        )
+        
+        # Looks whose try-on failed or timed out fall back to the preview
+        missing = [
+            look for look in generated_looks
+            if not tryon_urls.get(look["id"]) and look["tryon_status"] != "preview"
+        ]
+        if missing:
+            await _add_tryon_previews(virtual_tryon_service, user_image_temp_path, user_id, missing)
+    
+    for look in generated_looks:
+        items = look["items"]
+        look["tryon_generated"] = bool(tryon_urls.get(look["id"]))
+        look["tryon_timed_out"] = look["id"] in timed_out
+        if look["tryon_generated"]:
+            look["tryon_image_url"] = tryon_urls[look["id"]]
+            look["tryon_status"] = "generated"
+        elif look["tryon_status"] != "preview":
+            # Fallback to primary garment image if there is no try-on or preview
+            look["tryon_image_url"] = items[0].get("image_url") if items else None
+            look["tryon_status"] = "garment"
+    
+    if report_progress is not None and not tryon_urls:
+        await publish(len(generated_looks))
+    
+    # Clean up user temp image
+    if user_image_temp_path and os.path.exists(user_image_temp_path):
+        try:
+            os.remove(user_image_temp_path)
+        except:
+            pass
+    
+    print(f"[SUCCESS] Successfully generated {len(generated_looks)} looks!")
+    
+    return {
+        "success": True,
+        "looks": generated_looks,
+        "event_type": event_type,
+        # Some try-ons missed the deadline and show the preview or garment image instead
+        "partial": bool(timed_out),
+        "message": f"Generated {len(generated_looks)} perfect looks for your {event_type} event!"
+    }
+
+
 @router.post("/generate-looks")
 async def generate_outfit_looks(
     user_id: str = Form(...),
     event_type: str = Form("casual"),
-    num_looks: int = Form(5)
+    num_looks: int = Form(5),
+    background: bool = Form(False)
 ):
     """
     Generate AI-powered outfit looks with virtual try-on.
@@ -339,159 +799,24 @@ async def generate_outfit_looks(
         user_id: User's ID
         event_type: Type of event (wedding, casual, party, etc.)
         num_looks: Number of looks to generate (3, 5, or 7)
+        background: Queue a job and return its id (202) instead of waiting.
+            The job's progress.looks holds every look within about a second,
+            with a low-res preview (tryon_status "preview") that each full
+            try-on replaces as it finishes (tryon_status "generated"); follow
+            it with GET /jobs/{job_id} or the /jobs/{job_id}/events stream.
     
     Returns:
         List of generated outfit looks with try-on images
     """
     try:
-        from app.core.database import get_user_wardrobe, get_user_by_id, upload_wardrobe_image
-        from app.components.ai.outfit_recommender import get_outfit_recommender
-        from app.components.ai.virtual_tryon import get_virtual_tryon_service
-        import asyncio
-        
-        print(f"[GENERATE] Generating {num_looks} looks for user {user_id} ({event_type} event)")
-        
-        # 1. Get user's wardrobe items
-        wardrobe_items = await get_user_wardrobe(user_id)
-        
-        if not wardrobe_items:
-            raise HTTPException(
-                status_code=400, 
-                detail="No wardrobe items found. Please add some clothes to your wardrobe first!"
-            )
-        
-        print(f"[WARDROBE] Found {len(wardrobe_items)} wardrobe items")
-        
-        # 2. Get user profile for personalization
-        user_profile = await get_user_by_id(user_id)
-        
-        # 3. Generate outfit combinations
-        outfit_recommender = get_outfit_recommender()
-        outfits = outfit_recommender.generate_outfits(
-            wardrobe_items=wardrobe_items,
-            event_type=event_type,
-            num_looks=num_looks,
-            user_profile=user_profile
-        )
-        
-        if not outfits:
-            raise HTTPException(
-                status_code=400,
-                detail="Could not generate outfits. Please add more variety to your wardrobe."
-            )
-        
-        print(f"[SUCCESS] Generated {len(outfits)} outfit combinations")
-        
-        # 4. Check if user has a profile image for virtual try-on
-        user_image_url = user_profile.get("image_url") if user_profile else None
-        
-        import sys
-        print(f"[DEBUG] User profile: {user_profile}", flush=True)
-        sys.stdout.flush()
-        print(f"[DEBUG] User image URL: {user_image_url}", flush=True)
-        sys.stdout.flush()
-        
-        # 5. Generate looks with virtual try-on (if user has profile image)
-        generated_looks = []
-        virtual_tryon_service = None
-        user_image_temp_path = None
-        
-        # Download user profile image if available
-        if user_image_url:
-            print(f"[TRYON] User has profile image, enabling virtual try-on...", flush=True)
-            sys.stdout.flush()
-            virtual_tryon_service = get_virtual_tryon_service()
-            user_image_temp_path = await virtual_tryon_service.download_image_to_temp(
-                user_image_url, 
-                f"user_{user_id}"
-            )
-            
-            if not user_image_temp_path:
-                print("[WARNING] Failed to download user profile image, virtual try-on disabled", flush=True)
-                sys.stdout.flush()
-                virtual_tryon_service = None
-        else:
-            print("[INFO] No user profile image found, virtual try-on disabled", flush=True)
-            sys.stdout.flush()
-        
-        # Generate looks with try-on images
-        for idx, outfit in enumerate(outfits, 1):
-            items = outfit.get("items", [])
-            tryon_image_url = None
-            
-            # Try to generate virtual try-on if user image is available
-            if virtual_tryon_service and user_image_temp_path:
-                try:
-                    print(f"[TRYON] Generating virtual try-on for look {idx}...")
-                    
-                    # Generate try-on image
-                    tryon_result_path = await virtual_tryon_service.generate_outfit_tryon(
-                        user_image_path=user_image_temp_path,
-                        outfit_items=items
-                    )
-                    
-                    if tryon_result_path and os.path.exists(tryon_result_path):
-                        # Upload try-on image to Supabase
-                        with open(tryon_result_path, "rb") as f:
-                            tryon_bytes = f.read()
-                        
-                        tryon_filename = f"{user_id}/tryon_{uuid.uuid4()}.jpg"
-                        tryon_image_url = await upload_tryon_image(
-                            tryon_bytes,
-                            tryon_filename,
-                            "image/jpeg"
-                        )
-                        
-                        print(f"[SUCCESS] Virtual try-on generated and uploaded for look {idx}")
-                        
-                        # Clean up temp try-on file
-                        try:
-                            os.remove(tryon_result_path)
-                        except:
-                            pass
-                    else:
-                        print(f"[WARNING] Virtual try-on failed for look {idx}, using garment image")
-                        
-                except Exception as e:
-                    print(f"[ERROR] Virtual try-on error for look {idx}: {e}")
-                    # Continue with fallback
-            
-            # Fallback to primary garment image if try-on failed or unavailable
-            if not tryon_image_url:
-                tryon_image_url = items[0].get("image_url") if items else None
-            
-            look = {
-                "id": idx,
-                "match_score": outfit.get("match_score", 85),
-                "description": _generate_outfit_description(
-                    outfit, 
-                    event_type, 
-                    user_profile
-                ),
-                "items": items,
-                "primary_color": outfit.get("primary_color", "unknown"),
-                "style": outfit.get("style", "casual"),
-                "tryon_image_url": tryon_image_url
-            }
-            
-            print(f"[SUCCESS] Created look {idx} with {len(items)} items")
-            generated_looks.append(look)
-        
-        # Clean up user temp image
-        if user_image_temp_path and os.path.exists(user_image_temp_path):
-            try:
-                os.remove(user_image_temp_path)
-            except:
-                pass
-        
-        print(f"[SUCCESS] Successfully generated {len(generated_looks)} looks!")
-        
-        return {
-            "success": True,
-            "looks": generated_looks,
-            "event_type": event_type,
-            "message": f"Generated {len(generated_looks)} perfect looks for your {event_type} event!"
-        }
+        if background:
+            return _job_accepted(await get_job_queue().enqueue(
+                GENERATE_LOOKS_JOB_TYPE,
+                {"user_id": user_id, "event_type": event_type, "num_looks": num_looks},
+                user_id=user_id
+            ))
+        
+        return await _generate_looks(user_id, event_type, num_looks)
     
     except HTTPException:
         raise
@@ -505,6 +830,64 @@ async def generate_outfit_looks(
         )
 
 
+async def _outfit_recommendations(
+    user_id: str,
+    event_type: str,
+    event_venue: str,
+    event_time: str,
+    weather: str,
+    theme: str,
+    num_looks: int
+) -> Dict:
+    """
+    Outfit recommendations for an event (shared by the endpoint and its job)
+    
+    Raises:
+        HTTPException: If the user does not exist
+    """
+    print(f"[OUTFIT_REC] Generating {num_looks} recommendations for user {user_id}", flush=True)
+    print(f"[EVENT] Type: {event_type}, Venue: {event_venue}, Time: {event_time}", flush=True)
+    print(f"[STYLE] Weather: {weather}, Theme: {theme}", flush=True)
+    
+    # Get user profile from database
+    # Get user profile and wardrobe from database
+    from app.core.database import get_user_by_id, get_user_wardrobe
+    user_profile = await get_user_by_id(user_id)
+    wardrobe_items = await get_user_wardrobe(user_id)
+    
+    if not user_profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    print(f"[USER] Gender: {user_profile.get('gender')}, Body Shape: {user_profile.get('body_shape')}", flush=True)
+    print(f"[WARDROBE] Found {len(wardrobe_items)} items", flush=True)
+    
+    # Generate outfit recommendations using GPT-4o-mini
+    recommendations = await generate_outfit_recommendations(
+        user_profile=user_profile,
+        wardrobe_items=wardrobe_items,
+        event_type=event_type,
+        event_venue=event_venue,
+        event_time=event_time,
+        weather=weather,
+        theme=theme,
+        num_looks=num_looks
+    )
+    
+    print(f"[SUCCESS] Generated {len(recommendations)} outfit recommendations", flush=True)
+    
+    return {
+        "success": True,
+        "recommendations": recommendations,
+        "event_details": {
+            "type": event_type,
+            "venue": event_venue,
+            "time": event_time,
+            "weather": weather,
+            "theme": theme
+        }
+    }
+
+
 @router.post("/generate-outfit-recommendations")
 async def generate_outfit_recommendations_endpoint(
     user_id: str = Form(...),
@@ -513,7 +896,8 @@ async def generate_outfit_recommendations_endpoint(
     event_time: str = Form(...),
     weather: str = Form(...),
     theme: str = Form(...),
-    num_looks: int = Form(3)
+    num_looks: int = Form(3),
+    background: bool = Form(False)
 ):
     """
     Generate AI-powered outfit recommendations using GPT-4o-mini
@@ -526,52 +910,25 @@ async def generate_outfit_recommendations_endpoint(
         weather: Weather/season (hot, warm, cool, cold, rainy)
         theme: Style theme (desi, formal, elite, casual, etc.)
         num_looks: Number of outfit recommendations (3, 5, or 7)
+        background: Queue a job and return its id (202) instead of waiting
     
     Returns:
         JSON response with outfit recommendations
     """
     try:
-        print(f"[OUTFIT_REC] Generating {num_looks} recommendations for user {user_id}", flush=True)
-        print(f"[EVENT] Type: {event_type}, Venue: {event_venue}, Time: {event_time}", flush=True)
-        print(f"[STYLE] Weather: {weather}, Theme: {theme}", flush=True)
-        
-        # Get user profile from database
-        # Get user profile and wardrobe from database
-        from app.core.database import get_user_by_id, get_user_wardrobe
-        user_profile = await get_user_by_id(user_id)
-        wardrobe_items = await get_user_wardrobe(user_id)
-        
-        if not user_profile:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        print(f"[USER] Gender: {user_profile.get('gender')}, Body Shape: {user_profile.get('body_shape')}", flush=True)
-        print(f"[WARDROBE] Found {len(wardrobe_items)} items", flush=True)
-        
-        # Generate outfit recommendations using GPT-4o-mini
-        recommendations = await generate_outfit_recommendations(
-            user_profile=user_profile,
-            wardrobe_items=wardrobe_items,
-            event_type=event_type,
-            event_venue=event_venue,
-            event_time=event_time,
-            weather=weather,
-            theme=theme,
-            num_looks=num_looks
-        )
-        
-        print(f"[SUCCESS] Generated {len(recommendations)} outfit recommendations", flush=True)
-        
-        return JSONResponse(content={
-            "success": True,
-            "recommendations": recommendations,
-            "event_details": {
-                "type": event_type,
-                "venue": event_venue,
-                "time": event_time,
-                "weather": weather,
-                "theme": theme
-            }
-        })
+        if background:
+            return _job_accepted(await get_job_queue().enqueue(
+                OUTFIT_RECOMMENDATIONS_JOB_TYPE,
+                {
+                    "user_id": user_id, "event_type": event_type, "event_venue": event_venue,
+                    "event_time": event_time, "weather": weather, "theme": theme, "num_looks": num_looks
+                },
+                user_id=user_id
+            ))
+        
+        return JSONResponse(content=await _outfit_recommendations(
+            user_id, event_type, event_venue, event_time, weather, theme, num_looks
+        ))
         
     except Exception as e:
         print(f"[ERROR] Failed to generate outfit recommendations: {e}")
@@ -579,3 +936,25 @@ async def generate_outfit_recommendations_endpoint(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+
+async def _generate_looks_job(ctx: JobContext) -> Dict:
+    """Job handler for /generate-looks with background=true"""
+    return await _generate_looks(
+        ctx.params["user_id"],
+        ctx.params["event_type"],
+        ctx.params["num_looks"],
+        report_progress=ctx.report
+    )
+
+
+async def _outfit_recommendations_job(ctx: JobContext) -> Dict:
+    """Job handler for /generate-outfit-recommendations with background=true"""
+    return await _outfit_recommendations(**ctx.params)
+
+
+def register_wardrobe_jobs(queue: JobQueue) -> None:
+    """Register the wardrobe job handlers (called once at startup)"""
+    register_recategorize_job(queue)
+    # Try-on holds a GPU/remote slot per look, so looks are generated one job at a time
+    queue.register(GENERATE_LOOKS_JOB_TYPE, _generate_looks_job, concurrency=1)
+    queue.register(OUTFIT_RECOMMENDATIONS_JOB_TYPE, _outfit_recommendations_job, concurrency=4)
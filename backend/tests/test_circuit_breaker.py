@@ -0,0 +1,103 @@
+"""Tests for the closed / open / half-open circuit breaker"""
+
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the breaker module"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_breaker():
+    return CircuitBreaker("test", failure_threshold=3, window_seconds=60, reset_seconds=30)
+
+
+def test_opens_after_threshold_failures(clock):
+    breaker = make_breaker()
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure("boom")
+    assert breaker.status()["state"] == CLOSED
+
+    breaker.record_failure("boom")
+    assert breaker.status()["state"] == OPEN
+    assert not breaker.allow()
+    assert breaker.status()["rejected_calls"] == 1
+
+
+def test_failures_outside_window_do_not_count(clock):
+    breaker = make_breaker()
+    breaker.record_failure("old")
+    breaker.record_failure("old")
+    clock[0] += 61
+    breaker.record_failure("new")
+    assert breaker.status()["state"] == CLOSED
+    assert breaker.status()["recent_failures"] == 1
+
+
+def test_success_clears_failures(clock):
+    breaker = make_breaker()
+    breaker.record_failure("boom")
+    breaker.record_failure("boom")
+    breaker.record_success()
+    breaker.record_failure("boom")
+    assert breaker.status()["state"] == CLOSED
+
+
+def open_breaker(breaker):
+    for _ in range(3):
+        breaker.record_failure("boom")
+    assert breaker.status()["state"] == OPEN
+
+
+def test_half_open_allows_one_probe(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.status()["state"] == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+
+
+def test_probe_success_closes(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.status()["state"] == CLOSED
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow()
+
+    breaker.record_failure("still down")
+    status = breaker.status()
+    assert status["state"] == OPEN
+    assert status["times_opened"] == 2
+    assert status["retry_in_seconds"] == 30
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_frees_the_slot(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow()
+
+    breaker.record_cancelled()
+    assert breaker.status()["state"] == HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,96 @@
+"""Tests for the pixel-hash classification cache"""
+
+import os
+import time
+
+from PIL import Image
+
+from app.components.ai.classification_cache import (
+    ClassificationCache,
+    classification_key,
+    is_cacheable,
+    pixel_hash
+)
+
+
+def classification(category="Tops & Kurtas", tags=None, embedding=(0.1, 0.2)):
+    result = {
+        "category": category,
+        "tags": list(tags) if tags is not None else ["kurta"],
+        "auto_categorized": True
+    }
+    if embedding is not None:
+        result["embedding"] = list(embedding)
+    return result
+
+
+def test_is_cacheable():
+    assert is_cacheable(classification())
+    assert not is_cacheable(classification(tags=["uncategorized", "error"]))
+    # Built while the model was unavailable: no embedding
+    assert not is_cacheable(classification(category="Uncategorized", embedding=None))
+
+
+def test_pixel_hash_ignores_encoding_but_not_pixels():
+    image = Image.new("RGB", (8, 8), (200, 10, 10))
+    assert pixel_hash(image) == pixel_hash(image.copy())
+    assert pixel_hash(image) != pixel_hash(Image.new("RGB", (8, 8), (10, 200, 10)))
+    assert classification_key(image, "v1") != classification_key(image, "v2")
+
+
+def test_uncacheable_results_are_not_stored(tmp_path):
+    cache = ClassificationCache(max_entries=4, cache_dir=str(tmp_path))
+    cache.put("v1-aa", classification(embedding=None))
+    cache.put("v1-bb", classification(tags=["error"]))
+    assert cache.get("v1-aa") is None
+    assert cache.get("v1-bb") is None
+    assert list(tmp_path.glob("*/*.json")) == []
+
+
+def test_get_returns_a_copy():
+    cache = ClassificationCache(max_entries=4)
+    cache.put("v1-aa", classification())
+    cache.get("v1-aa")["tags"].append("changed")
+    assert cache.get("v1-aa")["tags"] == ["kurta"]
+
+
+def test_memory_lru_eviction():
+    cache = ClassificationCache(max_entries=2)
+    cache.put("v1-aa", classification("A"))
+    cache.put("v1-bb", classification("B"))
+    # Touch aa so bb is the least recently used
+    assert cache.get("v1-aa")["category"] == "A"
+    cache.put("v1-cc", classification("C"))
+
+    assert cache.get("v1-bb") is None
+    assert cache.get("v1-aa")["category"] == "A"
+    assert cache.get("v1-cc")["category"] == "C"
+    assert cache.stats()["entries"] == 2
+
+
+def test_disk_tier_survives_memory_clear(tmp_path):
+    cache = ClassificationCache(max_entries=4, cache_dir=str(tmp_path))
+    cache.put("v1-aa", classification())
+    cache.clear()
+
+    assert cache.get("v1-aa")["category"] == "Tops & Kurtas"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["hits"] == 0
+
+
+def test_disk_eviction_drops_oldest_entries(tmp_path):
+    cache = ClassificationCache(max_entries=0, cache_dir=str(tmp_path), max_disk_bytes=10 ** 6)
+    cache.put("v1-00", classification())
+    entry_size = next(tmp_path.glob("*/*.json")).stat().st_size
+    # Room for two entries
+    cache.max_disk_bytes = int(entry_size * 2.5)
+
+    old = time.time() - 100
+    os.utime(next(tmp_path.glob("*/*.json")), (old, old))
+    cache.put("v1-11", classification())
+    cache.put("v1-22", classification())
+
+    assert cache.get("v1-00") is None
+    assert cache.get("v1-22") is not None
+    assert cache.stats()["disk_bytes"] <= cache.max_disk_bytes
@@ -0,0 +1,106 @@
+"""Tests for pixel-based garment color extraction"""
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.components.ai.color_extractor import (
+    extract_colors,
+    foreground_mask,
+    kmeans_lab,
+    nearest_color_names,
+    rgb_to_lab
+)
+
+WHITE = (255, 255, 255)
+
+
+def garment(*fills, background=WHITE):
+    """A garment on a plain background, split into horizontal bands of the given colors"""
+    image = Image.new("RGB", (128, 128), background)
+    draw = ImageDraw.Draw(image)
+    top, bottom = 16, 112
+    band = (bottom - top) // len(fills)
+    for i, fill in enumerate(fills):
+        draw.rectangle((32, top + i * band, 96, top + (i + 1) * band - 1), fill=fill)
+    return image
+
+
+def test_rgb_to_lab_reference_points():
+    lab = rgb_to_lab(np.array([[255, 255, 255], [0, 0, 0]]))
+
+    np.testing.assert_allclose(lab[0], [100, 0, 0], atol=0.5)
+    np.testing.assert_allclose(lab[1], [0, 0, 0], atol=0.5)
+
+
+def test_nearest_color_names_maps_to_vocabulary():
+    lab = rgb_to_lab(np.array([[210, 35, 45], [28, 40, 90], [215, 180, 60]], dtype=np.float32))
+
+    assert nearest_color_names(lab) == ["red", "navy", "gold"]
+
+
+def test_kmeans_lab_separates_two_colors():
+    red, blue = rgb_to_lab(np.array([[200, 30, 40], [40, 80, 200]], dtype=np.float32))
+    pixels = np.concatenate([np.tile(red, (300, 1)), np.tile(blue, (100, 1))])
+
+    centers, shares = kmeans_lab(pixels, num_clusters=2)
+
+    assert sorted(nearest_color_names(centers)) == ["blue", "red"]
+    assert sorted(np.round(shares, 2)) == [0.25, 0.75]
+
+
+def test_kmeans_lab_is_deterministic():
+    pixels = rgb_to_lab(np.random.default_rng(0).integers(0, 256, size=(500, 3)))
+
+    first_centers, first_shares = kmeans_lab(pixels)
+    second_centers, second_shares = kmeans_lab(pixels)
+
+    np.testing.assert_array_equal(first_centers, second_centers)
+    np.testing.assert_array_equal(first_shares, second_shares)
+
+
+def test_foreground_mask_removes_white_background():
+    image = garment((40, 80, 200))
+    lab = rgb_to_lab(np.asarray(image))
+
+    mask = foreground_mask(lab)
+
+    assert not mask[:16].any() and not mask[:, :32].any()
+    assert mask[32:96, 40:88].all()
+
+
+def test_foreground_mask_keeps_garment_pixels_matching_the_background():
+    # A white print enclosed by the garment is not reachable from the border
+    image = garment((40, 80, 200))
+    ImageDraw.Draw(image).rectangle((56, 48, 72, 80), fill=WHITE)
+
+    mask = foreground_mask(rgb_to_lab(np.asarray(image)))
+
+    assert mask[60:70, 60:70].all()
+
+
+def test_foreground_mask_keeps_everything_on_busy_background():
+    lab = rgb_to_lab(np.random.default_rng(0).integers(0, 256, size=(64, 64, 3)))
+
+    assert foreground_mask(lab).all()
+
+
+def test_solid_garment_on_white():
+    result = extract_colors(garment((200, 30, 40)))
+
+    assert result["color"] == "red"
+    assert result["secondary_color"] is None
+    assert "white" not in result["color_shares"]
+
+
+def test_two_tone_garment_on_white():
+    result = extract_colors(garment((25, 35, 80), (25, 35, 80), (240, 210, 40)))
+
+    assert result["color"] == "navy"
+    assert result["secondary_color"] == "yellow"
+
+
+def test_multicolor_garment():
+    result = extract_colors(garment((200, 30, 40), (40, 140, 60), (40, 80, 200), (240, 210, 40)))
+
+    assert result["color"] == "multicolor"
+    assert result["secondary_color"] in {"red", "green", "blue", "yellow"}
@@ -0,0 +1,59 @@
+"""Tests for the memory-mapped float16 / int8 vector file"""
+
+import numpy as np
+import pytest
+
+from app.components.ai.compact_vectors import INITIAL_CAPACITY, CompactVectorFile, dequantize, quantize
+
+
+def unit_vectors(count, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0.0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_round_trip(tmp_path, dtype, tolerance):
+    vectors = unit_vectors(5, 512)
+    store = CompactVectorFile(str(tmp_path / "vectors.vec"), dim=512, dtype=dtype)
+    store.write([0, 3, 7, 1, 2], vectors)
+
+    read = store.read([0, 3, 7, 1, 2])
+    assert read.dtype == np.float32
+    assert np.abs(read - vectors).max() <= tolerance
+    # Cosine similarity is what the index uses; quantization barely moves it
+    cosine = (read * vectors).sum(axis=1) / np.linalg.norm(read, axis=1)
+    assert cosine.min() > 0.999
+
+
+def test_int8_quantization_scales_per_vector():
+    vectors = np.array([[0.5, -0.25, 0.0], [0.0, 0.0, 0.0]], dtype=np.float32)
+    codes, scales = quantize(vectors, "int8")
+    assert codes.dtype == np.int8
+    assert codes[0].tolist() == [127, -64, 0]
+    # All-zero vectors keep a usable scale
+    assert scales[1] == 1.0
+    assert np.allclose(dequantize(codes, scales), vectors, atol=0.5 / 127)
+
+
+def test_reopen_keeps_stored_dtype(tmp_path):
+    path = str(tmp_path / "vectors.vec")
+    vectors = unit_vectors(2, 16)
+    store = CompactVectorFile(path, dim=16, dtype="int8")
+    store.write([0, 1], vectors)
+    store.close()
+
+    reopened = CompactVectorFile(path, dim=16, dtype="float16")
+    assert reopened.dtype == "int8"
+    assert np.abs(reopened.read([0, 1]) - vectors).max() <= 1e-2
+    with pytest.raises(ValueError):
+        CompactVectorFile(path, dim=32)
+
+
+def test_grows_past_initial_capacity(tmp_path):
+    store = CompactVectorFile(str(tmp_path / "vectors.vec"), dim=8, dtype="float16")
+    slot = INITIAL_CAPACITY + 5
+    vector = unit_vectors(1, 8)
+    store.write([slot], vector)
+    assert store.capacity > slot
+    assert np.allclose(store.read([slot]), vector, atol=1e-3)
+    assert store.read([]).shape == (0, 8)
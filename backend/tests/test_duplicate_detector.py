@@ -0,0 +1,76 @@
+"""Tests for perceptual-hash duplicate detection"""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.components.ai import duplicate_detector
+from app.components.ai.duplicate_detector import DuplicateDetector, dhash, hamming_distances
+
+
+def garment(fill):
+    image = Image.new("RGB", (128, 128), (255, 255, 255))
+    ImageDraw.Draw(image).rectangle((32, 16, 96, 112), fill=fill)
+    return image
+
+
+class FakeEmbeddingStore:
+    def __init__(self):
+        # user_id -> {item_id: hash}
+        self.hashes = {}
+        self.embeddings = {}
+
+    def get_user_hashes(self, user_id):
+        return dict(self.hashes.get(user_id, {}))
+
+    def put_hash(self, item_id, user_id, image_hash):
+        self.hashes.setdefault(user_id, {})[item_id] = image_hash
+
+    def get_many(self, item_ids, model):
+        return {item_id: self.embeddings[item_id] for item_id in item_ids if item_id in self.embeddings}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeEmbeddingStore()
+    monkeypatch.setattr(duplicate_detector, "get_embedding_store", lambda: store)
+    return store
+
+
+def test_dhash_tolerates_resize():
+    original = garment((200, 30, 30))
+    resized = original.resize((300, 300))
+    distance = hamming_distances(np.array([dhash(original)], dtype=np.uint64), dhash(resized))[0]
+    assert distance <= 6
+
+
+def test_find_by_hash(store):
+    detector = DuplicateDetector(hash_distance=6)
+    detector.add("user-1", "item-1", dhash(garment((200, 30, 30))))
+
+    match = detector.find_by_hash("user-1", dhash(garment((200, 30, 30)).resize((256, 256))))
+    assert match["item_id"] == "item-1"
+    assert detector.find_by_hash("user-2", dhash(garment((200, 30, 30)))) is None
+    assert detector.find_by_hash("user-1", None) is None
+
+
+def test_index_reloads_uploads_from_other_workers(store):
+    detector = DuplicateDetector(index_ttl=0)
+    image_hash = dhash(garment((200, 30, 30)))
+    assert detector.find_by_hash("user-1", image_hash) is None
+
+    # Stored by another process sharing the embedding store
+    store.put_hash("item-9", "user-1", image_hash)
+    assert detector.find_by_hash("user-1", image_hash)["item_id"] == "item-9"
+
+
+def test_hash_match_needs_embedding_confirmation(store):
+    detector = DuplicateDetector(embedding_similarity=0.97)
+    store.embeddings["item-1"] = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+    # Same cut in another color: hash matches, embedding does not
+    assert not detector.confirm_hash_match({"item_id": "item-1"}, [0.6, 0.8, 0.0], "model")
+    assert detector.confirm_hash_match({"item_id": "item-1"}, [0.99, 0.05, 0.0], "model")
+    # Nothing to compare against
+    assert not detector.confirm_hash_match({"item_id": "item-2"}, [1.0, 0.0, 0.0], "model")
+    assert not detector.confirm_hash_match({"item_id": "item-1"}, None, "model")
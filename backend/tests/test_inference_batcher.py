@@ -0,0 +1,83 @@
+"""Tests for dynamic micro-batching"""
+
+import asyncio
+
+import pytest
+
+from app.components.ai.inference_batcher import InferenceBatcher
+
+
+def test_concurrent_requests_share_a_batch_and_get_their_own_results():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = InferenceBatcher(double, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert batches == [[0, 1, 2, 3], [4, 5]]
+    assert batcher.stats()["batches"] == 2
+    assert batcher.stats()["completed"] == 6
+
+
+def test_sync_batch_function_runs_off_the_event_loop(monkeypatch):
+    async def fake_run_inference(fn, items):
+        return await asyncio.to_thread(fn, items)
+
+    monkeypatch.setattr("app.components.ai.inference_batcher.run_inference", fake_run_inference)
+
+    async def scenario():
+        batcher = InferenceBatcher(lambda items: [item + 1 for item in items], max_wait_ms=5)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert asyncio.run(scenario()) == [2, 3]
+
+
+def test_failed_batch_fails_every_caller():
+    async def broken(items):
+        return items[:1]
+
+    async def scenario():
+        batcher = InferenceBatcher(broken, max_wait_ms=20)
+        return batcher, await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    batcher, results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["failed"] == 2
+
+
+def test_restarted_worker_serves_requests_queued_before_it_died():
+    release = None
+
+    async def slow(items):
+        await release.wait()
+        return items
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = InferenceBatcher(slow, max_batch_size=1, max_wait_ms=0)
+
+        first = asyncio.create_task(batcher.submit("first"))
+        queued = asyncio.create_task(batcher.submit("queued"))
+        await asyncio.sleep(0.01)
+
+        # The collector dies mid-batch with "queued" still waiting in the queue
+        batcher._worker.cancel()
+        await asyncio.sleep(0.01)
+        with pytest.raises(RuntimeError):
+            await first
+
+        release.set()
+        later = await batcher.submit("later")
+        return await asyncio.wait_for(queued, timeout=1), later
+
+    assert asyncio.run(scenario()) == ("queued", "later")
@@ -0,0 +1,54 @@
+"""Tests for handing tensors to inference workers through shared memory"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import torch
+
+from app.components.ai.inference_workers import InferenceWorkerPool, _run_on_shared_tensor
+
+
+@pytest.fixture
+def pool():
+    # Threads stand in for worker processes; the shared memory handoff is the same
+    pool = InferenceWorkerPool.__new__(InferenceWorkerPool)
+    pool._executor = ThreadPoolExecutor(max_workers=1)
+    yield pool
+    pool._executor.shutdown(wait=True)
+
+
+def _sum(name, shape):
+    return _run_on_shared_tensor(lambda pixel_values: float(pixel_values.sum()), name, shape)
+
+
+def test_submit_runs_task_on_shared_copy(pool):
+    pixel_values = torch.arange(24, dtype=torch.float32).view(2, 3, 4)
+
+    assert asyncio.run(pool._submit(_sum, pixel_values)) == float(pixel_values.sum())
+
+
+def test_cancelled_submit_keeps_block_until_running_task_finishes(pool):
+    started, release = threading.Event(), threading.Event()
+    sums = []
+
+    def slow_sum(name, shape):
+        started.set()
+        release.wait(5)
+        # Raises FileNotFoundError if the block was unlinked while we ran
+        sums.append(_sum(name, shape))
+
+    async def scenario():
+        submitted = asyncio.create_task(pool._submit(slow_sum, torch.ones(2, 2)))
+        await asyncio.to_thread(started.wait, 5)
+        submitted.cancel()
+        await asyncio.sleep(0.05)
+        assert not submitted.done()
+
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await submitted
+
+    asyncio.run(scenario())
+    assert sums == [4.0]
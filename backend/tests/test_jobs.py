@@ -0,0 +1,189 @@
+"""Tests for the background job queue backends and worker loop"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.jobs import (
+    CANCELLED,
+    COMPLETED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    InMemoryJobBackend,
+    JobQueue,
+    SQLiteJobBackend
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryJobBackend()
+    else:
+        backend = SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"))
+        yield backend
+        backend.close()
+
+
+def expire_lease(backend, job_id, seconds=10):
+    """Age a running job's heartbeat as if its worker had died"""
+    if isinstance(backend, SQLiteJobBackend):
+        with backend._lock:
+            backend._conn.execute("UPDATE jobs SET heartbeat = heartbeat - ? WHERE job_id = ?", (seconds, job_id))
+    else:
+        backend._jobs[job_id]["heartbeat"] -= seconds
+
+
+def test_claim_takes_each_job_once(backend):
+    job = backend.create("work", {"n": 1}, "user-1", ttl=60)
+    claimed = backend.claim(["work"], "owner-a", lease_seconds=5)
+    assert claimed["job_id"] == job["job_id"]
+    assert claimed["status"] == RUNNING
+    assert claimed["attempts"] == 1
+    assert backend.claim(["work"], "owner-b", lease_seconds=5) is None
+
+
+def test_expired_lease_is_reclaimed_with_checkpoint(backend):
+    job = backend.create("work", {}, None, ttl=60)
+    backend.claim(["work"], "owner-a", lease_seconds=5)
+    assert backend.heartbeat(job["job_id"], "owner-a", {"done": 2}, {"cursor": 2})
+
+    expire_lease(backend, job["job_id"])
+    resumed = backend.claim(["work"], "owner-b", lease_seconds=5)
+    assert resumed["job_id"] == job["job_id"]
+    assert resumed["attempts"] == 2
+    assert resumed["checkpoint"] == {"cursor": 2}
+    assert resumed["progress"] == {"done": 2}
+    # The old owner lost the job
+    assert not backend.heartbeat(job["job_id"], "owner-a")
+    assert not backend.finish(job["job_id"], "owner-a", COMPLETED, result={})
+
+
+def test_job_fails_after_max_attempts(backend):
+    job = backend.create("work", {}, None, ttl=60)
+    for attempt in range(2):
+        assert backend.claim(["work"], f"owner-{attempt}", lease_seconds=5, max_attempts=2) is not None
+        expire_lease(backend, job["job_id"])
+
+    assert backend.claim(["work"], "owner-x", lease_seconds=5, max_attempts=2) is None
+    failed = backend.get(job["job_id"])
+    assert failed["status"] == FAILED
+    assert failed["error"]
+
+
+def test_release_hands_job_back(backend):
+    job = backend.create("work", {}, None, ttl=60)
+    backend.claim(["work"], "owner-a", lease_seconds=5)
+    backend.release(job["job_id"], "owner-a")
+    assert backend.get(job["job_id"])["status"] == QUEUED
+    assert backend.claim(["work"], "owner-b", lease_seconds=5)["job_id"] == job["job_id"]
+
+
+def test_cancel_and_purge(backend):
+    job = backend.create("work", {}, None, ttl=0)
+    backend.cancel(job["job_id"])
+    time.sleep(0.01)
+    assert backend.purge_expired() == 1
+    assert backend.get(job["job_id"]) is None
+
+
+async def wait_for_status(queue, job_id, statuses, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job is not None and job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {statuses}: {await queue.get(job_id)}")
+
+
+def test_queue_resumes_from_checkpoint(tmp_path):
+    seen = []
+
+    async def handler(ctx):
+        seen.append(ctx.checkpoint)
+        start = (ctx.checkpoint or {}).get("cursor", 0)
+        for cursor in range(start, 4):
+            await ctx.report({"cursor": cursor + 1}, checkpoint={"cursor": cursor + 1})
+        return {"cursor": 4, "attempt": ctx.attempt}
+
+    async def main():
+        backend = SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"))
+        job = backend.create("work", {}, None, ttl=60)
+        # A worker that died after saving a checkpoint
+        backend.claim(["work"], "dead-owner", lease_seconds=0.1)
+        backend.heartbeat(job["job_id"], "dead-owner", {"cursor": 2}, {"cursor": 2})
+        expire_lease(backend, job["job_id"])
+
+        queue = JobQueue(backend, lease_seconds=0.1, poll_seconds=0.01)
+        queue.register("work", handler)
+        queue.start()
+        try:
+            return await wait_for_status(queue, job["job_id"], (COMPLETED, FAILED))
+        finally:
+            await queue.shutdown()
+            backend.close()
+
+    finished = asyncio.run(main())
+    assert finished["status"] == COMPLETED
+    assert finished["result"] == {"cursor": 4, "attempt": 2}
+    assert seen == [{"cursor": 2}]
+
+
+def test_worker_survives_unsaveable_result(tmp_path):
+    async def bad(ctx):
+        return {"value": object()}
+
+    async def good(ctx):
+        return {"ok": True}
+
+    async def main():
+        backend = SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"))
+        queue = JobQueue(backend, lease_seconds=5, poll_seconds=0.01)
+        queue.register("work", bad)
+        queue.start()
+        try:
+            bad_job = await queue.enqueue("work", {})
+            failed = await wait_for_status(queue, bad_job["job_id"], (COMPLETED, FAILED))
+            # Same worker keeps taking jobs of its type
+            queue._handlers["work"]["handler"] = good
+            next_job = await queue.enqueue("work", {})
+            completed = await wait_for_status(queue, next_job["job_id"], (COMPLETED, FAILED))
+            return failed, completed
+        finally:
+            await queue.shutdown()
+            backend.close()
+
+    failed, completed = asyncio.run(main())
+    assert failed["status"] == FAILED
+    assert "result" in failed["error"]
+    assert completed["status"] == COMPLETED
+    assert completed["result"] == {"ok": True}
+
+
+def test_cancel_stops_running_job(tmp_path):
+    started = asyncio.Event()
+
+    async def slow(ctx):
+        await ctx.report({"step": 1})
+        started.set()
+        await asyncio.sleep(10)
+
+    async def main():
+        backend = SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"))
+        queue = JobQueue(backend, lease_seconds=5, poll_seconds=0.01)
+        queue.register("work", slow)
+        queue.start()
+        try:
+            job = await queue.enqueue("work", {})
+            await asyncio.wait_for(started.wait(), timeout=2)
+            await queue.cancel(job["job_id"])
+            return await wait_for_status(queue, job["job_id"], (CANCELLED,))
+        finally:
+            await queue.shutdown()
+            backend.close()
+
+    cancelled = asyncio.run(main())
+    assert cancelled["progress"] == {"step": 1}
@@ -0,0 +1,90 @@
+"""Tests for one batch of the wardrobe recategorization job"""
+
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.components.ai.wardrobe_classifier import WardrobeClassifier
+from app.components.wardrobe import recategorize_job
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), (20, 40, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeEmbeddingStore:
+    def __init__(self):
+        self.saved = {}
+
+    def get_many(self, item_ids, model):
+        return {}
+
+    def put(self, item_id, user_id, embedding, model):
+        self.saved[item_id] = embedding
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    """Run _recategorize_batch against in-memory items, images and store"""
+    items = {
+        "good": {"id": "good", "image_url": "https://img/good.png", "category": "Tops & Kurtas", "color": "blue"},
+        "broken": {"id": "broken", "image_url": "https://img/broken.png", "category": "Shoes & Sandals", "color": "red"}
+    }
+    images = {"https://img/good.png": png_bytes(), "https://img/broken.png": b"not an image"}
+    updates = {}
+    store = FakeEmbeddingStore()
+    classifier = WardrobeClassifier()
+
+    async def get_items(user_id, item_ids):
+        return [items[item_id] for item_id in item_ids if item_id in items]
+
+    async def fetch(url):
+        return images[url]
+
+    async def categorize(raw_images):
+        # Real decoding, so undecodable images get the classifier's error result
+        decoded, results = classifier.decode_images(raw_images)
+        for index, _ in decoded:
+            results[index] = {
+                "name": "Blue Kurta", "description": "casual blue plain kurta",
+                "category": "Tops & Kurtas", "sub_category": "kurta", "color": "blue",
+                "secondary_color": None, "style": "casual", "pattern": "plain",
+                "tags": ["kurta", "casual", "blue"], "auto_categorized": True,
+                "embedding": [0.1, 0.2, 0.3]
+            }
+        return results
+
+    async def update(item_id, user_id, data):
+        updates[item_id] = data
+
+    monkeypatch.setattr(recategorize_job, "get_wardrobe_items_by_ids", get_items)
+    monkeypatch.setattr(recategorize_job, "fetch_image", fetch)
+    monkeypatch.setattr(recategorize_job, "categorize_wardrobe_items_cached", categorize)
+    monkeypatch.setattr(recategorize_job, "update_wardrobe_item", update)
+    monkeypatch.setattr(recategorize_job, "get_embedding_store", lambda: store)
+
+    def run(item_ids):
+        progress = {"processed": 0, "updated": 0, "failed": 0, "skipped": 0, "from_stored_embeddings": 0, "errors": []}
+        asyncio.run(recategorize_job._recategorize_batch("user-1", item_ids, progress))
+        return progress, updates, store
+
+    return run
+
+
+def test_undecodable_image_keeps_its_category(batch):
+    progress, updates, store = batch(["good", "broken", "deleted"])
+
+    assert set(updates) == {"good"}
+    assert updates["good"]["category"] == "Tops & Kurtas"
+    assert "error" not in updates["good"]["tags"]
+    assert set(store.saved) == {"good"}
+
+    assert progress["processed"] == 3
+    assert progress["updated"] == 1
+    assert progress["failed"] == 1
+    assert progress["skipped"] == 1
+    assert [error["item_id"] for error in progress["errors"]] == ["broken"]
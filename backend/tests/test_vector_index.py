@@ -0,0 +1,127 @@
+"""Tests for exact and IVF nearest-neighbour search over item embeddings"""
+
+import numpy as np
+import pytest
+
+from app.components.ai import embedding_store
+from app.components.ai.vector_index import UserIndexCache, VectorIndex, spherical_kmeans
+
+
+def clustered(num_items, dim=32, num_clusters=40, seed=0):
+    """Unit vectors scattered around random centres, like embeddings of similar garments"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(num_clusters, dim))
+    vectors = centres[rng.integers(num_clusters, size=num_items)] + 0.3 * rng.normal(size=(num_items, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"item-{i}" for i in range(num_items)], vectors.astype(np.float32)
+
+
+def test_exact_search_ranks_by_cosine_similarity():
+    ids = ["a", "b", "c"]
+    vectors = np.array([[1, 0], [0.6, 0.8], [0, 1]], dtype=np.float32)
+    index = VectorIndex(ids, vectors)
+
+    results = index.search(np.array([1.0, 0.1]), k=3)
+
+    assert not index.approximate
+    assert [item_id for item_id, _ in results] == ["a", "b", "c"]
+    assert results[0][1] == pytest.approx(1 / np.sqrt(1.01), abs=1e-5)
+
+
+def test_search_excludes_ids():
+    ids, vectors = clustered(50)
+    index = VectorIndex(ids, vectors)
+
+    results = index.search(vectors[0], k=5, exclude=["item-0"])
+
+    assert len(results) == 5
+    assert "item-0" not in [item_id for item_id, _ in results]
+
+
+def test_empty_index_returns_nothing():
+    assert VectorIndex([], np.zeros((0, 32))).search(np.ones(32), k=5) == []
+
+
+def test_ivf_is_built_above_threshold():
+    ids, vectors = clustered(2001)
+
+    assert not VectorIndex(ids[:2000], vectors[:2000], ivf_threshold=2000).approximate
+    assert VectorIndex(ids, vectors, ivf_threshold=2000).approximate
+
+
+def test_ivf_recall_against_exact_search():
+    ids, vectors = clustered(3000)
+    exact = VectorIndex(ids, vectors, ivf_threshold=len(ids))
+    ivf = VectorIndex(ids, vectors, ivf_threshold=2000)
+    queries = np.random.default_rng(1).choice(len(ids), size=50, replace=False)
+
+    hits = 0
+    for row in queries:
+        expected = {item_id for item_id, _ in exact.search(vectors[row], k=10)}
+        found = {item_id for item_id, _ in ivf.search(vectors[row], k=10)}
+        hits += len(expected & found)
+
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_spherical_kmeans_is_deterministic():
+    _, vectors = clustered(500)
+
+    first = spherical_kmeans(vectors, 20)
+    second = spherical_kmeans(vectors, 20)
+
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+
+
+class FakeEmbeddingStore:
+    def __init__(self):
+        self.embeddings = {}
+        self.reads = 0
+
+    def put(self, item_id, user_id, embedding, model):
+        self.embeddings[item_id] = (user_id, np.asarray(embedding, dtype=np.float32))
+
+    def user_version(self, user_id, model):
+        owned = sorted(item_id for item_id, (owner, _) in self.embeddings.items() if owner == user_id)
+        return len(owned), owned[-1] if owned else ""
+
+    def get_user_embeddings(self, user_id, model):
+        self.reads += 1
+        owned = [(item_id, vector) for item_id, (owner, vector) in self.embeddings.items() if owner == user_id]
+        return [item_id for item_id, _ in owned], np.stack([vector for _, vector in owned])
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeEmbeddingStore()
+    monkeypatch.setattr(embedding_store, "get_embedding_store", lambda: store)
+    return store
+
+
+def test_user_index_cache_reuses_index_until_version_changes(store):
+    store.put("a", "user-1", [1, 0], "model")
+    cache = UserIndexCache()
+
+    first = cache.get("user-1", "model")
+    assert cache.get("user-1", "model") is first
+    assert store.reads == 1
+
+    store.put("b", "user-1", [0, 1], "model")
+    rebuilt = cache.get("user-1", "model")
+
+    assert rebuilt is not first
+    assert store.reads == 2
+    assert rebuilt.search(np.array([0, 1]), k=1)[0][0] == "b"
+
+
+def test_user_index_cache_evicts_least_recently_used(store):
+    store.put("a", "user-1", [1, 0], "model")
+    store.put("b", "user-2", [0, 1], "model")
+    cache = UserIndexCache(max_users=1)
+
+    cache.get("user-1", "model")
+    cache.get("user-2", "model")
+    cache.get("user-1", "model")
+
+    assert store.reads == 3
@@ -0,0 +1,72 @@
+"""Tests for the attribute cascade of the wardrobe classifier"""
+
+import pytest
+import torch
+
+from app.components.ai.wardrobe_classifier import WardrobeClassifier
+
+
+@pytest.fixture
+def classify(monkeypatch):
+    """Categorize fake embeddings whose item type is predicted with given confidences"""
+    classifier = WardrobeClassifier()
+    classifier._model = object()
+    scored = {}
+
+    def run(predictions):
+        def score_labels_batch(image_embeds, labels):
+            rows = image_embeds.shape[0]
+            if labels == classifier.item_types:
+                probs = torch.zeros(rows, len(labels))
+                for row, (item_type, confidence) in enumerate(predictions):
+                    probs[row] = (1 - confidence) / (len(labels) - 1)
+                    probs[row, labels.index(item_type)] = confidence
+                return probs
+            # Attribute stages always pick their last label, so scored rows stand out from defaults
+            scored[labels[-1]] = scored.get(labels[-1], 0) + rows
+            probs = torch.zeros(rows, len(labels))
+            probs[:, -1] = 1.0
+            return probs
+
+        monkeypatch.setattr(classifier, "score_labels_batch", score_labels_batch)
+        embeds = torch.nn.functional.normalize(torch.ones(len(predictions), 8), dim=-1)
+        return classifier.categorize_embeddings(embeds), scored
+
+    return run
+
+
+def test_low_confidence_item_is_uncategorized(classify):
+    results, _ = classify([("kurta", 0.25)])
+
+    assert results[0]["category"] == "Uncategorized"
+
+
+def test_style_is_scored_for_every_identified_item(classify):
+    results, _ = classify([("kurta", 0.35), ("kurta", 0.9), ("necklace", 0.9)])
+
+    assert [result["style"] for result in results] == ["vintage"] * 3
+
+
+def test_pattern_skipped_below_its_confidence(classify):
+    results, scored = classify([("kurta", 0.35), ("kurta", 0.9)])
+
+    assert [result["pattern"] for result in results] == ["plain", "geometric"]
+    assert scored["geometric"] == 1
+
+
+def test_pattern_skipped_for_jewelry_and_accessories(classify):
+    results, scored = classify([("necklace", 0.9), ("handbag", 0.9), ("sandals", 0.9)])
+
+    assert [result["pattern"] for result in results] == ["plain", "plain", "geometric"]
+    assert scored["geometric"] == 1
+
+
+def test_stage_applies():
+    classifier = WardrobeClassifier()
+    style, pattern = classifier.CASCADE_STAGES[1], classifier.CASCADE_STAGES[2]
+
+    assert classifier.stage_applies(style, "kurta", classifier.CONFIDENCE_THRESHOLD)
+    assert not classifier.stage_applies(style, "kurta", classifier.CONFIDENCE_THRESHOLD - 0.01)
+    assert not classifier.stage_applies(pattern, "kurta", 0.45)
+    assert classifier.stage_applies(pattern, "kurta", 0.5)
+    assert not classifier.stage_applies(pattern, "ring", 0.9)